@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, EmailStr
 
 from app.core.config import settings
-from app.integrations.erp_client import erp_request, ERPError
+from app.integrations.erp_client import erp_request, ERPError, ERPUnavailableError
 from app.core.rate_limiter import limiter
 
 
@@ -54,6 +54,9 @@ def submit_contact(request: Request, payload: ContactRequest):
 
         return {"success": True, "message": "Enquiry submitted successfully."}
 
+    except ERPUnavailableError:
+        raise
+
     except ERPError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,23 +1,13 @@
 from fastapi import APIRouter, HTTPException, Header
 from typing import Optional
 
-from app.core.config import settings
-from app.services.customer_service import _find_customer_by_phone
+from app.auth.dependencies import require_frontend_token
+from app.integrations.erp_client import ERPError
+from app.services.customer_service import CustomerPhones
 
 router = APIRouter(prefix="", tags=["customers"])
 
 
-# -----------------------------
-# Frontend Token Protection
-# -----------------------------
-def _require_frontend_token(x_frontend_token: Optional[str]) -> None:
-    if not settings.FRONTEND_SECRET_TOKEN:
-        return
-
-    if x_frontend_token != settings.FRONTEND_SECRET_TOKEN:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
-
 # -----------------------------
 # Check If Customer Exists
 # -----------------------------
@@ -26,13 +16,14 @@ def customer_exists(
     phone: str,
     x_frontend_token: Optional[str] = Header(default=None, alias="X-Frontend-Token"),
 ):
-    _require_frontend_token(x_frontend_token)
+    require_frontend_token(x_frontend_token)
 
     if not phone:
         raise HTTPException(status_code=400, detail="Phone is required")
 
     try:
-        existing = _find_customer_by_phone(phone)
+        # Unknown numbers are answered without calling ERP
+        existing = CustomerPhones.find(phone)
 
         return {
             "status": "success",
@@ -40,5 +31,8 @@ def customer_exists(
             "customer_id": existing,
         }
 
+    except ERPError:
+        raise
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
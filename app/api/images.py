@@ -0,0 +1,40 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+from app.core.compression import etag_matches
+from app.core.config import settings
+from app.integrations.erp_client import ERPError, ERPUnavailableError
+from app.services.image_service import ImageCache, ImageNotFound
+
+router = APIRouter(prefix="/images", tags=["images"])
+
+# The URL is the ERP path, not the content: an upload that replaces a
+# file keeps it, so browsers must revalidate (ETag) now and then.
+IMAGE_CACHE_CONTROL = f"public, max-age={settings.IMAGE_BROWSER_MAX_AGE}"
+
+
+@router.get("/files/{file_path:path}")
+def image(file_path: str, request: Request, w: int = 0):
+
+    try:
+        cached = ImageCache.get(file_path, width=w)
+
+    except ImageNotFound:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    except ERPUnavailableError:
+        raise
+
+    except ERPError:
+        raise HTTPException(status_code=502, detail="Image temporarily unavailable")
+
+    headers = {
+        "ETag": cached.etag,
+        "Cache-Control": IMAGE_CACHE_CONTROL,
+    }
+
+    # SVGs are compressed on the way out, with an encoding-specific ETag
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(cached.path, media_type=cached.media_type, headers=headers)
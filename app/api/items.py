@@ -1,30 +1,101 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from typing import Optional
 
-from app.services.item_service import get_products
+from app.core.responses import cached_json_response
+from app.integrations.erp_client import ERPError
+from app.services.facet_service import CatalogFacets
+from app.services.item_service import get_products_payload, export_products
 
 router = APIRouter(prefix="", tags=["items"])
 
 
 @router.get("/products")
 def products(
+    request: Request,
     category: Optional[str] = None,
     subcategory: Optional[str] = None,
     search: Optional[str] = None,
     order_by: Optional[str] = None,
     page: int = 1,
     page_size: int = 100,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
 ):
 
     try:
-        return get_products(
+        payload = get_products_payload(
             category=category,
             subcategory=subcategory,
             search=search,
             order_by=order_by,
             page=page,
             page_size=page_size,
+            fields=fields,
+            cursor=cursor,
         )
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except HTTPException:
+        raise
+
+    except ERPError:
+        raise
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+    return cached_json_response(payload, request)
+
+
+@router.get("/products/export")
+def products_export(
+    category: Optional[str] = None,
+    subcategory: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+
+    try:
+        stream = export_products(
+            category=category,
+            subcategory=subcategory,
+            fields=fields,
+        )
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except HTTPException:
+        raise
+
+    except ERPError:
+        raise
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return StreamingResponse(
+        stream,
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+@router.get("/products/facets")
+def products_facets(request: Request):
+
+    try:
+        payload = CatalogFacets.get_payload()
+
+    except HTTPException:
+        raise
+
+    except ERPError:
+        raise
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return cached_json_response(payload, request)
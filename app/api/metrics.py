@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Header
+from typing import Optional
+
+from app.auth.dependencies import require_frontend_token
+from app.core.admission import AdmissionControl
+from app.core.snapshot import CatalogSnapshot
+from app.integrations.erp_client import get_latency, hedge_budget
+from app.integrations.erp_pool import pool_stats
+from app.integrations.erp_scheduler import ERPScheduler
+
+router = APIRouter(prefix="/internal", tags=["internal"])
+
+
+# -----------------------------
+# Load / ERP Client Metrics (this worker)
+# -----------------------------
+@router.get("/metrics")
+def erp_metrics(
+    x_frontend_token: Optional[str] = Header(default=None, alias="X-Frontend-Token"),
+):
+    # Internal: refused when no frontend token is configured
+    require_frontend_token(x_frontend_token, fail_closed=True)
+
+    snapshot = CatalogSnapshot.current()
+
+    return {
+        "admission": AdmissionControl.stats(),
+        "pool": pool_stats.snapshot(),
+        "scheduler": ERPScheduler.stats(),
+        "hedging": {
+            "sent": hedge_budget.sent,
+            "won": hedge_budget.won,
+        },
+        "get_latency": {
+            "p50": get_latency.percentile(50),
+            "p95": get_latency.percentile(95),
+        },
+        "catalog_snapshot": snapshot.version if snapshot is not None else None,
+    }
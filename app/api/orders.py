@@ -1,28 +1,18 @@
-from fastapi import APIRouter, HTTPException, Header, Depends
+from fastapi import APIRouter, HTTPException, Header, Depends, Request, Response
 from typing import Optional
 
-from app.core.config import settings
-from app.models.order_models import PlaceOrderIn
-from app.services.order_service import create_ecommerce_order
+from app.core.responses import CachedPayload, cached_json_response
+from app.integrations.erp_client import ERPError
+from app.models.order_models import PlaceOrderIn, PlaceOrdersIn, QuoteIn
+from app.services.order_service import create_ecommerce_order, create_ecommerce_orders, create_quote
 from app.services.order_tracking import list_orders_by_phone
-from app.services.order_detail_service import get_order_detail
-from app.auth.dependencies import get_current_user
+from app.services.order_detail_service import get_order_detail_payload
+from app.auth.dependencies import get_current_user, require_frontend_token
 
 
 router = APIRouter(prefix="", tags=["orders"])
 
 
-# -------------------------------------------------
-# Frontend Token Protection (MVP Layer)
-# -------------------------------------------------
-def _require_frontend_token(x_frontend_token: Optional[str]) -> None:
-    if not settings.FRONTEND_SECRET_TOKEN:
-        return
-
-    if x_frontend_token != settings.FRONTEND_SECRET_TOKEN:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
-
 # -------------------------------------------------
 # Place Order (RFQ or Sales Order - ERP Driven)
 # -------------------------------------------------
@@ -33,7 +23,7 @@ def place_order(
         default=None, alias="X-Frontend-Token"
     ),
 ):
-    _require_frontend_token(x_frontend_token)
+    require_frontend_token(x_frontend_token)
 
     try:
         return create_ecommerce_order(payload.model_dump())
@@ -41,6 +31,64 @@ def place_order(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    except ERPError:
+        raise
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# -------------------------------------------------
+# Cart Quote
+# Checkout-accurate total + signed token for place-order
+# -------------------------------------------------
+@router.post("/checkout/quote")
+def quote(
+    payload: QuoteIn,
+    x_frontend_token: Optional[str] = Header(
+        default=None, alias="X-Frontend-Token"
+    ),
+):
+    require_frontend_token(x_frontend_token)
+
+    try:
+        return create_quote(payload.model_dump()["cart"])
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except HTTPException:
+        raise
+
+    except ERPError:
+        raise
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# -------------------------------------------------
+# Bulk Orders (B2B)
+# One customer, many carts; per-order results
+# -------------------------------------------------
+@router.post("/checkout/place-orders")
+def place_orders(
+    payload: PlaceOrdersIn,
+    x_frontend_token: Optional[str] = Header(
+        default=None, alias="X-Frontend-Token"
+    ),
+):
+    require_frontend_token(x_frontend_token)
+
+    try:
+        return create_ecommerce_orders(payload.model_dump())
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except ERPError:
+        raise
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -51,25 +99,41 @@ def place_order(
 @router.get("/orders")
 def my_orders(
     phone_number: str,
+    request: Request,
     limit: int = 50,
+    since: Optional[str] = None,
     x_frontend_token: Optional[str] = Header(
         default=None, alias="X-Frontend-Token"
     ),
 ):
-    _require_frontend_token(x_frontend_token)
+    require_frontend_token(x_frontend_token)
 
     if limit > 100:
         limit = 100
 
     try:
-        return list_orders_by_phone(
+        result = list_orders_by_phone(
             phone_number=phone_number,
             limit=limit,
+            since=since,
         )
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except ERPError:
+        raise
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    # Nothing changed since the client's watermark
+    if since and not result["orders"]:
+        return Response(status_code=304)
+
+    payload = CachedPayload.from_content(result)
+    return cached_json_response(payload, request, cache_control="private, no-cache")
+
 
 # -------------------------------------------------
 # Order Detail (JWT Protected - CLEAN VERSION)
@@ -78,6 +142,8 @@ def my_orders(
 def order_detail(
     order_id: str,
     order_type: str,
+    request: Request,
     current_user=Depends(get_current_user),
 ):
-    return get_order_detail(order_id, order_type)
+    payload = get_order_detail_payload(order_id, order_type)
+    return cached_json_response(payload, request, cache_control="private, no-cache")
@@ -0,0 +1,50 @@
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Request
+
+from app.core.config import settings
+from app.services.cache_invalidation import (
+    WEBHOOK_DOCTYPES,
+    CacheEvents,
+    verify_signature,
+)
+
+router = APIRouter(prefix="/webhooks", tags=["webhooks"])
+
+
+# -------------------------------------------------
+# ERPNext Webhook (Item, Item Price, Customer, E-Commerce Settings, orders)
+# -------------------------------------------------
+# Configure in ERPNext → Webhook with a Webhook Secret and a JSON body:
+#   {"doctype": "{{ doc.doctype }}", "name": "{{ doc.name }}",
+#    "item_code": "{{ doc.item_code }}"}
+@router.post("/erp", status_code=202)
+async def erp_webhook(
+    request: Request,
+    x_frappe_webhook_signature: Optional[str] = Header(
+        default=None, alias="X-Frappe-Webhook-Signature"
+    ),
+):
+    if not settings.ERP_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Webhooks are not configured")
+
+    body = await request.body()
+
+    if not verify_signature(body, x_frappe_webhook_signature):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+
+    doctype = payload.get("doctype") if isinstance(payload, dict) else None
+    name = payload.get("name") if isinstance(payload, dict) else None
+
+    if doctype not in WEBHOOK_DOCTYPES or not name:
+        raise HTTPException(status_code=400, detail="Unsupported webhook payload")
+
+    CacheEvents.enqueue(doctype, str(name), payload.get("item_code") or None)
+
+    return {"status": "accepted"}
@@ -1,5 +1,24 @@
+from typing import Optional
+
 from fastapi import Request, HTTPException
 from app.auth.jwt import decode_token
+from app.core.config import settings
+
+
+def require_frontend_token(x_frontend_token: Optional[str], fail_closed: bool = False) -> None:
+    """
+    Checks the X-Frontend-Token header. Without FRONTEND_SECRET_TOKEN
+    the check is skipped (local development), unless `fail_closed`:
+    internal endpoints are then refused outright.
+    """
+
+    if not settings.FRONTEND_SECRET_TOKEN:
+        if fail_closed:
+            raise HTTPException(status_code=403, detail="Forbidden")
+        return
+
+    if x_frontend_token != settings.FRONTEND_SECRET_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
 
 
 def get_current_user(request: Request):
@@ -0,0 +1,125 @@
+import json
+import math
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.request_priority import priority_for_path
+from app.integrations.erp_health import erp_health
+from app.integrations.erp_scheduler import BULK, CRITICAL, INTERACTIVE, PRIORITY_NAMES
+
+
+# Never rejected: probes, metrics (most needed under load) and ERP
+# webhooks (cheap, and not redelivered if refused)
+EXEMPT_PATHS = {"/health", "/ready", "/internal/metrics", "/webhooks/erp"}
+
+_BUSY_BODY = json.dumps({"detail": "Server is busy. Please retry shortly."}).encode()
+
+
+# -------------------------------------------------
+# Admission Control
+# -------------------------------------------------
+class AdmissionControl:
+    """
+    Per-worker request admission by priority class.
+
+    Up to ADMISSION_MAX_IN_FLIGHT requests run at once. The top
+    ADMISSION_CRITICAL_RESERVE of that is kept for critical routes
+    (checkout, auth); bulk routes only get ADMISSION_BULK_SHARE of the
+    rest. While ERP is slower than ADMISSION_ERP_TARGET_LATENCY (see
+    ERPHealth: failures and hanging calls count as slow), the
+    non-critical limits shrink in proportion, so requests are turned
+    away up front instead of queueing for ERP until clients give up.
+    """
+
+    in_flight: int = 0
+    rejected = {name: 0 for name in PRIORITY_NAMES.values()}
+
+    @staticmethod
+    def capacity() -> float:
+        capacity = float(settings.ADMISSION_MAX_IN_FLIGHT)
+
+        latency = erp_health.latency(settings.ADMISSION_LATENCY_MAX_AGE)
+        target = settings.ADMISSION_ERP_TARGET_LATENCY
+
+        if latency is not None and target > 0 and latency > target:
+            capacity *= target / latency
+
+        return capacity
+
+    @classmethod
+    def limit(cls, priority: int) -> float:
+        if priority == CRITICAL:
+            return settings.ADMISSION_MAX_IN_FLIGHT
+
+        limit = cls.capacity() * (1 - settings.ADMISSION_CRITICAL_RESERVE)
+
+        if priority == BULK:
+            limit *= settings.ADMISSION_BULK_SHARE
+
+        # Always let a little through, so ERP recovery is noticed
+        return max(limit, 1)
+
+    @classmethod
+    def retry_after(cls) -> int:
+        latency = erp_health.latency(settings.ADMISSION_LATENCY_MAX_AGE) or 0
+        return max(settings.ADMISSION_RETRY_AFTER, math.ceil(latency))
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {
+            "in_flight": cls.in_flight,
+            "limits": {
+                PRIORITY_NAMES[p]: round(cls.limit(p), 1)
+                for p in (CRITICAL, INTERACTIVE, BULK)
+            },
+            "rejected": dict(cls.rejected),
+        }
+
+
+# -------------------------------------------------
+# Admission Middleware
+# -------------------------------------------------
+class AdmissionMiddleware:
+    """
+    Rejects requests with 503 + Retry-After once their priority
+    class is over its in-flight limit.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+
+        if path not in EXEMPT_PATHS and scope["method"] != "OPTIONS":
+            priority = priority_for_path(path)
+
+            if AdmissionControl.in_flight >= AdmissionControl.limit(priority):
+                AdmissionControl.rejected[PRIORITY_NAMES[priority]] += 1
+                await self._reject(send)
+                return
+
+        # Single event loop per worker: no lock needed
+        AdmissionControl.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            AdmissionControl.in_flight -= 1
+
+    @staticmethod
+    async def _reject(send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(_BUSY_BODY)).encode()),
+                (b"retry-after", str(AdmissionControl.retry_after()).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": _BUSY_BODY})
@@ -16,6 +16,74 @@ class Settings:
     ERP_API_KEY: str = os.getenv("ERP_API_KEY", "")
     ERP_API_SECRET: str = os.getenv("ERP_API_SECRET", "")
 
+    SITE_CONTROL_CACHE_TTL: int = int(os.getenv("SITE_CONTROL_CACHE_TTL", "60"))
+
+    # Per attempt; cut to the remaining request deadline
+    ERP_TIMEOUT: float = float(os.getenv("ERP_TIMEOUT", "30"))
+    ERP_RETRIES: int = int(os.getenv("ERP_RETRIES", "3"))
+    # No attempt is started with less budget than this
+    ERP_MIN_ATTEMPT_TIMEOUT: float = float(os.getenv("ERP_MIN_ATTEMPT_TIMEOUT", "0.2"))
+
+    # Hedged GETs: a second request once the first is slower than the
+    # observed percentile; hedges are capped at ERP_HEDGE_BUDGET of GETs.
+    # Off by default: it adds ERP load, turn on once measured
+    ERP_HEDGE_ENABLED: bool = os.getenv("ERP_HEDGE_ENABLED", "false").lower() == "true"
+    ERP_HEDGE_PERCENTILE: float = float(os.getenv("ERP_HEDGE_PERCENTILE", "95"))
+    ERP_HEDGE_BUDGET: float = float(os.getenv("ERP_HEDGE_BUDGET", "0.05"))
+    ERP_HEDGE_MIN_DELAY: float = float(os.getenv("ERP_HEDGE_MIN_DELAY", "0.05"))
+
+    # Request deadlines (seconds) carried into ERP calls
+    REQUEST_DEADLINE_DEFAULT: float = float(os.getenv("REQUEST_DEADLINE_DEFAULT", "15"))
+    REQUEST_DEADLINE_CATALOG: float = float(os.getenv("REQUEST_DEADLINE_CATALOG", "2"))
+    REQUEST_DEADLINE_CHECKOUT: float = float(os.getenv("REQUEST_DEADLINE_CHECKOUT", "10"))
+    # A B2B batch is up to BULK_ORDER_MAX_ORDERS checkouts in one request
+    REQUEST_DEADLINE_BULK_ORDERS: float = float(os.getenv("REQUEST_DEADLINE_BULK_ORDERS", "120"))
+
+    # ERP call scheduler (per worker): concurrency cap and how long each
+    # priority class may queue before it is shed
+    ERP_MAX_CONCURRENCY: int = int(os.getenv("ERP_MAX_CONCURRENCY", "8"))
+    ERP_QUEUE_TIMEOUT_CRITICAL: float = float(os.getenv("ERP_QUEUE_TIMEOUT_CRITICAL", "10"))
+    ERP_QUEUE_TIMEOUT_INTERACTIVE: float = float(os.getenv("ERP_QUEUE_TIMEOUT_INTERACTIVE", "5"))
+    ERP_QUEUE_TIMEOUT_BULK: float = float(os.getenv("ERP_QUEUE_TIMEOUT_BULK", "2"))
+
+    # HTTP connection pool (per worker). The scheduler never runs more
+    # than ERP_MAX_CONCURRENCY calls, so that many connections are kept.
+    # With ERP_POOL_BLOCK a call waits up to ERP_POOL_TIMEOUT for a free
+    # connection instead of opening a throwaway one.
+    ERP_POOL_MAXSIZE: int = int(os.getenv("ERP_POOL_MAXSIZE", str(ERP_MAX_CONCURRENCY)))
+    ERP_POOL_BLOCK: bool = os.getenv("ERP_POOL_BLOCK", "false").lower() == "true"
+    ERP_POOL_TIMEOUT: float = float(os.getenv("ERP_POOL_TIMEOUT", "5"))
+    # Pings ERP when the pool has been idle this long (0 = off), so
+    # pooled connections are not closed by ERP's keep-alive timeout
+    ERP_KEEPALIVE_INTERVAL: float = float(os.getenv("ERP_KEEPALIVE_INTERVAL", "30"))
+
+    # -------------------------
+    # ADMISSION CONTROL (per worker load shedding)
+    # -------------------------
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_MAX_IN_FLIGHT: int = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "64"))
+    # Share of ADMISSION_MAX_IN_FLIGHT only checkout / auth may use,
+    # and share of the rest that catalog / export / image routes may use
+    ADMISSION_CRITICAL_RESERVE: float = float(os.getenv("ADMISSION_CRITICAL_RESERVE", "0.25"))
+    ADMISSION_BULK_SHARE: float = float(os.getenv("ADMISSION_BULK_SHARE", "0.5"))
+    # Non-critical limits shrink while ERP's recent average latency is
+    # above the target; samples older than MAX_AGE are ignored (then
+    # calls still running count with their age)
+    ADMISSION_ERP_TARGET_LATENCY: float = float(os.getenv("ADMISSION_ERP_TARGET_LATENCY", "1"))
+    ADMISSION_LATENCY_MAX_AGE: float = float(os.getenv("ADMISSION_LATENCY_MAX_AGE", "10"))
+    # Latency charged for an ERP attempt that failed, timed out or got a 5xx
+    ERP_HEALTH_FAILURE_PENALTY: float = float(os.getenv("ERP_HEALTH_FAILURE_PENALTY", "5"))
+    ADMISSION_RETRY_AFTER: int = int(os.getenv("ADMISSION_RETRY_AFTER", "2"))
+
+    # -------------------------
+    # ERP WEBHOOKS (push-based cache invalidation)
+    # -------------------------
+    ERP_WEBHOOK_SECRET: str = os.getenv("ERP_WEBHOOK_SECRET", "")
+    WEBHOOK_DEBOUNCE_SECONDS: float = float(os.getenv("WEBHOOK_DEBOUNCE_SECONDS", "2"))
+    # Shared by all workers on the host so every worker sees each change.
+    # Holds customer phone numbers, so it is created owner-only
+    CACHE_EVENT_LOG: str = os.getenv("CACHE_EVENT_LOG", "/var/tmp/al_hadas_cache_events.log")
+
     # -------------------------
     # CORS
     # -------------------------
@@ -32,8 +100,26 @@ class Settings:
     # DOCTYPE (RFQ)
     # -------------------------
     ECOM_RFQ_DOCTYPE: str = "E-Commerce RFQ"
+    ECOM_RFQ_DOCTYPE_URL: str = ECOM_RFQ_DOCTYPE
     ECOM_RFQ_ITEM_TABLE_FIELD: str = "item_table"
 
+    # -------------------------
+    # CHECKOUT
+    # -------------------------
+    # Threads for concurrent customer resolution + item pricing
+    CHECKOUT_IO_WORKERS: int = int(os.getenv("CHECKOUT_IO_WORKERS", "16"))
+
+    # Bulk (B2B) orders: max carts per request, parallel document POSTs
+    BULK_ORDER_MAX_ORDERS: int = int(os.getenv("BULK_ORDER_MAX_ORDERS", "50"))
+    BULK_ORDER_CONCURRENCY: int = int(os.getenv("BULK_ORDER_CONCURRENCY", "4"))
+
+    # -------------------------
+    # ORDER DETAIL CACHE
+    # -------------------------
+    # Submitted documents rarely change; drafts are still being edited
+    ORDER_DETAIL_SUBMITTED_TTL: int = int(os.getenv("ORDER_DETAIL_SUBMITTED_TTL", "3600"))
+    ORDER_DETAIL_DRAFT_TTL: int = int(os.getenv("ORDER_DETAIL_DRAFT_TTL", "30"))
+
     # -------------------------
     # CONTACT / ENQUIRY
     # -------------------------
@@ -54,6 +140,37 @@ class Settings:
         os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30")
     )
 
+    # -------------------------
+    # CUSTOMER PROFILE
+    # -------------------------
+    # Profiles are cached per email; Customer webhooks drop entries early
+    PROFILE_CACHE_TTL: float = float(os.getenv("PROFILE_CACHE_TTL", "60"))
+
+    # Phone index for /customer/exists: delta sync every REFRESH seconds
+    # (0 = off), full rebuild every REBUILD; misses are only trusted
+    # while the last sync is younger than MAX_AGE
+    CUSTOMER_PHONE_REFRESH_INTERVAL: float = float(os.getenv("CUSTOMER_PHONE_REFRESH_INTERVAL", "60"))
+    CUSTOMER_PHONE_REBUILD_INTERVAL: float = float(os.getenv("CUSTOMER_PHONE_REBUILD_INTERVAL", "3600"))
+    CUSTOMER_PHONE_MAX_AGE: float = float(os.getenv("CUSTOMER_PHONE_MAX_AGE", "300"))
+    CUSTOMER_PHONE_SYNC_CHUNK: int = int(os.getenv("CUSTOMER_PHONE_SYNC_CHUNK", "1000"))
+    # Delta syncs re-read this many seconds before the watermark
+    CUSTOMER_PHONE_SYNC_OVERLAP: float = float(os.getenv("CUSTOMER_PHONE_SYNC_OVERLAP", "120"))
+    # One process per host syncs and publishes the index here; the other
+    # workers reload it (checked every CHECK_INTERVAL). Empty: every
+    # worker syncs from ERP itself
+    CUSTOMER_PHONE_INDEX_PATH: str = os.getenv("CUSTOMER_PHONE_INDEX_PATH", "/var/tmp/al_hadas_customer_phones.json")
+    CUSTOMER_PHONE_CHECK_INTERVAL: float = float(os.getenv("CUSTOMER_PHONE_CHECK_INTERVAL", "5"))
+    # Confirmed number -> customer_id
+    CUSTOMER_PHONE_CACHE_TTL: float = float(os.getenv("CUSTOMER_PHONE_CACHE_TTL", "60"))
+
+    # -------------------------
+    # CHECKOUT QUOTES
+    # -------------------------
+    # Signed cart quotes (HS256); checkout trusts quoted prices until expiry
+    QUOTE_SECRET: str = os.getenv("QUOTE_SECRET", JWT_SECRET)
+    QUOTE_TTL_SECONDS: int = int(os.getenv("QUOTE_TTL_SECONDS", "300"))
+    QUOTE_ITEM_CACHE_TTL: int = int(os.getenv("QUOTE_ITEM_CACHE_TTL", "60"))
+
     # -------------------------
     # SMTP (Direct Email for OTP)
     # -------------------------
@@ -65,5 +182,61 @@ class Settings:
     SMTP_FROM_EMAIL: str = os.getenv("SMTP_FROM_EMAIL", "")
     SMTP_USE_TLS: bool = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
 
+    # -------------------------
+    # STARTUP WARM-UP / READINESS
+    # -------------------------
+    WARMUP_BUDGET: float = float(os.getenv("WARMUP_BUDGET", "15"))
+    WARMUP_CONNECTIONS: int = int(os.getenv("WARMUP_CONNECTIONS", "4"))
+    READY_CHECK_TTL: float = float(os.getenv("READY_CHECK_TTL", "5"))
+
+    # -------------------------
+    # CATALOG CACHE
+    # -------------------------
+    CATALOG_CACHE_TTL: int = int(os.getenv("CATALOG_CACHE_TTL", "30"))
+
+    # Facets: delta refresh from `modified`, periodic full rebuild
+    FACETS_REFRESH_INTERVAL: int = int(os.getenv("FACETS_REFRESH_INTERVAL", "60"))
+    FACETS_REBUILD_INTERVAL: int = int(os.getenv("FACETS_REBUILD_INTERVAL", "3600"))
+    # Delta refreshes re-read this many seconds before the watermark
+    CATALOG_SYNC_OVERLAP: float = float(os.getenv("CATALOG_SYNC_OVERLAP", "120"))
+
+    # -------------------------
+    # SHARED CATALOG SNAPSHOT
+    # -------------------------
+    # One process per host publishes settings + catalog to this
+    # memory-mapped file; workers read it. Kept on disk so a restart
+    # resumes from its watermark. Empty disables it.
+    CATALOG_SNAPSHOT_PATH: str = os.getenv("CATALOG_SNAPSHOT_PATH", "/var/tmp/al_hadas_catalog.snap")
+    CATALOG_SNAPSHOT_INTERVAL: float = float(os.getenv("CATALOG_SNAPSHOT_INTERVAL", "30"))
+    CATALOG_SNAPSHOT_CHECK_INTERVAL: float = float(os.getenv("CATALOG_SNAPSHOT_CHECK_INTERVAL", "1"))
+    # Workers fall back to ERP if the refresher stops updating the snapshot
+    CATALOG_SNAPSHOT_MAX_AGE: float = float(os.getenv("CATALOG_SNAPSHOT_MAX_AGE", "300"))
+
+    # -------------------------
+    # RESPONSE COMPRESSION
+    # -------------------------
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+    # -------------------------
+    # IMAGE PROXY
+    # -------------------------
+    # Public URL of this middleware (used to build proxied image URLs).
+    # Leave empty to keep serving images straight from ERP.
+    PUBLIC_BASE_URL: str = os.getenv("PUBLIC_BASE_URL", "").rstrip("/")
+
+    IMAGE_CACHE_DIR: str = os.getenv("IMAGE_CACHE_DIR", "/tmp/al_hadas_images")
+    IMAGE_CACHE_MAX_BYTES: int = int(
+        os.getenv("IMAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024))
+    )
+    IMAGE_CACHE_TTL: int = int(os.getenv("IMAGE_CACHE_TTL", str(7 * 24 * 3600)))
+    IMAGE_MAX_SOURCE_BYTES: int = int(
+        os.getenv("IMAGE_MAX_SOURCE_BYTES", str(15 * 1024 * 1024))
+    )
+    IMAGE_DEFAULT_WIDTH: int = int(os.getenv("IMAGE_DEFAULT_WIDTH", "640"))
+    # Browsers revalidate (ETag) after this; image URLs are not versioned
+    IMAGE_BROWSER_MAX_AGE: int = int(os.getenv("IMAGE_BROWSER_MAX_AGE", "86400"))
+    # Other workers write to the same directory: re-measure it this often
+    IMAGE_CACHE_SCAN_INTERVAL: int = int(os.getenv("IMAGE_CACHE_SCAN_INTERVAL", "60"))
+
 
 settings = Settings()
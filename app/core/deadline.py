@@ -0,0 +1,119 @@
+import asyncio
+import contextvars
+import threading
+import time
+from typing import List, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+
+# -------------------------------------------------
+# Request Deadline (carried into ERP calls)
+# -------------------------------------------------
+class Deadline:
+    """
+    Time budget of the request being served, plus a flag set once
+    the client has disconnected.
+    """
+
+    __slots__ = ("expires_at", "cancelled")
+
+    def __init__(self, budget: Optional[float]):
+        self.expires_at = time.monotonic() + budget if budget else None
+        self.cancelled = threading.Event()
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+
+current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar(
+    "current_deadline", default=None
+)
+
+
+def _route_deadlines() -> tuple:
+    # Path prefix -> budget in seconds (0 = none); first match wins
+    return (
+        ("/products/export", 0),
+        ("/products", settings.REQUEST_DEADLINE_CATALOG),
+        ("/checkout/place-orders", settings.REQUEST_DEADLINE_BULK_ORDERS),
+        ("/checkout/", settings.REQUEST_DEADLINE_CHECKOUT),
+        ("/webhooks/", 0),
+    )
+
+
+def deadline_for_path(path: str) -> float:
+    for prefix, budget in _route_deadlines():
+        if path.startswith(prefix):
+            return budget
+    return settings.REQUEST_DEADLINE_DEFAULT
+
+
+def _has_body(scope: Scope) -> bool:
+    headers = dict(scope.get("headers") or [])
+    return b"transfer-encoding" in headers or headers.get(b"content-length", b"0") != b"0"
+
+
+# -------------------------------------------------
+# Deadline Middleware
+# -------------------------------------------------
+class DeadlineMiddleware:
+    """
+    Sets the per-route deadline for the request and marks it
+    cancelled when the client disconnects, so ERP work for a client
+    that has given up stops at the next call.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        deadline = Deadline(deadline_for_path(scope["path"]))
+        token = current_deadline.set(deadline)
+
+        body_read = asyncio.Event()
+        # Messages the watcher received before the app asked for them
+        replay: List[Message] = []
+
+        if not _has_body(scope):
+            body_read.set()
+
+        async def app_receive() -> Message:
+            message = replay.pop(0) if replay else await receive()
+
+            if message["type"] == "http.disconnect":
+                deadline.cancelled.set()
+            elif not message.get("more_body", False):
+                body_read.set()
+
+            return message
+
+        async def watch_disconnect() -> None:
+            # Only listens once the app is done with the request body
+            await body_read.wait()
+
+            while True:
+                message = await receive()
+
+                if message["type"] == "http.disconnect":
+                    deadline.cancelled.set()
+                    replay.append(message)
+                    return
+
+                replay.append(message)
+
+        watcher = asyncio.create_task(watch_disconnect())
+
+        try:
+            await self.app(scope, app_receive, send)
+        finally:
+            watcher.cancel()
+            current_deadline.reset(token)
@@ -0,0 +1,46 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.integrations.erp_scheduler import BULK, CRITICAL, INTERACTIVE, erp_priority
+
+
+# Path prefix -> ERP priority class; first match wins, default BULK
+ROUTE_PRIORITIES = (
+    ("/checkout/", CRITICAL),
+    ("/api/auth/", CRITICAL),
+    ("/api/profile/", INTERACTIVE),
+    ("/api/orders/", INTERACTIVE),
+    ("/orders", INTERACTIVE),
+    ("/customer/", INTERACTIVE),
+    ("/api/contact", INTERACTIVE),
+    ("/webhooks/", INTERACTIVE),
+    ("/store-status", INTERACTIVE),
+    ("/ready", INTERACTIVE),
+)
+
+
+def priority_for_path(path: str) -> int:
+    for prefix, priority in ROUTE_PRIORITIES:
+        if path.startswith(prefix):
+            return priority
+    return BULK
+
+
+class ERPPriorityMiddleware:
+    """
+    Tags each request with its ERP priority class. The contextvar
+    follows the request into threadpool endpoints and checkout pools.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = erp_priority.set(priority_for_path(scope["path"]))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            erp_priority.reset(token)
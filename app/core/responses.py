@@ -0,0 +1,111 @@
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+from app.core.compression import compress_body, encoded_etag, negotiate_encoding
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback keeps the app working without orjson
+    orjson = None
+
+
+def encode_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    App-wide default response class.
+    Uses orjson when available (several times faster than stdlib json).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
+
+
+# -------------------------------------------------
+# Pre-encoded Payloads (for cached responses)
+# -------------------------------------------------
+@dataclass
+class CachedPayload:
+    """
+    A JSON body encoded once and served many times.
+    """
+
+    body: bytes
+    etag: str = field(init=False)
+    variants: Dict[str, bytes] = field(init=False, default_factory=dict)
+
+    def __post_init__(self):
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()}"'
+
+    @classmethod
+    def from_content(cls, content: Any) -> "CachedPayload":
+        return cls(encode_json(content))
+
+    def encoded(self, encoding: str) -> bytes:
+        """
+        Compressed body for the given encoding.
+        Compressed once, on first request, and kept with the payload.
+        """
+
+        body = self.variants.get(encoding)
+
+        if body is None:
+            body = self.variants[encoding] = compress_body(self.body, encoding)
+
+        return body
+
+
+def cached_json_response(
+    payload: CachedPayload,
+    request: Optional[Request] = None,
+    cache_control: str = "no-cache",
+) -> Response:
+    """
+    Returns the pre-encoded body as-is (no jsonable_encoder, no
+    re-serialisation), precompressed when the client accepts it,
+    or 304 when the client already has it.
+    """
+
+    headers = {
+        "ETag": payload.etag,
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+
+    if request is None:
+        return Response(content=payload.body, media_type="application/json", headers=headers)
+
+    body = payload.body
+    encoding = None
+
+    if len(body) >= settings.COMPRESSION_MIN_SIZE:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+
+    if encoding:
+        # Each encoded representation gets its own strong validator
+        headers["ETag"] = encoded_etag(payload.etag, encoding)
+
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        body = payload.encoded(encoding)
+        headers["Content-Encoding"] = encoding
+
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,6 +1,8 @@
 import time
 from typing import Any, Dict
 
+from app.core.config import settings as app_settings
+from app.core.snapshot import CatalogSnapshot
 from app.integrations.erp_client import erp_request
 
 
@@ -11,7 +13,8 @@ class SiteControl:
     """
 
     SETTINGS_NAME = "1tk6cucvc9"
-    CACHE_TTL = 60  # seconds
+    # Can be raised to hours when the ERP webhook pushes changes
+    CACHE_TTL = app_settings.SITE_CONTROL_CACHE_TTL  # seconds
 
     _cache: Dict[str, Any] | None = None
     _last_fetch: float = 0
@@ -30,6 +33,11 @@ class SiteControl:
     def _get_settings(cls) -> Dict[str, Any]:
         now = time.time()
 
+        # Host-wide snapshot, unless this worker holds something newer
+        snapshot = CatalogSnapshot.current()
+        if snapshot is not None and snapshot.built_at >= cls._last_fetch:
+            return snapshot.site_settings
+
         if cls._cache and (now - cls._last_fetch) < cls.CACHE_TTL:
             return cls._cache
 
@@ -43,6 +51,28 @@ class SiteControl:
 
         return cls._cache
 
+    @classmethod
+    def set_settings(cls, data: Dict[str, Any]) -> None:
+        """
+        Replaces the cached settings with a fresh document
+        (pushed by the ERP webhook).
+        """
+        cls._cache = data or {}
+        cls._last_fetch = time.time()
+
+    @classmethod
+    def has_settings(cls) -> bool:
+        """
+        True when settings are available without calling ERP
+        (host snapshot, or fetched by this worker at least once).
+        """
+        return cls._cache is not None or CatalogSnapshot.current() is not None
+
+    @classmethod
+    def invalidate(cls) -> None:
+        cls._cache = None
+        cls._last_fetch = 0
+
     # -----------------------------
     # Store Visibility
     # -----------------------------
@@ -0,0 +1,347 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.responses import encode_json
+
+
+logger = get_logger(__name__)
+
+MAGIC = b"ALHSNAP\x00"
+FORMAT_VERSION = 2
+
+# magic, format version, header length
+_PREAMBLE = struct.Struct("<8sII")
+
+# Group keys: "category\x1fsubcategory", either side may be empty
+GROUP_SEP = "\x1f"
+
+# Value table tags (value id 0 is always None)
+_STR, _INT, _FLOAT, _JSON = 1, 2, 3, 4
+_INT64 = struct.Struct("<q")
+_FLOAT64 = struct.Struct("<d")
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def _sort_key(row: Dict[str, Any]) -> tuple:
+    return str(row.get("modified") or ""), str(row.get("name") or "")
+
+
+def _encode_value(value: Any) -> bytes:
+    if isinstance(value, str):
+        return bytes((_STR,)) + value.encode()
+
+    if isinstance(value, int) and not isinstance(value, bool) and -2 ** 63 <= value < 2 ** 63:
+        return bytes((_INT,)) + _INT64.pack(value)
+
+    if isinstance(value, float):
+        return bytes((_FLOAT,)) + _FLOAT64.pack(value)
+
+    return bytes((_JSON,)) + encode_json(value)
+
+
+def _decode_value(raw: memoryview) -> Any:
+    tag = raw[0]
+
+    if tag == _STR:
+        return str(raw[1:], "utf-8")
+    if tag == _INT:
+        return _INT64.unpack_from(raw, 1)[0]
+    if tag == _FLOAT:
+        return _FLOAT64.unpack_from(raw, 1)[0]
+
+    return json.loads(bytes(raw[1:]))
+
+
+# -------------------------------------------------
+# Writer (refresher process only)
+# -------------------------------------------------
+def write_snapshot(
+    path: str,
+    rows: Iterable[Dict[str, Any]],
+    fields: List[str],
+    site_settings: Dict[str, Any],
+    watermark: str,
+    rebuilt_at: float,
+) -> int:
+    """
+    Publishes a new immutable snapshot file and returns its version.
+
+    Layout: preamble | JSON header | rows (u32 value ids, one per
+    field) | value offsets (u64) | values | group index (u32).
+    Every distinct value is stored once, so repeated categories,
+    flags and prices cost four bytes per row.
+
+    Rows are sorted `modified desc, name desc` like /products. The
+    file is fsynced aside and renamed into place: readers only see
+    complete snapshots, and it survives restarts.
+    """
+
+    rows = sorted(rows, key=_sort_key, reverse=True)
+
+    value_ids: Dict[bytes, int] = {}
+    value_offsets = array("Q", [0, 0])
+    values: List[bytes] = []
+    row_table = array("I")
+    groups: Dict[str, List[int]] = {}
+
+    for i, row in enumerate(rows):
+        for f in fields:
+            value = row.get(f)
+
+            if value is None:
+                row_table.append(0)
+                continue
+
+            encoded = _encode_value(value)
+            vid = value_ids.get(encoded)
+
+            if vid is None:
+                vid = value_ids[encoded] = len(value_offsets) - 1
+                values.append(encoded)
+                value_offsets.append(value_offsets[-1] + len(encoded))
+
+            row_table.append(vid)
+
+        category = row.get("item_group") or ""
+        subcategory = row.get("custom_subcategory") or ""
+
+        keys = {f"{category}{GROUP_SEP}", f"{GROUP_SEP}{subcategory}"}
+        keys.add(f"{category}{GROUP_SEP}{subcategory}")
+
+        for key in keys:
+            if key != GROUP_SEP:
+                groups.setdefault(key, []).append(i)
+
+    index = array("I")
+    directory = {}
+
+    for key, members in groups.items():
+        directory[key] = [len(index), len(members)]
+        index.extend(members)
+
+    # Section positions are relative to the start of the data area
+    offsets_at = _align(len(row_table) * row_table.itemsize)
+    values_at = _align(offsets_at + len(value_offsets) * value_offsets.itemsize)
+    index_at = _align(values_at + value_offsets[-1])
+
+    version = time.time_ns()
+
+    header = json.dumps({
+        "version": version,
+        "built_at": time.time(),
+        "rebuilt_at": rebuilt_at,
+        "watermark": watermark,
+        "count": len(rows),
+        "fields": fields,
+        "site_settings": site_settings,
+        "groups": directory,
+        "value_count": len(value_offsets) - 1,
+        "offsets_at": offsets_at,
+        "values_at": values_at,
+        "index_at": index_at,
+    }, separators=(",", ":")).encode()
+
+    data_at = _align(_PREAMBLE.size + len(header))
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+
+    with open(tmp_path, "wb") as fh:
+        fh.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        fh.write(header)
+
+        fh.seek(data_at)
+        fh.write(row_table.tobytes())
+
+        fh.seek(data_at + offsets_at)
+        fh.write(value_offsets.tobytes())
+
+        fh.seek(data_at + values_at)
+        for value in values:
+            fh.write(value)
+
+        fh.seek(data_at + index_at)
+        fh.write(index.tobytes())
+
+        fh.flush()
+        os.fsync(fh.fileno())
+
+    os.replace(tmp_path, path)
+    return version
+
+
+# -------------------------------------------------
+# Reader
+# -------------------------------------------------
+class Snapshot:
+    """
+    Read-only view of one published snapshot.
+
+    The file is memory-mapped, so all workers share the same page
+    cache pages; values are only decoded when they are accessed.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as fh:
+            self.inode = os.fstat(fh.fileno()).st_ino
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, fmt, header_len = _PREAMBLE.unpack_from(self._mmap, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError("Unsupported snapshot file")
+
+        header = json.loads(self._mmap[_PREAMBLE.size:_PREAMBLE.size + header_len])
+
+        self.version: int = header["version"]
+        self.built_at: float = header["built_at"]
+        self.rebuilt_at: float = header["rebuilt_at"]
+        self.watermark: str = header["watermark"]
+        self.fields: List[str] = header["fields"]
+        self.site_settings: Dict[str, Any] = header["site_settings"]
+        self._groups: Dict[str, List[int]] = header["groups"]
+        self._count: int = header["count"]
+        self._field_pos = {f: i for i, f in enumerate(self.fields)}
+
+        # The mmap stays open for as long as this object is referenced
+        view = memoryview(self._mmap)
+        data_at = _align(_PREAMBLE.size + header_len)
+        offsets_at = data_at + header["offsets_at"]
+        values_at = data_at + header["values_at"]
+        index_at = data_at + header["index_at"]
+
+        self._rows = view[data_at:data_at + self._count * len(self.fields) * 4].cast("I")
+        self._value_offsets = view[offsets_at:offsets_at + (header["value_count"] + 1) * 8].cast("Q")
+        self._values = view[values_at:index_at]
+        self._index = view[index_at:].cast("I")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _value(self, vid: int) -> Any:
+        if vid == 0:
+            return None
+        return _decode_value(self._values[self._value_offsets[vid]:self._value_offsets[vid + 1]])
+
+    def get(self, i: int, field: str) -> Any:
+        return self._value(self._rows[i * len(self.fields) + self._field_pos[field]])
+
+    def record(self, i: int) -> Dict[str, Any]:
+        base = i * len(self.fields)
+        return {f: self._value(self._rows[base + n]) for n, f in enumerate(self.fields)}
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self._count):
+            yield self.record(i)
+
+    def select(
+        self,
+        category: Optional[str] = None,
+        subcategory: Optional[str] = None,
+    ) -> Sequence[int]:
+        """
+        Record positions matching the filters, in listing order.
+        """
+
+        key = f"{category or ''}{GROUP_SEP}{subcategory or ''}"
+
+        if key == GROUP_SEP:
+            return range(self._count)
+
+        group = self._groups.get(key)
+        if group is None:
+            return ()
+
+        start, count = group
+        return self._index[start:start + count]
+
+    def seek(self, positions: Sequence[int], modified: str, name: str) -> int:
+        """
+        Index into `positions` of the first record that sorts after
+        the (modified, name) keyset cursor.
+        """
+
+        lo, hi = 0, len(positions)
+        cursor = (modified, name)
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos = positions[mid]
+            key = (str(self.get(pos, "modified") or ""), str(self.get(pos, "name") or ""))
+
+            if key < cursor:
+                hi = mid
+            else:
+                lo = mid + 1
+
+        return lo
+
+
+# -------------------------------------------------
+# Attached Snapshot (every worker)
+# -------------------------------------------------
+class CatalogSnapshot:
+    """
+    The host's current catalog + settings snapshot, as seen by this
+    worker. A new version is attached by swapping one reference, so
+    requests in flight keep reading the version they started with.
+    """
+
+    _current: Optional[Snapshot] = None
+    _alive_at: float = 0
+    _checked_at: float = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def _attach(cls, path: str) -> None:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            cls._current = None
+            return
+
+        # The refresher touches the file on every poll that found no change
+        cls._alive_at = stat.st_mtime
+
+        if cls._current is not None and cls._current.inode == stat.st_ino:
+            return
+
+        try:
+            cls._current = Snapshot(path)
+        except (OSError, ValueError, KeyError):
+            logger.exception("Could not attach catalog snapshot")
+            cls._current = None
+
+    @classmethod
+    def current(cls) -> Optional[Snapshot]:
+        """
+        Returns None when snapshots are disabled, missing, or the
+        refresher has stopped updating them.
+        """
+
+        path = settings.CATALOG_SNAPSHOT_PATH
+        if not path:
+            return None
+
+        now = time.time()
+
+        if (now - cls._checked_at) >= settings.CATALOG_SNAPSHOT_CHECK_INTERVAL:
+            with cls._lock:
+                if (now - cls._checked_at) >= settings.CATALOG_SNAPSHOT_CHECK_INTERVAL:
+                    cls._attach(path)
+                    cls._checked_at = now
+
+        snapshot = cls._current
+
+        if snapshot is None or (now - cls._alive_at) > settings.CATALOG_SNAPSHOT_MAX_AGE:
+            return None
+
+        return snapshot
@@ -0,0 +1,182 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.site_control import SiteControl
+from app.integrations.erp_client import erp_request, ERPError
+from app.integrations.erp_pool import pool_stats
+from app.services.facet_service import CatalogFacets
+from app.services.item_service import get_products_payload
+
+
+logger = get_logger(__name__)
+
+
+def ping_erp() -> None:
+    erp_request("GET", "/api/method/ping", probe=True)
+
+
+# -------------------------------------------------
+# Warm-up State (read by /ready)
+# -------------------------------------------------
+class Warmup:
+    """
+    Startup warm-up of settings, catalog pages and ERP connections,
+    run in parallel within WARMUP_BUDGET seconds.
+    """
+
+    # task name -> "pending" | "ok" | "failed" | "timeout"
+    tasks: Dict[str, str] = {}
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    _erp_reachable: bool = False
+    _erp_checked_at: float = 0
+    _lock = threading.Lock()
+
+    # -----------------------------
+    # Tasks
+    # -----------------------------
+    @staticmethod
+    def _warm_connections() -> None:
+        # Concurrent pings leave that many live connections in the pool
+        count = max(1, settings.WARMUP_CONNECTIONS)
+        with ThreadPoolExecutor(max_workers=count) as pool:
+            list(pool.map(lambda _: ping_erp(), range(count)))
+
+    @classmethod
+    def _jobs(cls) -> Dict[str, Callable[[], Any]]:
+        return {
+            "settings": SiteControl._get_settings,
+            "catalog": get_products_payload,
+            "facets": CatalogFacets.get_payload,
+            "erp_connections": cls._warm_connections,
+        }
+
+    # -----------------------------
+    # Runner
+    # -----------------------------
+    @classmethod
+    def _run_job(cls, name: str, job: Callable[[], Any]) -> None:
+        try:
+            job()
+            cls.tasks[name] = "ok"
+        except Exception:
+            logger.exception("Warm-up task failed: %s", name)
+            cls.tasks[name] = "failed"
+
+    @classmethod
+    def run(cls) -> None:
+        jobs = cls._jobs()
+
+        cls.started_at = time.time()
+        cls.finished_at = None
+        cls.tasks = {name: "pending" for name in jobs}
+
+        executor = ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="warmup")
+        futures = [executor.submit(cls._run_job, name, job) for name, job in jobs.items()]
+
+        wait(futures, timeout=settings.WARMUP_BUDGET)
+
+        # Jobs past the budget keep running but no longer hold up readiness
+        executor.shutdown(wait=False)
+
+        for name, status in cls.tasks.items():
+            if status == "pending":
+                cls.tasks[name] = "timeout"
+
+        cls.finished_at = time.time()
+
+        logger.info(
+            "Warm-up finished in %.2fs: %s",
+            cls.finished_at - cls.started_at,
+            cls.tasks,
+        )
+
+    @classmethod
+    def start(cls) -> None:
+        threading.Thread(target=cls.run, name="warmup", daemon=True).start()
+
+    # -----------------------------
+    # Readiness
+    # -----------------------------
+    @classmethod
+    def is_erp_reachable(cls) -> bool:
+        """
+        Cached ERP ping, so load balancer probes don't load the ERP.
+        """
+
+        with cls._lock:
+            if (time.time() - cls._erp_checked_at) < settings.READY_CHECK_TTL:
+                return cls._erp_reachable
+
+            try:
+                ping_erp()
+                cls._erp_reachable = True
+            except ERPError:
+                cls._erp_reachable = False
+
+            # Settings warm-up failed (e.g. ERP down at boot): retry it
+            # here, at the probe's rate, instead of staying unready
+            if cls._erp_reachable and not SiteControl.has_settings():
+                cls._run_job("settings", SiteControl._get_settings)
+
+            cls._erp_checked_at = time.time()
+            return cls._erp_reachable
+
+    @classmethod
+    def status(cls) -> Dict[str, Any]:
+        erp_reachable = cls.is_erp_reachable()
+        # Current state, not the boot-time task result
+        warmed = cls.finished_at is not None and SiteControl.has_settings()
+
+        return {
+            "ready": warmed and erp_reachable,
+            "warmup": {
+                "finished": cls.finished_at is not None,
+                "tasks": dict(cls.tasks),
+            },
+            "erp": "reachable" if erp_reachable else "unreachable",
+        }
+
+
+# -------------------------------------------------
+# Connection Keep-Alive
+# -------------------------------------------------
+class ConnectionKeepAlive:
+    """
+    Re-warms the ERP connection pool after ERP_KEEPALIVE_INTERVAL
+    seconds without traffic, before ERP's keep-alive timeout closes
+    the idle connections (and the next request pays for a new TLS
+    handshake).
+    """
+
+    _thread: threading.Thread | None = None
+
+    @classmethod
+    def _run(cls) -> None:
+        interval = settings.ERP_KEEPALIVE_INTERVAL
+
+        while True:
+            time.sleep(max(0.0, interval - pool_stats.idle_for()))
+
+            if pool_stats.idle_for() < interval:
+                continue
+
+            try:
+                Warmup._warm_connections()
+            except ERPError as e:
+                logger.warning("ERP keep-alive ping failed: %s", e)
+                # A failed call may not have touched the pool
+                time.sleep(interval)
+
+    @classmethod
+    def start(cls) -> None:
+        if settings.ERP_KEEPALIVE_INTERVAL <= 0 or cls._thread is not None:
+            return
+
+        cls._thread = threading.Thread(target=cls._run, name="erp-keepalive", daemon=True)
+        cls._thread.start()
@@ -1,44 +1,213 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Optional
+import time
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Iterator, Optional
 
 import requests
-from requests.adapters import HTTPAdapter
+from urllib3.exceptions import EmptyPoolError, NewConnectionError
 from urllib3.util.retry import Retry
 
 from app.core.config import settings
+from app.core.deadline import Deadline, current_deadline
+from app.integrations.erp_health import erp_health
+from app.integrations.erp_hedging import HedgeBudget, LatencyTracker, run_hedged
+from app.integrations.erp_pool import ERPPoolAdapter
+from app.integrations.erp_scheduler import ERPBusyError, ERPScheduler, erp_priority
 
 
 logger = logging.getLogger(__name__)
 
 
 class ERPError(Exception):
-    pass
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ERPUnavailableError(ERPError):
+    """
+    The call was never made: shed by the scheduler (503), out of
+    request deadline (504) or the client left (499). Services let it
+    through, so the client gets that status instead of a failure.
+    """
 
 
 # -----------------------------
-# Session with Retry (Production Ready)
+# Session (retries are done per call, within the request deadline;
+# pool size and metrics in erp_pool)
 # -----------------------------
 _session = requests.Session()
 
-retry_strategy = Retry(
-    total=3,
-    backoff_factor=0.5,
-    status_forcelist=[502, 503, 504],
-    allowed_methods=["GET", "POST", "PUT", "DELETE"],
-)
-
-adapter = HTTPAdapter(max_retries=retry_strategy)
+adapter = ERPPoolAdapter(max_retries=Retry(total=0, read=False, redirect=False))
 _session.mount("http://", adapter)
 _session.mount("https://", adapter)
 
+RETRY_STATUSES = {502, 503, 504}
+# Safe to repeat after a timeout or 5xx. A POST (new Sales Order, RFQ,
+# Customer) may have been committed even then, so it is only retried
+# when it provably never reached ERP.
+IDEMPOTENT_METHODS = {"GET", "PUT", "DELETE"}
+RETRY_BACKOFF = 0.5
+
+
+def _never_sent(exc: Exception) -> bool:
+    """
+    True for failures before the request left this process
+    (no free pooled connection, connect timeout, connection refused).
+    """
+
+    if isinstance(exc, (EmptyPoolError, requests.ConnectTimeout)):
+        return True
+
+    reason = getattr(exc.args[0], "reason", None) if exc.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _attempt_timeout(deadline: Optional[Deadline], method: str, path: str) -> float:
+    """
+    Timeout for the next attempt: ERP_TIMEOUT, cut to what is left of
+    the request's deadline. Raises when the client has gone or the
+    budget is spent.
+
+    Non-idempotent calls always get the full ERP_TIMEOUT once started:
+    timing out a create that ERP is still committing would only make
+    the caller retry it.
+    """
+
+    if deadline is None:
+        return settings.ERP_TIMEOUT
+
+    if deadline.cancelled.is_set():
+        raise ERPUnavailableError("Client disconnected", status_code=499)
+
+    remaining = deadline.remaining()
+
+    if remaining is None:
+        return settings.ERP_TIMEOUT
+
+    if remaining < settings.ERP_MIN_ATTEMPT_TIMEOUT:
+        logger.warning("ERP call skipped, deadline exceeded | %s %s", method, path)
+        raise ERPUnavailableError("Request deadline exceeded", status_code=504)
+
+    if method not in IDEMPOTENT_METHODS:
+        return settings.ERP_TIMEOUT
+
+    return min(settings.ERP_TIMEOUT, remaining)
+
+
+def _retry_delay(attempt: int, deadline: Optional[Deadline]) -> Optional[float]:
+    """
+    Backoff before retry number `attempt + 1`, or None when there is
+    no retry left or no budget to wait for it and still make the call.
+    """
+
+    if attempt >= settings.ERP_RETRIES:
+        return None
+
+    delay = RETRY_BACKOFF * (2 ** attempt)
+
+    if deadline is not None:
+        if deadline.cancelled.is_set():
+            return None
+
+        remaining = deadline.remaining()
+        if remaining is not None and remaining - delay < settings.ERP_MIN_ATTEMPT_TIMEOUT:
+            return None
+
+    return delay
+
+
+@contextmanager
+def _erp_slot(method: str, path: str, deadline: Optional[Deadline]) -> Iterator[None]:
+    """
+    Waits for a scheduler slot at the caller's priority,
+    never past the request deadline.
+    """
+
+    max_wait = deadline.remaining() if deadline is not None else None
+
+    try:
+        ERPScheduler.acquire(erp_priority.get(), max_wait=max_wait)
+    except ERPBusyError as e:
+        logger.warning("ERP call shed | %s %s | %s", method, path, e)
+        raise ERPUnavailableError(str(e), status_code=503)
+
+    try:
+        yield
+    finally:
+        ERPScheduler.release()
+
+
+# -----------------------------
+# Hedged GETs
+# -----------------------------
+get_latency = LatencyTracker()
+hedge_budget = HedgeBudget(ratio=settings.ERP_HEDGE_BUDGET)
+
+
+def _timed_get(send):
+    def attempt():
+        started = time.monotonic()
+        response = send()
+        if response.status_code < 500:
+            get_latency.record(time.monotonic() - started)
+        return response
+    return attempt
+
+
+def _send(method: str, send, deadline: Optional[Deadline], probe: bool = False):
+    """
+    One attempt. Idempotent GETs that are slower than the observed
+    ERP_HEDGE_PERCENTILE get a second, identical request (within the
+    hedge budget and only if a scheduler slot is free).
+
+    Probes (pings) are sent as-is: they are neither hedged nor
+    sampled, so keep-alives don't drag the hedge delay down.
+    """
+
+    if method != "GET" or probe:
+        return send()
+
+    attempt = _timed_get(send)
+    hedge_budget.earn()
+
+    hedge_after = get_latency.percentile(settings.ERP_HEDGE_PERCENTILE)
+
+    if not settings.ERP_HEDGE_ENABLED or hedge_after is None:
+        return attempt()
+
+    if deadline is not None:
+        remaining = deadline.remaining()
+        if remaining is not None and remaining - hedge_after < settings.ERP_MIN_ATTEMPT_TIMEOUT:
+            return attempt()
+
+    def start_hedge() -> bool:
+        if not ERPScheduler.try_acquire():
+            return False
+        if not hedge_budget.try_spend():
+            ERPScheduler.release()
+            return False
+        return True
+
+    return run_hedged(
+        attempt,
+        hedge_after=max(hedge_after, settings.ERP_HEDGE_MIN_DELAY),
+        start_hedge=start_hedge,
+        on_settled=ERPScheduler.release,
+        budget=hedge_budget,
+    )
+
 
 def erp_request(
     method: str,
     path: str,
     params: Optional[dict[str, Any]] = None,
     json: Optional[dict[str, Any]] = None,
+    probe: bool = False,
 ) -> dict[str, Any]:
 
     if not settings.ERP_BASE_URL:
@@ -54,18 +223,46 @@ def erp_request(
         "Accept": "application/json",
     }
 
-    try:
-        response = _session.request(
-            method=method.upper(),
-            url=url,
-            headers=headers,
-            params=params,
-            json=json,
-            timeout=getattr(settings, "ERP_TIMEOUT", 30),
-        )
-    except requests.RequestException:
-        logger.exception("ERP connection failed")
-        raise ERPError("ERP connection failed")
+    method = method.upper()
+    deadline = current_deadline.get()
+    attempt = 0
+
+    while True:
+        timeout = _attempt_timeout(deadline, method, path)
+
+        try:
+            with _erp_slot(method, path, deadline), erp_health.track() as result:
+                response = _send(
+                    method,
+                    partial(
+                        _session.request,
+                        method=method,
+                        url=url,
+                        headers=headers,
+                        params=params,
+                        json=json,
+                        timeout=timeout,
+                    ),
+                    deadline,
+                    probe,
+                )
+                result["ok"] = response.status_code < 500
+        except (requests.RequestException, EmptyPoolError) as e:
+            retryable = method in IDEMPOTENT_METHODS or _never_sent(e)
+            delay = _retry_delay(attempt, deadline) if retryable else None
+            if delay is None:
+                logger.exception("ERP connection failed")
+                raise ERPError("ERP connection failed")
+        else:
+            if response.status_code not in RETRY_STATUSES or method not in IDEMPOTENT_METHODS:
+                break
+
+            delay = _retry_delay(attempt, deadline)
+            if delay is None:
+                break
+
+        time.sleep(delay)
+        attempt += 1
 
     if response.status_code >= 400:
         logger.error(
@@ -75,10 +272,61 @@ def erp_request(
             response.status_code,
             response.text,
         )
-        raise ERPError(f"ERP error {response.status_code} - {response.text}")
+        raise ERPError(
+            f"ERP error {response.status_code} - {response.text}",
+            status_code=response.status_code,
+        )
 
     try:
         return response.json()
     except ValueError:
         logger.error("Invalid ERP JSON response")
         raise ERPError("Invalid ERP response")
+
+
+def erp_fetch_file(path: str, max_bytes: int) -> Optional[tuple[bytes, str]]:
+    """
+    Downloads a raw file (e.g. /files/photo.jpg) from ERP.
+    Returns (content, content_type), or None if ERP has no such file.
+    """
+
+    if not settings.ERP_BASE_URL:
+        raise ERPError("ERP_BASE_URL not configured.")
+
+    url = f"{settings.ERP_BASE_URL}{path}"
+    deadline = current_deadline.get()
+    timeout = _attempt_timeout(deadline, "GET", path)
+
+    with _erp_slot("GET", path, deadline):
+        try:
+            with erp_health.track() as result:
+                response = _session.get(
+                    url,
+                    stream=True,
+                    timeout=timeout,
+                )
+                result["ok"] = response.status_code < 500
+        except (requests.RequestException, EmptyPoolError):
+            logger.exception("ERP file download failed")
+            raise ERPError("ERP connection failed")
+
+        with response:
+            if response.status_code in (403, 404):
+                return None
+
+            if response.status_code >= 400:
+                logger.error("ERP file error | %s | %s", path, response.status_code)
+                raise ERPError(f"ERP error {response.status_code}", status_code=response.status_code)
+
+            chunks = []
+            size = 0
+
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ERPError("ERP file too large")
+                chunks.append(chunk)
+
+            content_type = response.headers.get("Content-Type", "application/octet-stream")
+
+    return b"".join(chunks), content_type.split(";")[0].strip()
@@ -0,0 +1,84 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from app.core.config import settings
+
+
+# -------------------------------------------------
+# ERP Health (load signal for admission control)
+# -------------------------------------------------
+class ERPHealth:
+    """
+    Moving average of how long ERP calls take, from every attempt of
+    every method. Failed attempts (errors, timeouts, 5xx) count as at
+    least ERP_HEALTH_FAILURE_PENALTY seconds, so an ERP that refuses
+    or drops calls quickly does not look fast.
+
+    Calls that are still running count too: with no recent sample,
+    the age of the oldest running call is the latency, so an ERP
+    where every call hangs reads as slow rather than idle.
+    """
+
+    def __init__(self, smoothing: float = 0.2):
+        self._smoothing = smoothing
+        self._average: Optional[float] = None
+        self._last_at: float = 0
+
+        self._running: Dict[int, float] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def _record(self, seconds: float) -> None:
+        if self._average is None:
+            self._average = seconds
+        else:
+            self._average += self._smoothing * (seconds - self._average)
+        self._last_at = time.monotonic()
+
+    @contextmanager
+    def track(self) -> Iterator[dict]:
+        """
+        Times one attempt. The caller sets result["ok"] = True once
+        ERP has answered with a non-5xx status.
+        """
+
+        call_id = next(self._ids)
+        started = time.monotonic()
+        result = {"ok": False}
+
+        with self._lock:
+            self._running[call_id] = started
+
+        try:
+            yield result
+        finally:
+            elapsed = time.monotonic() - started
+            if not result["ok"]:
+                elapsed = max(elapsed, settings.ERP_HEALTH_FAILURE_PENALTY)
+
+            with self._lock:
+                del self._running[call_id]
+                self._record(elapsed)
+
+    def latency(self, max_age: float) -> Optional[float]:
+        """
+        Recent average, the oldest running call's age when nothing
+        finished in `max_age` seconds, or None when ERP is idle.
+        """
+
+        now = time.monotonic()
+
+        with self._lock:
+            if self._average is not None and now - self._last_at <= max_age:
+                return self._average
+
+            if self._running:
+                return now - min(self._running.values())
+
+            return None
+
+
+erp_health = ERPHealth()
@@ -0,0 +1,144 @@
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Callable, Optional, TypeVar
+
+from app.core.config import settings
+
+
+T = TypeVar("T")
+
+
+# -------------------------------------------------
+# Latency Tracker
+# -------------------------------------------------
+class LatencyTracker:
+    """
+    Rolling window of ERP GET latencies with a cached percentile,
+    recomputed every `refresh_every` samples.
+    """
+
+    def __init__(self, window: int = 512, min_samples: int = 50, refresh_every: int = 32):
+        self._samples: deque = deque(maxlen=window)
+        self._min_samples = min_samples
+        self._refresh_every = refresh_every
+        self._since_refresh = 0
+        self._cached: dict = {}
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self._since_refresh += 1
+
+            if self._since_refresh >= self._refresh_every:
+                self._cached = {}
+                self._since_refresh = 0
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < self._min_samples:
+                return None
+
+            if pct not in self._cached:
+                ordered = sorted(self._samples)
+                index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+                self._cached[pct] = ordered[index]
+
+            return self._cached[pct]
+
+
+# -------------------------------------------------
+# Hedge Budget
+# -------------------------------------------------
+class HedgeBudget:
+    """
+    Token bucket: every GET earns `ratio` of a token, every hedge
+    spends one. Hedges can never exceed `ratio` of GET traffic
+    (plus a small burst).
+    """
+
+    def __init__(self, ratio: float, burst: float = 10):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+        self.sent = 0
+        self.won = 0
+
+    def earn(self) -> None:
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self.sent += 1
+            return True
+
+
+# Runs attempts that hold a scheduler slot. A losing first attempt
+# can outlive its caller's slot, hence the headroom over the cap.
+_hedge_pool = ThreadPoolExecutor(
+    max_workers=2 * settings.ERP_MAX_CONCURRENCY,
+    thread_name_prefix="erp-hedge",
+)
+
+
+def run_hedged(
+    attempt: Callable[[], T],
+    hedge_after: float,
+    start_hedge: Callable[[], bool],
+    on_settled: Callable[[], None],
+    budget: HedgeBudget,
+) -> T:
+    """
+    Runs `attempt`; if it has not answered after `hedge_after`
+    seconds and `start_hedge()` allows it, runs an identical second
+    attempt. The first successful answer wins; the loser finishes in
+    the background and `on_settled()` runs once both are done.
+    """
+
+    first = _hedge_pool.submit(attempt)
+
+    try:
+        return first.result(timeout=hedge_after)
+    except FutureTimeout:
+        pass
+
+    if not start_hedge():
+        return first.result()
+
+    second = _hedge_pool.submit(attempt)
+
+    unsettled = [2]
+    lock = threading.Lock()
+
+    def _settle(_) -> None:
+        with lock:
+            unsettled[0] -= 1
+            last = unsettled[0] == 0
+        if last:
+            on_settled()
+
+    first.add_done_callback(_settle)
+    second.add_done_callback(_settle)
+
+    pending = {first, second}
+    error: Optional[BaseException] = None
+
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            if future.exception() is None:
+                if future is second:
+                    budget.won += 1
+                return future.result()
+            error = future.exception()
+
+    raise error
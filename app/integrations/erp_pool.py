@@ -0,0 +1,146 @@
+import threading
+import time
+from typing import Any, Dict
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from app.core.config import settings
+
+
+# -------------------------------------------------
+# Pool Metrics
+# -------------------------------------------------
+class PoolStats:
+    """
+    Counters for the ERP connection pool (this worker).
+
+    checkouts   connections taken from the pool (one per request)
+    connects    TCP (+ TLS) connections opened; ideally far below checkouts
+    waits       checkouts that found the pool empty (ERP_POOL_BLOCK)
+    discarded   connections closed on return because the pool was full
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self.last_checkout = self.started_at
+
+        self.checkouts = 0
+        self.connects = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.discarded = 0
+        self.in_use = 0
+
+    def checked_out(self, waited: float | None) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.last_checkout = time.monotonic()
+            if waited is not None:
+                self.waits += 1
+                self.wait_seconds += waited
+
+    def returned(self, discarded: bool) -> None:
+        with self._lock:
+            self.in_use -= 1
+            if discarded:
+                self.discarded += 1
+
+    def connected(self) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def idle_for(self) -> float:
+        return time.monotonic() - self.last_checkout
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            uptime = max(time.monotonic() - self.started_at, 1e-9)
+
+            return {
+                "maxsize": settings.ERP_POOL_MAXSIZE,
+                "block": settings.ERP_POOL_BLOCK,
+                "in_use": self.in_use,
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "connects_per_min": round(self.connects * 60 / uptime, 3),
+                "reuse_ratio": (
+                    round(1 - self.connects / self.checkouts, 4) if self.checkouts else None
+                ),
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "discarded": self.discarded,
+            }
+
+
+pool_stats = PoolStats()
+
+
+# -------------------------------------------------
+# Instrumented urllib3 Classes
+# -------------------------------------------------
+class _CountingHTTPConnection(HTTPConnection):
+
+    def connect(self) -> None:
+        pool_stats.connected()
+        super().connect()
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+
+    def connect(self) -> None:
+        pool_stats.connected()
+        super().connect()
+
+
+class _InstrumentedPool:
+
+    def _get_conn(self, timeout=None):
+        # requests never passes a pool timeout; without one a blocking
+        # pool would wait forever
+        if timeout is None:
+            timeout = settings.ERP_POOL_TIMEOUT
+
+        if not (self.block and self.pool is not None and self.pool.empty()):
+            conn = super()._get_conn(timeout=timeout)
+            pool_stats.checked_out(None)
+            return conn
+
+        started = time.monotonic()
+        conn = super()._get_conn(timeout=timeout)
+        pool_stats.checked_out(time.monotonic() - started)
+        return conn
+
+    def _put_conn(self, conn) -> None:
+        discarded = self.pool is None or self.pool.full()
+        super()._put_conn(conn)
+        pool_stats.returned(discarded)
+
+
+class _HTTPPool(_InstrumentedPool, HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _HTTPSPool(_InstrumentedPool, HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class ERPPoolAdapter(HTTPAdapter):
+    """
+    HTTPAdapter sized from settings whose pools report to pool_stats.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(
+            pool_connections=1,  # ERP is a single host
+            pool_maxsize=settings.ERP_POOL_MAXSIZE,
+            pool_block=settings.ERP_POOL_BLOCK,
+            **kwargs,
+        )
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _HTTPPool, "https": _HTTPSPool}
@@ -0,0 +1,131 @@
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+
+# -------------------------------------------------
+# Priority Classes (lower runs first)
+# -------------------------------------------------
+CRITICAL = 0      # checkout, auth
+INTERACTIVE = 1   # profile, order history, customer lookups, webhooks
+BULK = 2          # catalog, export, images, background refreshes
+
+PRIORITY_NAMES = {CRITICAL: "critical", INTERACTIVE: "interactive", BULK: "bulk"}
+
+# Set per request by ERPPriorityMiddleware; threads started without a
+# request context (warm-up, refreshers) run as BULK
+erp_priority: contextvars.ContextVar[int] = contextvars.ContextVar("erp_priority", default=BULK)
+
+
+class ERPBusyError(Exception):
+    """
+    Raised when an ERP call waited longer than its class's queue timeout.
+    """
+
+
+def _queue_timeout(priority: int) -> float:
+    return {
+        CRITICAL: settings.ERP_QUEUE_TIMEOUT_CRITICAL,
+        INTERACTIVE: settings.ERP_QUEUE_TIMEOUT_INTERACTIVE,
+    }.get(priority, settings.ERP_QUEUE_TIMEOUT_BULK)
+
+
+# -------------------------------------------------
+# ERP Scheduler
+# -------------------------------------------------
+class ERPScheduler:
+    """
+    Caps concurrent ERP calls and hands free slots to the highest
+    priority waiter first (FIFO within a class).
+
+    Each class gives up after its own queue timeout; bulk work has
+    the shortest, so it is shed first when ERP is saturated.
+    """
+
+    _cond = threading.Condition()
+    _active: int = 0
+    # [priority, seq, state]; state: 0 waiting, 1 granted, 2 abandoned
+    _waiting: List[list] = []
+    _seq = itertools.count()
+
+    _shed: Dict[int, int] = {p: 0 for p in PRIORITY_NAMES}
+
+    @classmethod
+    def acquire(cls, priority: int, max_wait: Optional[float] = None) -> None:
+        timeout = _queue_timeout(priority)
+        if max_wait is not None:
+            timeout = min(timeout, max_wait)
+
+        deadline = time.monotonic() + timeout
+
+        with cls._cond:
+            while cls._waiting and cls._waiting[0][2] == 2:
+                heapq.heappop(cls._waiting)
+
+            if cls._active < settings.ERP_MAX_CONCURRENCY and not cls._waiting:
+                cls._active += 1
+                return
+
+            ticket = [priority, next(cls._seq), 0]
+            heapq.heappush(cls._waiting, ticket)
+
+            while ticket[2] == 0:
+                remaining = deadline - time.monotonic()
+
+                if remaining <= 0:
+                    ticket[2] = 2
+                    cls._shed[priority] = cls._shed.get(priority, 0) + 1
+                    raise ERPBusyError(
+                        f"ERP busy ({PRIORITY_NAMES.get(priority, priority)} queue timeout)"
+                    )
+
+                cls._cond.wait(remaining)
+
+    @classmethod
+    def try_acquire(cls) -> bool:
+        """
+        Takes a slot only if one is free and nobody is queued
+        (used for optional extra work such as hedged requests).
+        """
+
+        with cls._cond:
+            while cls._waiting and cls._waiting[0][2] == 2:
+                heapq.heappop(cls._waiting)
+
+            if cls._active < settings.ERP_MAX_CONCURRENCY and not cls._waiting:
+                cls._active += 1
+                return True
+
+            return False
+
+    @classmethod
+    def release(cls) -> None:
+        with cls._cond:
+            # Hand the slot straight to the next live waiter
+            while cls._waiting:
+                ticket = heapq.heappop(cls._waiting)
+                if ticket[2] == 0:
+                    ticket[2] = 1
+                    cls._cond.notify_all()
+                    return
+
+            cls._active -= 1
+
+    @classmethod
+    def stats(cls) -> Dict[str, Dict[str, int]]:
+        with cls._cond:
+            queued = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _, state in cls._waiting:
+                if state == 0:
+                    queued[PRIORITY_NAMES[priority]] += 1
+
+            return {
+                "active": {"total": cls._active},
+                "queued": queued,
+                "shed": {PRIORITY_NAMES[p]: n for p, n in cls._shed.items()},
+            }
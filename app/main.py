@@ -1,6 +1,8 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 
 # Rate Limiting (from separate module — NO circular import)
@@ -9,7 +11,17 @@ from slowapi.middleware import SlowAPIMiddleware
 from slowapi.errors import RateLimitExceeded
 
 from app.core.config import settings
+from app.core.admission import AdmissionControl, AdmissionMiddleware
+from app.core.compression import CompressionMiddleware
+from app.core.deadline import DeadlineMiddleware
+from app.core.request_priority import ERPPriorityMiddleware
+from app.core.responses import FastJSONResponse
 from app.core.site_control import SiteControl
+from app.integrations.erp_client import ERPError
+from app.core.warmup import ConnectionKeepAlive, Warmup
+from app.services.cache_invalidation import CacheEvents
+from app.services.catalog_snapshot import CatalogRefresher
+from app.services.customer_service import CustomerPhones
 
 from app.api.items import router as items_router
 from app.api.orders import router as orders_router
@@ -17,12 +29,39 @@ from app.api.customers import router as customers_router
 from app.api.contact import router as contact_router
 from app.api.auth import router as auth_router
 from app.api.profile import router as profile_router
+from app.api.images import router as images_router
+from app.api.webhooks import router as webhooks_router
+from app.api.metrics import router as metrics_router
 from app.api import order_history
+# -------------------------------------------------
+# Lifespan (Startup Warm-up)
+# -------------------------------------------------
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in the background; /ready reports when it is done
+    Warmup.start()
+    # Keeps pooled ERP connections open through quiet periods
+    ConnectionKeepAlive.start()
+    # Applies ERP webhook events to this worker's caches
+    CacheEvents.start()
+    # One worker per host (lock file) publishes the shared catalog snapshot
+    CatalogRefresher.start()
+    # Lets /customer/exists answer unknown numbers without ERP
+    # (synced by one worker per host, loaded by the others)
+    CustomerPhones.start()
+    yield
+
+
 # -------------------------------------------------
 # Create FastAPI App
 # -------------------------------------------------
 
-app = FastAPI(title="AL HADAS Ecommerce Middleware")
+app = FastAPI(
+    title="AL HADAS Ecommerce Middleware",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
+)
 
 
 # -------------------------------------------------
@@ -41,16 +80,51 @@ def rate_limit_handler(request: Request, exc: RateLimitExceeded):
     )
 
 
+# -------------------------------------------------
+# ERP Errors (shed, deadline, client gone)
+# -------------------------------------------------
+
+@app.exception_handler(ERPError)
+def erp_error_handler(request: Request, exc: ERPError):
+    # Shed by the scheduler (or ERP itself is overloaded): back off
+    if exc.status_code == 503:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Server is busy. Please retry shortly."},
+            headers={"Retry-After": str(AdmissionControl.retry_after())},
+        )
+
+    if exc.status_code == 504:
+        return JSONResponse(
+            status_code=504,
+            content={"detail": "Request timed out. Please retry."},
+        )
+
+    # Client disconnected: nobody is reading, just close
+    if exc.status_code == 499:
+        return Response(status_code=499)
+
+    return JSONResponse(
+        status_code=502,
+        content={"detail": "ERP service error. Please try again later."},
+    )
+
+
 # -------------------------------------------------
 # Store Freeze Middleware (Backend Protection)
 # -------------------------------------------------
 
+# Probes and metrics must answer even when the store is frozen or ERP
+# is down, and ERP must be able to push changes (e.g. un-freezing the store)
+ALWAYS_ALLOWED_PATHS = {"/health", "/ready", "/internal/metrics", "/webhooks/erp"}
+
+
 class StoreFreezeMiddleware(BaseHTTPMiddleware):
 
     async def dispatch(self, request, call_next):
 
-        # Always allow health check
-        if request.url.path == "/health":
+        # Always allow health / readiness checks
+        if request.url.path in ALWAYS_ALLOWED_PATHS:
             return await call_next(request)
 
         # Check ERP Store Visibility
@@ -75,6 +149,15 @@ class StoreFreezeMiddleware(BaseHTTPMiddleware):
 
 app.add_middleware(StoreFreezeMiddleware)
 
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+)
+
+# Sheds load before any work (incl. the store-freeze ERP check) but
+# inside CORS, so browsers can read the 503
+app.add_middleware(AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_ORIGINS if settings.ALLOWED_ORIGINS != ["*"] else ["*"],
@@ -83,6 +166,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost: every ERP call made for the request (including the
+# store-freeze check) runs at the route's priority and deadline
+app.add_middleware(DeadlineMiddleware)
+app.add_middleware(ERPPriorityMiddleware)
+
 
 # -------------------------------------------------
 # Store Status Endpoint
@@ -109,6 +197,9 @@ app.include_router(items_router)
 app.include_router(orders_router)
 app.include_router(customers_router)
 app.include_router(contact_router)
+app.include_router(images_router)
+app.include_router(webhooks_router)
+app.include_router(metrics_router)
 app.include_router(auth_router)
 app.include_router(profile_router, prefix="/api")
 app.include_router(order_history.router, prefix="/api")
@@ -123,3 +214,16 @@ def health():
         "status": "ok",
         "message": "AL HADAS Ecommerce middleware is running",
     }
+
+
+# -------------------------------------------------
+# Readiness (Load Balancer)
+# -------------------------------------------------
+
+@app.get("/ready")
+def ready():
+    status = Warmup.status()
+    return JSONResponse(
+        status_code=200 if status["ready"] else 503,
+        content=status,
+    )
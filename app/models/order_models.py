@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
-from app.models.customer_models import CustomerCreateOrUseIn
+from app.models.customer_models import AddressIn, CustomerCreateOrUseIn
 
 
 class CartItemIn(BaseModel):
@@ -8,6 +8,26 @@ class CartItemIn(BaseModel):
     qty: float = Field(..., gt=0)
 
 
+class QuoteIn(BaseModel):
+    cart: List[CartItemIn]
+
+
 class PlaceOrderIn(CustomerCreateOrUseIn):
     cart: List[CartItemIn]
-    notes: Optional[str] = ""
\ No newline at end of file
+    notes: Optional[str] = ""
+
+    # From /checkout/quote; skips re-pricing while valid
+    quote_token: Optional[str] = None
+
+
+class BulkOrderIn(BaseModel):
+    cart: List[CartItemIn]
+    notes: Optional[str] = ""
+
+    # Per-order delivery address (falls back to the customer address)
+    address: Optional[AddressIn] = None
+
+
+class PlaceOrdersIn(CustomerCreateOrUseIn):
+    orders: List[BulkOrderIn] = Field(..., min_length=1)
+    quote_token: Optional[str] = None
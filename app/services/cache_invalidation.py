@@ -0,0 +1,312 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.site_control import SiteControl
+from app.integrations.erp_client import erp_request, ERPError
+from app.integrations.erp_scheduler import BULK, erp_priority
+from app.services.catalog_snapshot import CatalogRefresher
+from app.services.customer_service import CustomerPhones
+from app.services.facet_service import FACET_FIELDS, CatalogFacets
+from app.services.item_service import clear_product_cache
+from app.services.order_detail_service import ORDER_DOCTYPES, clear_order_detail
+from app.services.order_service import forget_item_price
+from app.services.profile_service import clear_profile_cache, forget_customer_profile
+
+
+logger = get_logger(__name__)
+
+WEBHOOK_DOCTYPES = {
+    "Item",
+    "Item Price",
+    "Customer",
+    "E-Commerce Settings",
+    *ORDER_DOCTYPES.values(),
+}
+
+# Event log is rotated once it grows past this size
+MAX_EVENT_LOG_BYTES = 1024 * 1024
+
+# Events carry customer phone numbers: owner-only
+EVENT_LOG_MODE = 0o600
+
+
+def verify_signature(body: bytes, signature: Optional[str]) -> bool:
+    """
+    Checks Frappe's X-Frappe-Webhook-Signature header:
+    base64(HMAC-SHA256(webhook secret, raw body)).
+    """
+
+    if not settings.ERP_WEBHOOK_SECRET or not signature:
+        return False
+
+    expected = base64.b64encode(
+        hmac.new(settings.ERP_WEBHOOK_SECRET.encode(), body, hashlib.sha256).digest()
+    ).decode()
+
+    return hmac.compare_digest(expected, signature)
+
+
+# -------------------------------------------------
+# Cache Events
+# -------------------------------------------------
+class CacheEvents:
+    """
+    Push-based invalidation for ERP-derived caches.
+
+    The worker that receives a webhook debounces the burst, fetches
+    each changed document once and appends it to a host-wide event
+    log. Every worker tails that log and updates its own caches.
+    """
+
+    _pending: Dict[tuple, Optional[str]] = {}
+    _timer: Optional[threading.Timer] = None
+    _lock = threading.Lock()
+
+    _offset: int = 0
+    _inode: Optional[int] = None
+    _poller: Optional[threading.Thread] = None
+
+    # -----------------------------
+    # Receiving Worker
+    # -----------------------------
+    @classmethod
+    def enqueue(cls, doctype: str, name: str, item_code: Optional[str] = None) -> None:
+        with cls._lock:
+            cls._pending[(doctype, name)] = item_code
+
+            if cls._timer is None:
+                cls._timer = threading.Timer(settings.WEBHOOK_DEBOUNCE_SECONDS, cls._flush)
+                cls._timer.daemon = True
+                cls._timer.start()
+
+    @classmethod
+    def _flush(cls) -> None:
+        # Runs on the debounce timer thread, outside any request
+        erp_priority.set(BULK)
+
+        with cls._lock:
+            pending, cls._pending = cls._pending, {}
+            cls._timer = None
+
+        events = []
+
+        for (doctype, name), item_code in pending.items():
+            try:
+                events.append(cls._resolve(doctype, name, item_code))
+            except Exception:
+                logger.exception("Webhook event failed: %s %s", doctype, name)
+
+        if events:
+            cls._append(events)
+
+    @staticmethod
+    def _resolve(doctype: str, name: str, item_code: Optional[str]) -> Dict[str, Any]:
+        """
+        Builds a log event, with the fresh document when we need it.
+        Events without "data" only mark caches stale.
+        """
+
+        if doctype == "Item Price":
+            if not item_code:
+                res = erp_request("GET", f"/api/resource/Item Price/{name}")
+                item_code = (res.get("data") or {}).get("item_code")
+            if not item_code:
+                return {"doctype": "Item", "name": name}
+            doctype, name = "Item", item_code
+
+        if doctype == "Item":
+            try:
+                doc = erp_request("GET", f"/api/resource/Item/{name}").get("data") or {}
+            except ERPError as e:
+                if e.status_code != 404:
+                    return {"doctype": doctype, "name": name}
+                doc = None
+
+            data = {f: doc.get(f) for f in FACET_FIELDS} if doc else None
+            return {"doctype": doctype, "name": name, "data": data}
+
+        if doctype == "Customer":
+            try:
+                doc = erp_request("GET", f"/api/resource/Customer/{name}").get("data") or {}
+            except ERPError as e:
+                if e.status_code != 404:
+                    return {"doctype": doctype, "name": name}
+                doc = None
+
+            data = {"custom_phone_number": doc.get("custom_phone_number")} if doc else None
+            return {"doctype": doctype, "name": name, "data": data}
+
+        if doctype == "E-Commerce Settings":
+            if name != SiteControl.SETTINGS_NAME:
+                return {"doctype": doctype, "name": name, "ignore": True}
+            try:
+                res = erp_request("GET", f"/api/resource/E-Commerce Settings/{name}")
+            except ERPError:
+                return {"doctype": doctype, "name": name}
+            return {"doctype": doctype, "name": name, "data": res.get("data") or {}}
+
+        return {"doctype": doctype, "name": name}
+
+    @classmethod
+    def publish(cls, events: List[Dict[str, Any]]) -> None:
+        """
+        Appends events for changes made here (not pushed by ERP), so
+        every worker applies them, with or without webhooks.
+        """
+
+        try:
+            cls._append(events)
+        except OSError:
+            logger.exception("Could not publish cache events")
+
+    @staticmethod
+    def _append(events: List[Dict[str, Any]]) -> None:
+        path = settings.CACHE_EVENT_LOG
+
+        try:
+            if os.path.getsize(path) > MAX_EVENT_LOG_BYTES:
+                # Readers see the new inode and resync fully
+                os.close(os.open(f"{path}.new", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, EVENT_LOG_MODE))
+                os.replace(f"{path}.new", path)
+        except FileNotFoundError:
+            pass
+
+        data = "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in events)
+
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, EVENT_LOG_MODE)
+        try:
+            os.write(fd, data.encode())
+        finally:
+            os.close(fd)
+
+    # -----------------------------
+    # Every Worker
+    # -----------------------------
+    @classmethod
+    def _read_new(cls) -> Optional[List[Dict[str, Any]]]:
+        """
+        Returns events appended since the last read,
+        or None when the log was rotated (caller resyncs fully).
+        """
+
+        try:
+            stat = os.stat(settings.CACHE_EVENT_LOG)
+        except FileNotFoundError:
+            # Log not created yet: read it from the start once it is
+            cls._inode, cls._offset = 0, 0
+            return []
+
+        if cls._inode is None:
+            # First poll: only events from now on matter
+            cls._inode, cls._offset = stat.st_ino, stat.st_size
+            return []
+
+        if cls._inode == 0:
+            cls._inode = stat.st_ino
+
+        if stat.st_ino != cls._inode or stat.st_size < cls._offset:
+            cls._inode, cls._offset = stat.st_ino, 0
+            return None
+
+        if stat.st_size == cls._offset:
+            return []
+
+        with open(settings.CACHE_EVENT_LOG, "rb") as fh:
+            fh.seek(cls._offset)
+            chunk = fh.read(stat.st_size - cls._offset)
+
+        # Only consume complete lines
+        end = chunk.rfind(b"\n") + 1
+        cls._offset += end
+
+        events = []
+        for line in chunk[:end].splitlines():
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+
+        return events
+
+    @classmethod
+    def apply(cls, events: List[Dict[str, Any]]) -> None:
+        # Last event per document wins
+        latest = {(e.get("doctype"), e.get("name")): e for e in events}
+        catalog_changed = False
+
+        for (doctype, name), event in latest.items():
+            if event.get("ignore"):
+                continue
+
+            if doctype == "Item":
+                catalog_changed = True
+                forget_item_price(name)
+                if "data" not in event:
+                    CatalogFacets.mark_stale()
+                elif event["data"] is None:
+                    CatalogFacets.remove_item(name)
+                else:
+                    CatalogFacets.apply_item(event["data"], advance_watermark=False)
+
+            elif doctype in ORDER_DOCTYPES.values():
+                clear_order_detail(doctype, name)
+
+            elif doctype == "Customer":
+                forget_customer_profile(name)
+                if "data" in event:
+                    CustomerPhones.apply_customer(name, event["data"])
+                else:
+                    CustomerPhones.mark_stale()
+
+            elif doctype == "E-Commerce Settings":
+                catalog_changed = True
+                if event.get("data") is not None:
+                    SiteControl.set_settings(event["data"])
+                else:
+                    SiteControl.invalidate()
+
+        # Any edit moves an item to the top of `modified desc` listings,
+        # so every cached page is affected
+        if catalog_changed:
+            clear_product_cache()
+            CatalogRefresher.request_refresh()
+
+    @classmethod
+    def _resync(cls) -> None:
+        SiteControl.invalidate()
+        CatalogFacets.mark_stale()
+        clear_product_cache()
+        clear_profile_cache()
+        CustomerPhones.mark_stale()
+
+    @classmethod
+    def poll(cls) -> None:
+        events = cls._read_new()
+
+        if events is None:
+            cls._resync()
+        elif events:
+            cls.apply(events)
+
+    @classmethod
+    def _run(cls) -> None:
+        while True:
+            try:
+                cls.poll()
+            except Exception:
+                logger.exception("Cache event poll failed")
+            time.sleep(settings.WEBHOOK_DEBOUNCE_SECONDS)
+
+    @classmethod
+    def start(cls) -> None:
+        if cls._poller is None:
+            cls._poller = threading.Thread(target=cls._run, name="cache-events", daemon=True)
+            cls._poller.start()
@@ -0,0 +1,249 @@
+import fcntl
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.site_control import SiteControl
+from app.core.snapshot import Snapshot, write_snapshot
+from app.integrations.erp_client import erp_request
+from app.services.ecommerce.catalog_item import CatalogItem
+from app.services.facet_service import FACET_FIELDS, CatalogFacets
+from app.services.item_service import ITEM_FIELDS, _catalog_filters, iter_catalog_items
+
+
+logger = get_logger(__name__)
+
+# Everything /products and the facets read from a record
+SNAPSHOT_FIELDS = list(dict.fromkeys(ITEM_FIELDS + FACET_FIELDS + ["name", "modified"]))
+
+
+# -------------------------------------------------
+# Catalog Refresher (one per host)
+# -------------------------------------------------
+class CatalogRefresher:
+    """
+    Polls ERP for settings and catalog changes and publishes them as
+    a shared snapshot (see app.core.snapshot).
+
+    Whichever process holds the lock file is the refresher: one
+    uvicorn worker, or `python -m app.services.catalog_snapshot` run
+    next to them. ERP polling stays the same however many workers
+    the host runs.
+    """
+
+    # item_code -> ERP row (listed items only)
+    _items: Dict[str, CatalogItem] = {}
+    _site_settings: Optional[Dict[str, Any]] = None
+    _watermark: str = ""
+    _last_rebuild: float = 0
+    _resumed: bool = False
+
+    _lock_fd: Optional[int] = None
+    _wake = threading.Event()
+    _thread: Optional[threading.Thread] = None
+
+    # -----------------------------
+    # Leadership
+    # -----------------------------
+    @classmethod
+    def _acquire(cls) -> bool:
+        if cls._lock_fd is not None:
+            return True
+
+        fd = os.open(f"{settings.CATALOG_SNAPSHOT_PATH}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+
+        # Released by the OS if this process dies; another one takes over
+        cls._lock_fd = fd
+        logger.info("Catalog snapshot refresher running in pid %s", os.getpid())
+        return True
+
+    # -----------------------------
+    # ERP Sync
+    # -----------------------------
+    @classmethod
+    def _rebuild(cls) -> None:
+        items = {}
+        watermark = ""
+
+        for row in iter_catalog_items(_catalog_filters(), SNAPSHOT_FIELDS):
+            items[row["item_code"]] = CatalogItem.from_row(row)
+            watermark = max(watermark, str(row.get("modified") or ""))
+
+        cls._items = items
+        cls._watermark = watermark
+        cls._last_rebuild = time.time()
+
+    @classmethod
+    def _resume(cls) -> bool:
+        """
+        Cold start: reload the last published snapshot from disk so
+        the next poll is a delta from its watermark, not a full pull.
+        Only if it has exactly SNAPSHOT_FIELDS; a delta would never
+        fill in fields added since.
+        """
+
+        try:
+            snapshot = Snapshot(settings.CATALOG_SNAPSHOT_PATH)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError):
+            logger.warning("Ignoring unreadable catalog snapshot; doing a full rebuild")
+            return False
+
+        # Written by a build with other fields: rows would lack some
+        if snapshot.fields != SNAPSHOT_FIELDS:
+            logger.warning("Catalog snapshot fields changed; doing a full rebuild")
+            return False
+
+        cls._items = {row["item_code"]: CatalogItem.from_row(row) for row in snapshot.records()}
+        cls._site_settings = snapshot.site_settings
+        cls._watermark = snapshot.watermark
+        cls._last_rebuild = snapshot.rebuilt_at
+
+        logger.info(
+            "Resumed catalog snapshot %s (%s items, watermark %s)",
+            snapshot.version, len(cls._items), cls._watermark,
+        )
+        return True
+
+    @classmethod
+    def _apply_delta(cls) -> bool:
+        """
+        Applies items modified since the watermark, including
+        disabled ones so they drop out. Returns True on any change.
+
+        Re-reads CATALOG_SYNC_OVERLAP seconds before the watermark
+        (same-timestamp and late-committed items); rows already held
+        at the same `modified` are skipped, so the overlap alone never
+        publishes a new version.
+        """
+
+        since = cls._watermark
+        try:
+            since = str(
+                datetime.fromisoformat(cls._watermark)
+                - timedelta(seconds=settings.CATALOG_SYNC_OVERLAP)
+            )
+        except ValueError:
+            pass
+
+        changed = False
+
+        for row in iter_catalog_items([["modified", ">=", since]], SNAPSHOT_FIELDS):
+            code = row.get("item_code")
+            if not code:
+                continue
+
+            modified = str(row.get("modified") or "")
+            current = cls._items.get(code)
+
+            if CatalogFacets._is_listed(row):
+                if current is not None and current.modified == modified:
+                    continue
+                cls._items[code] = CatalogItem.from_row(row)
+            elif cls._items.pop(code, None) is None:
+                continue
+
+            cls._watermark = max(cls._watermark, modified)
+            changed = True
+
+        return changed
+
+    @classmethod
+    def refresh_once(cls) -> None:
+        resumed = False
+        if not cls._resumed:
+            cls._resumed = True
+            resumed = cls._resume()
+
+        res = erp_request(
+            method="GET",
+            path=f"/api/resource/E-Commerce Settings/{SiteControl.SETTINGS_NAME}",
+        )
+        site_settings = res.get("data") or {}
+
+        changed = site_settings != cls._site_settings
+        cls._site_settings = site_settings
+
+        # Deleted items never show up in a delta — rebuild periodically
+        rebuild_due = not cls._watermark or (time.time() - cls._last_rebuild) >= settings.FACETS_REBUILD_INTERVAL
+
+        if rebuild_due and not resumed:
+            cls._rebuild()
+            changed = True
+        else:
+            if cls._apply_delta():
+                changed = True
+            if rebuild_due:
+                # Resumed after a long stop: publish the delta first, so
+                # workers keep reading the snapshot instead of ERP, and
+                # rebuild on the next tick
+                cls._wake.set()
+
+        path = settings.CATALOG_SNAPSHOT_PATH
+
+        if changed or not os.path.exists(path):
+            version = write_snapshot(
+                path,
+                cls._items.values(),
+                SNAPSHOT_FIELDS,
+                site_settings,
+                cls._watermark,
+                cls._last_rebuild,
+            )
+            logger.info("Published catalog snapshot %s (%s items)", version, len(cls._items))
+        else:
+            # Tells readers the snapshot is still current
+            os.utime(path)
+
+    # -----------------------------
+    # Runner
+    # -----------------------------
+    @classmethod
+    def _run(cls) -> None:
+        while True:
+            try:
+                if cls._acquire():
+                    cls.refresh_once()
+            except Exception:
+                logger.exception("Catalog snapshot refresh failed")
+
+            cls._wake.wait(settings.CATALOG_SNAPSHOT_INTERVAL)
+            cls._wake.clear()
+
+    @classmethod
+    def start(cls) -> None:
+        if settings.CATALOG_SNAPSHOT_PATH and cls._thread is None:
+            cls._thread = threading.Thread(target=cls._run, name="catalog-snapshot", daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def request_refresh(cls) -> None:
+        # Webhook events: publish without waiting for the next poll
+        if cls._lock_fd is not None:
+            cls._wake.set()
+
+
+def main() -> None:
+    if not settings.CATALOG_SNAPSHOT_PATH:
+        raise SystemExit("CATALOG_SNAPSHOT_PATH is not configured.")
+
+    # Webhook events wake the refresher here too
+    from app.services.cache_invalidation import CacheEvents
+    CacheEvents.start()
+
+    CatalogRefresher._run()
+
+
+if __name__ == "__main__":
+    main()
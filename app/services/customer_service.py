@@ -1,40 +1,393 @@
-from typing import Dict, Any
+import fcntl
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator, List, Optional, Set
 
 from fastapi import HTTPException
 
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.logger import get_logger
 from app.core.site_control import SiteControl
-from app.integrations.erp_client import erp_request, ERPError
+from app.integrations.erp_client import erp_request, ERPError, ERPUnavailableError
+
+
+logger = get_logger(__name__)
 
 
 class CustomerError(ValueError):
     pass
 
 
+# Customer fields behind a profile
+CUSTOMER_FIELDS = '["name","customer_name","custom_phone_number","custom_email","custom_vat_registration_number"]'
+
+
 # -------------------------------------------------
 # Find Customer by Phone (Legacy Support)
 # -------------------------------------------------
-def _find_customer_by_phone(phone: str) -> str | None:
+def _find_customer_doc_by_phone(phone: str) -> Dict[str, Any] | None:
     try:
         res = erp_request(
             "GET",
             "/api/resource/Customer",
             params={
                 "filters": f'[["custom_phone_number","=","{phone}"]]',
-                "fields": '["name"]',
+                "fields": CUSTOMER_FIELDS,
                 "limit_page_length": 1,
             },
         )
+    except ERPUnavailableError:
+        raise
     except ERPError:
         raise CustomerError("Customer service temporarily unavailable.")
 
     data = res.get("data") or []
 
     if data:
-        return data[0]["name"]
+        return data[0]
 
     return None
 
 
+def _find_customer_by_phone(phone: str) -> str | None:
+    existing = _find_customer_doc_by_phone(phone)
+    return existing["name"] if existing else None
+
+
+# -------------------------------------------------
+# Customer Phone Index (negative lookups)
+# -------------------------------------------------
+def _normalize_phone(phone: Any) -> str:
+    return str(phone).strip()
+
+
+class CustomerPhones:
+    """
+    Set of every customer phone number in ERP, so lookups for unknown
+    numbers (most /customer/exists probes) are answered locally.
+
+    One process per host (whichever holds the lock file, like
+    CatalogRefresher) builds the set in one pass, keeps it current
+    from customers changed around or after the last `modified` seen,
+    and publishes it to CUSTOMER_PHONE_INDEX_PATH. Other workers load
+    that file instead of paging ERP themselves, and add numbers from
+    Customer webhooks and customers created here. Numbers in the set
+    are confirmed against ERP (and cached); the set is only trusted
+    for misses while it is fresh.
+
+    A miss can still lag a customer created in another worker by up
+    to one sync, so it only backs the read-only /customer/exists
+    probe. Paths that create customers always ask ERP.
+    """
+
+    _phones: Set[str] = set()
+    _watermark: str = ""
+    _last_rebuild: float = 0
+    _last_refresh: float = 0
+
+    # Numbers added here, kept across loads until the syncing
+    # process has had time to see them
+    _recent: Dict[str, float] = {}
+
+    # phone -> customer_id, and customer_id -> phone for webhooks
+    _confirmed = TTLCache(ttl=settings.CUSTOMER_PHONE_CACHE_TTL, maxsize=4096)
+    _confirmed_phones = TTLCache(ttl=settings.CUSTOMER_PHONE_CACHE_TTL, maxsize=4096)
+
+    _lock_fd: Optional[int] = None
+    _loaded: Optional[tuple] = None
+    _stale_at: float = 0
+
+    _thread: Optional[threading.Thread] = None
+    _wake = threading.Event()
+    _lock = threading.Lock()
+
+    # -----------------------------
+    # Leadership
+    # -----------------------------
+    @classmethod
+    def _acquire(cls) -> bool:
+        """
+        True in the one process per host that syncs from ERP
+        (every process when the index is not shared).
+        """
+
+        path = settings.CUSTOMER_PHONE_INDEX_PATH
+
+        if not path or cls._lock_fd is not None:
+            return True
+
+        fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+
+        # Released by the OS if this process dies; another one takes over
+        cls._lock_fd = fd
+        logger.info("Customer phone index sync running in pid %s", os.getpid())
+        return True
+
+    # -----------------------------
+    # ERP Sync
+    # -----------------------------
+    @staticmethod
+    def _iter_customers(filters: List[Any]) -> Iterator[Dict[str, Any]]:
+        # Seeks by `name`, like iter_catalog_items()
+        last_name = None
+
+        while True:
+            chunk_filters = list(filters)
+
+            if last_name is not None:
+                chunk_filters.append(["name", ">", last_name])
+
+            response = erp_request(
+                "GET",
+                "/api/resource/Customer",
+                params={
+                    "filters": json.dumps(chunk_filters),
+                    "fields": '["name","custom_phone_number","modified"]',
+                    "limit_page_length": settings.CUSTOMER_PHONE_SYNC_CHUNK,
+                    "order_by": "name asc",
+                },
+            )
+
+            chunk = response.get("data", []) or []
+
+            yield from chunk
+
+            if len(chunk) < settings.CUSTOMER_PHONE_SYNC_CHUNK:
+                return
+
+            last_name = chunk[-1]["name"]
+
+    @classmethod
+    def rebuild(cls) -> None:
+        # Lookups keep using the old set until the new one is complete
+        phones: Set[str] = set()
+        watermark = ""
+
+        for customer in cls._iter_customers([["custom_phone_number", "is", "set"]]):
+            if customer.get("custom_phone_number"):
+                phones.add(_normalize_phone(customer["custom_phone_number"]))
+            watermark = max(watermark, str(customer.get("modified") or ""))
+
+        with cls._lock:
+            cls._phones = phones
+            cls._watermark = watermark
+            cls._last_rebuild = cls._last_refresh = time.time()
+
+        logger.info("Customer phone index built: %d numbers", len(phones))
+
+    @classmethod
+    def refresh(cls) -> None:
+        """
+        Adds numbers of customers changed since the watermark, minus
+        CUSTOMER_PHONE_SYNC_OVERLAP: a transaction can commit after
+        a later one with an earlier `modified`. Numbers that were
+        removed stay until the next rebuild, which only costs a
+        confirmation call.
+        """
+
+        since = cls._watermark
+        try:
+            since = str(
+                datetime.fromisoformat(cls._watermark)
+                - timedelta(seconds=settings.CUSTOMER_PHONE_SYNC_OVERLAP)
+            )
+        except ValueError:
+            pass
+
+        for customer in cls._iter_customers([["modified", ">=", since]]):
+            with cls._lock:
+                if customer.get("custom_phone_number"):
+                    cls._phones.add(_normalize_phone(customer["custom_phone_number"]))
+
+                modified = str(customer.get("modified") or "")
+                if modified > cls._watermark:
+                    cls._watermark = modified
+
+        cls._last_refresh = time.time()
+
+    @classmethod
+    def sync(cls) -> None:
+        # Removed numbers never show up in a delta — rebuild periodically
+        if not cls._watermark or (time.time() - cls._last_rebuild) >= settings.CUSTOMER_PHONE_REBUILD_INTERVAL:
+            cls.rebuild()
+        else:
+            cls.refresh()
+
+        cls._publish()
+
+    # -----------------------------
+    # Shared Index File
+    # -----------------------------
+    @classmethod
+    def _publish(cls) -> None:
+        path = settings.CUSTOMER_PHONE_INDEX_PATH
+        if not path:
+            return
+
+        with cls._lock:
+            data = {
+                "watermark": cls._watermark,
+                "rebuilt_at": cls._last_rebuild,
+                "phones": sorted(cls._phones),
+            }
+
+        # Phone numbers: owner-only; readers only ever see whole files
+        tmp = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as fh:
+            json.dump(data, fh, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def _load(cls) -> None:
+        """
+        Picks up the syncing process's last publish. Its mtime is
+        when that process last synced, so a stalled sync makes the
+        set stale here too.
+        """
+
+        try:
+            stat = os.stat(settings.CUSTOMER_PHONE_INDEX_PATH)
+        except FileNotFoundError:
+            return
+
+        # Every publish is a new file (inode numbers can be reused)
+        if (stat.st_ino, stat.st_mtime_ns) != cls._loaded:
+            with open(settings.CUSTOMER_PHONE_INDEX_PATH) as fh:
+                data = json.load(fh)
+
+            cutoff = stat.st_mtime - settings.CUSTOMER_PHONE_SYNC_OVERLAP
+
+            with cls._lock:
+                cls._recent = {p: t for p, t in cls._recent.items() if t >= cutoff}
+                cls._phones = set(data["phones"]) | cls._recent.keys()
+                cls._watermark = data["watermark"]
+                cls._last_rebuild = data["rebuilt_at"]
+
+            cls._loaded = (stat.st_ino, stat.st_mtime_ns)
+
+        # After missed events, only a sync that ran since counts
+        cls._last_refresh = stat.st_mtime if stat.st_mtime > cls._stale_at else 0
+
+    # -----------------------------
+    # Runner
+    # -----------------------------
+    @classmethod
+    def _run(cls) -> None:
+        while True:
+            try:
+                if cls._acquire():
+                    cls.sync()
+                else:
+                    cls._load()
+            except Exception:
+                logger.exception("Customer phone index sync failed")
+
+            if cls._lock_fd is not None or not settings.CUSTOMER_PHONE_INDEX_PATH:
+                cls._wake.wait(settings.CUSTOMER_PHONE_REFRESH_INTERVAL)
+            else:
+                cls._wake.wait(settings.CUSTOMER_PHONE_CHECK_INTERVAL)
+            cls._wake.clear()
+
+    @classmethod
+    def start(cls) -> None:
+        if settings.CUSTOMER_PHONE_REFRESH_INTERVAL > 0 and cls._thread is None:
+            cls._thread = threading.Thread(target=cls._run, name="customer-phones", daemon=True)
+            cls._thread.start()
+
+    # -----------------------------
+    # Updates
+    # -----------------------------
+    @classmethod
+    def add(cls, phone: Any, customer_id: Optional[str] = None) -> None:
+        if not phone:
+            return
+
+        key = _normalize_phone(phone)
+
+        with cls._lock:
+            cls._phones.add(key)
+            if settings.CUSTOMER_PHONE_INDEX_PATH and cls._lock_fd is None:
+                cls._recent[key] = time.time()
+
+        if customer_id:
+            cls._confirmed.set(key, customer_id)
+            cls._confirmed_phones.set(customer_id, key)
+
+    @classmethod
+    def apply_customer(cls, name: str, data: Optional[Dict[str, Any]]) -> None:
+        """
+        Customer webhook: `data` holds the fresh phone, or is None
+        when the customer was deleted.
+        """
+
+        phone = cls._confirmed_phones.get(name)
+        if phone is not None:
+            cls._confirmed.pop(phone)
+            cls._confirmed_phones.pop(name)
+
+        if data and data.get("custom_phone_number"):
+            cls.add(data["custom_phone_number"])
+
+    @classmethod
+    def mark_stale(cls) -> None:
+        # Missed events: sync now, and fall back to ERP until it has run
+        cls._stale_at = time.time()
+        cls._last_refresh = 0
+        cls._wake.set()
+
+    # -----------------------------
+    # Lookups
+    # -----------------------------
+    @classmethod
+    def _is_fresh(cls) -> bool:
+        return (time.time() - cls._last_refresh) < settings.CUSTOMER_PHONE_MAX_AGE
+
+    @classmethod
+    def known_absent(cls, phone: Any) -> bool:
+        """
+        True when no customer can have this number.
+        """
+
+        if not cls._is_fresh():
+            return False
+
+        return _normalize_phone(phone) not in cls._phones
+
+    @classmethod
+    def find(cls, phone: Any) -> str | None:
+        """
+        _find_customer_by_phone() that only calls ERP for numbers
+        the index knows (or while the index is not usable).
+        """
+
+        if cls.known_absent(phone):
+            return None
+
+        key = _normalize_phone(phone)
+
+        customer_id = cls._confirmed.get(key)
+        if customer_id is not None:
+            return customer_id
+
+        customer_id = _find_customer_by_phone(phone)
+
+        if customer_id:
+            cls.add(key, customer_id)
+
+        return customer_id
+
+
 # -------------------------------------------------
 # Find Customer by Email (Primary Identity)
 # -------------------------------------------------
@@ -45,10 +398,12 @@ def find_customer_by_email(email: str) -> Dict[str, Any] | None:
             "/api/resource/Customer",
             params={
                 "filters": f'[["custom_email","=","{email}"]]',
-                "fields": '["name","customer_name","custom_phone_number","custom_email","custom_vat_registration_number"]',
+                "fields": CUSTOMER_FIELDS,
                 "limit_page_length": 1,
             },
         )
+    except ERPUnavailableError:
+        raise
     except ERPError:
         raise CustomerError("Customer lookup temporarily unavailable.")
 
@@ -64,9 +419,9 @@ def find_customer_by_email(email: str) -> Dict[str, Any] | None:
 
 
 # -------------------------------------------------
-# Get or Create Customer (SAFE UPSERT)
+# Customer Sync Switches
 # -------------------------------------------------
-def get_or_create_customer(payload: Dict[str, Any]) -> str:
+def _require_customer_sync() -> None:
 
     # 🔐 Master Integration Switch
     if not SiteControl.is_website_integration_enabled():
@@ -79,31 +434,14 @@ def get_or_create_customer(payload: Dict[str, Any]) -> str:
     if not SiteControl.is_customer_sync_enabled():
         raise CustomerError("Customer creation is disabled.")
 
+
+# -------------------------------------------------
+# Create Customer (returns the new ERP document)
+# -------------------------------------------------
+def create_customer(payload: Dict[str, Any]) -> Dict[str, Any]:
     email = payload.get("email")
     phone = payload.get("phone")
 
-    if not email and not phone:
-        raise CustomerError("Email or Phone is required.")
-
-    # -------------------------------------------------
-    # 1️⃣ Try Find by Email (Primary)
-    # -------------------------------------------------
-    if email:
-        existing = find_customer_by_email(email)
-        if existing:
-            return existing["name"]
-
-    # -------------------------------------------------
-    # 2️⃣ Fallback: Find by Phone (Backward Compatibility)
-    # -------------------------------------------------
-    if phone:
-        existing_phone = _find_customer_by_phone(phone)
-        if existing_phone:
-            return existing_phone
-
-    # -------------------------------------------------
-    # 3️⃣ Create New Customer
-    # -------------------------------------------------
     email_value = str(email).strip() if email else None
     phone_value = str(phone).strip() if phone else None
 
@@ -126,13 +464,51 @@ def get_or_create_customer(payload: Dict[str, Any]) -> str:
             "/api/resource/Customer",
             json=customer_payload,
         )
+    except ERPUnavailableError:
+        raise
     except ERPError:
         raise CustomerError("Customer creation temporarily unavailable.")
 
     doc = res.get("data") or {}
-    customer_id = doc.get("name")
 
-    if not customer_id:
+    if not doc.get("name"):
         raise CustomerError("Customer creation failed.")
 
-    return customer_id
+    CustomerPhones.add(doc.get("custom_phone_number"), doc["name"])
+
+    return doc
+
+
+# -------------------------------------------------
+# Get or Create Customer (SAFE UPSERT)
+# -------------------------------------------------
+def get_or_create_customer(payload: Dict[str, Any]) -> str:
+
+    _require_customer_sync()
+
+    email = payload.get("email")
+    phone = payload.get("phone")
+
+    if not email and not phone:
+        raise CustomerError("Email or Phone is required.")
+
+    # -------------------------------------------------
+    # 1️⃣ Try Find by Email (Primary)
+    # -------------------------------------------------
+    if email:
+        existing = find_customer_by_email(email)
+        if existing:
+            return existing["name"]
+
+    # -------------------------------------------------
+    # 2️⃣ Fallback: Find by Phone (Backward Compatibility)
+    # -------------------------------------------------
+    if phone:
+        existing_phone = _find_customer_by_phone(phone)
+        if existing_phone:
+            return existing_phone
+
+    # -------------------------------------------------
+    # 3️⃣ Create New Customer
+    # -------------------------------------------------
+    return create_customer(payload)["name"]
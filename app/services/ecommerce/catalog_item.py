@@ -0,0 +1,209 @@
+import sys
+from typing import Any, Dict, Iterator, Optional
+
+from app.services.ecommerce.ecommerce_engine import EcommerceEngine
+
+
+# -------------------------------------------------
+# Field Layout
+# -------------------------------------------------
+# ERP check fields; EcommerceEngine and the catalog filters only
+# ever test them with _to_int(value) == 1 (disabled: != 0)
+FLAG_FIELDS = (
+    "custom_show_price",
+    "custom_show_image",
+    "custom_show_stock",
+    "custom_show_strike_price",
+    "custom_enable_promotion",
+    "custom_fixed_price",
+    "custom_mrp_rate",
+    "custom_promotional_rate",
+    "custom_enable_item",
+    "disabled",
+)
+
+# Currency / percentage fields, only ever read through _to_float()
+NUMBER_FIELDS = (
+    "custom_standard_selling_price",
+    "custom_ecommerce_price",
+    "custom_mrp_price",
+    "custom_promotion_base_price",
+    "custom_promotion_discount_",
+    "custom_promotion_price_manual",
+    "custom_promotional_price",
+)
+
+# Few distinct values across the catalog: one shared str object each
+INTERNED_FIELDS = (
+    "item_group",
+    "custom_subcategory",
+    "custom_promotion_type",
+)
+
+TEXT_FIELDS = (
+    "item_code",
+    "name",
+    "item_name",
+    "description",
+    "image",
+    "modified",
+    "custom_promotion_start",
+    "custom_promotion_end",
+)
+
+_FLAG_BITS = {f: 1 << i for i, f in enumerate(FLAG_FIELDS)}
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+# -------------------------------------------------
+# Catalog Item (raw ERP row)
+# -------------------------------------------------
+class CatalogItem:
+    """
+    Compact stand-in for an ERP Item row held in a long-lived cache.
+
+    Check fields are packed into one int, numbers are stored parsed
+    and category-like strings are interned. Reads go through .get()
+    / [key] like the dict it replaces, and EcommerceEngine gives the
+    same results for both.
+    """
+
+    __slots__ = TEXT_FIELDS + INTERNED_FIELDS + NUMBER_FIELDS + ("flags",)
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "CatalogItem":
+        item = cls.__new__(cls)
+
+        for f in TEXT_FIELDS:
+            setattr(item, f, row.get(f))
+
+        for f in INTERNED_FIELDS:
+            setattr(item, f, _intern(row.get(f)))
+
+        for f in NUMBER_FIELDS:
+            setattr(item, f, EcommerceEngine._to_float(row.get(f)))
+
+        flags = 0
+        for f, bit in _FLAG_BITS.items():
+            value = EcommerceEngine._to_int(row.get(f))
+            if (value != 0) if f == "disabled" else (value == 1):
+                flags |= bit
+        item.flags = flags
+
+        return item
+
+    def get(self, key: str, default: Any = None) -> Any:
+        bit = _FLAG_BITS.get(key)
+
+        if bit is not None:
+            return 1 if self.flags & bit else 0
+
+        if key == "flags":
+            return default
+
+        value = getattr(self, key, None)
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in _FLAG_BITS and key not in self.__slots__:
+            raise KeyError(key)
+        return self.get(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in _FLAG_BITS or (key != "flags" and key in self.__slots__)
+
+    def keys(self) -> Iterator[str]:
+        yield from TEXT_FIELDS
+        yield from INTERNED_FIELDS
+        yield from NUMBER_FIELDS
+        yield from FLAG_FIELDS
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {f: self.get(f) for f in self.keys()}
+
+
+# -------------------------------------------------
+# Engine Result (EcommerceEngine.transform_item output)
+# -------------------------------------------------
+_ON_SALE, _PRICE_VISIBLE, _IMAGE_VISIBLE, _IN_STOCK = 1, 2, 4, 8
+
+
+class EngineResult:
+    """
+    Read-only, slotted form of the 8-key dict returned by
+    EcommerceEngine.transform_item(). Supports result[key].
+    """
+
+    __slots__ = ("price", "original_price", "discount_percentage", "image", "flags")
+
+    def __init__(
+        self,
+        price: Optional[float],
+        original_price: Optional[float],
+        discount_percentage: float,
+        image: Optional[str],
+        flags: int,
+    ):
+        self.price = price
+        self.original_price = original_price
+        self.discount_percentage = discount_percentage
+        self.image = image
+        self.flags = flags
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "EngineResult":
+        flags = 0
+        if data["is_on_sale"]:
+            flags |= _ON_SALE
+        if data["is_price_visible"]:
+            flags |= _PRICE_VISIBLE
+        if data["is_image_visible"]:
+            flags |= _IMAGE_VISIBLE
+        if data["stock_status"] == "In Stock":
+            flags |= _IN_STOCK
+
+        return cls(
+            data["price"],
+            data["original_price"],
+            data["discount_percentage"],
+            data["image"],
+            flags,
+        )
+
+    @property
+    def is_on_sale(self) -> bool:
+        return bool(self.flags & _ON_SALE)
+
+    @property
+    def is_price_visible(self) -> bool:
+        return bool(self.flags & _PRICE_VISIBLE)
+
+    @property
+    def is_image_visible(self) -> bool:
+        return bool(self.flags & _IMAGE_VISIBLE)
+
+    @property
+    def stock_status(self) -> str:
+        return "In Stock" if self.flags & _IN_STOCK else "Out of Stock"
+
+    _KEYS = (
+        "price",
+        "original_price",
+        "discount_percentage",
+        "is_on_sale",
+        "is_price_visible",
+        "is_image_visible",
+        "stock_status",
+        "image",
+    )
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in self._KEYS}
@@ -0,0 +1,193 @@
+import heapq
+import threading
+import time
+from datetime import datetime, time as dt_time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from app.services.ecommerce.catalog_item import EngineResult
+from app.services.ecommerce.ecommerce_engine import EcommerceEngine
+
+
+# Every item field EcommerceEngine.transform_item() reads
+ENGINE_FIELDS = (
+    "item_code",
+    "image",
+    "custom_ecommerce_price",
+    "custom_mrp_price",
+    "custom_fixed_price",
+    "custom_mrp_rate",
+    "custom_enable_promotion",
+    "custom_promotion_type",
+    "custom_promotion_discount_",
+    "custom_promotion_start",
+    "custom_promotion_end",
+    "custom_promotion_price_manual",
+    "custom_promotional_price",
+    "custom_promotional_rate",
+    "custom_show_strike_price",
+    "custom_show_price",
+    "custom_show_image",
+    "custom_show_stock",
+)
+
+
+class _Entry:
+    __slots__ = ("signature", "result", "boundary")
+
+    def __init__(self, signature: tuple, result: EngineResult, boundary: Optional[float]):
+        self.signature = signature
+        self.result = result
+        self.boundary = boundary
+
+
+# -------------------------------------------------
+# Promotion Schedule
+# -------------------------------------------------
+class PromotionSchedule:
+    """
+    Precomputed EcommerceEngine output per item for the current
+    business day, plus a heap of upcoming promotion start/end
+    boundaries.
+
+    Pricing becomes a lookup. Entries are recomputed when the item's
+    fields change or when one of its boundaries passes. Boundaries are
+    absolute instants (midnight in BUSINESS_TIMEZONE), so every worker
+    flips prices at the same moment without coordinating.
+    """
+
+    _entries: Dict[str, _Entry] = {}
+    _heap: List[Tuple[float, str]] = []
+    _lock = threading.Lock()
+
+    # -----------------------------
+    # Boundaries
+    # -----------------------------
+    @staticmethod
+    def _midnight(day) -> float:
+        tz = ZoneInfo(EcommerceEngine.BUSINESS_TIMEZONE)
+        return datetime.combine(day, dt_time.min, tzinfo=tz).timestamp()
+
+    @classmethod
+    def _next_boundary(cls, item: Dict[str, Any], now: float) -> Optional[float]:
+        """
+        Next instant at which the item's promotion starts or ends:
+        start date 00:00, or the day after the end date 00:00.
+        """
+
+        if EcommerceEngine._to_int(item.get("custom_enable_promotion")) != 1:
+            return None
+
+        start = EcommerceEngine._parse_date(item.get("custom_promotion_start"))
+        end = EcommerceEngine._parse_date(item.get("custom_promotion_end"))
+
+        if not start or not end:
+            return None
+
+        for boundary in (cls._midnight(start), cls._midnight(end + timedelta(days=1))):
+            if boundary > now:
+                return boundary
+
+        return None
+
+    # -----------------------------
+    # Entries
+    # -----------------------------
+    @staticmethod
+    def _signature(item: Dict[str, Any]) -> Optional[tuple]:
+        """
+        All ENGINE_FIELDS values, or None for a projection that lacks
+        some of them (fields= pages, facet rows). Such rows would read
+        as a different item each time and are priced without caching.
+        """
+
+        try:
+            return tuple(item[f] for f in ENGINE_FIELDS)
+        except KeyError:
+            return None
+
+    @classmethod
+    def _store(cls, code: str, item: Dict[str, Any], signature: tuple, now: float) -> _Entry:
+        previous = cls._entries.get(code)
+
+        entry = _Entry(
+            signature,
+            EngineResult.from_dict(EcommerceEngine.transform_item(item)),
+            cls._next_boundary(item, now),
+        )
+        cls._entries[code] = entry
+
+        # The existing heap slot stays valid for an unchanged boundary
+        if entry.boundary is not None and (previous is None or previous.boundary != entry.boundary):
+            heapq.heappush(cls._heap, (entry.boundary, code))
+
+        return entry
+
+    @classmethod
+    def _advance(cls, now: float) -> None:
+        """
+        Recomputes every entry whose boundary has passed.
+        """
+
+        while cls._heap and cls._heap[0][0] <= now:
+            boundary, code = heapq.heappop(cls._heap)
+            entry = cls._entries.get(code)
+
+            # Stale heap slot (entry was recomputed since)
+            if entry is None or entry.boundary != boundary:
+                continue
+
+            item = dict(zip(ENGINE_FIELDS, entry.signature))
+            cls._store(code, item, entry.signature, now)
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    @classmethod
+    def transform_item(cls, item: Dict[str, Any]) -> EngineResult:
+        """
+        Same values as EcommerceEngine.transform_item(), served from
+        the schedule as a shared, read-only EngineResult (result[key]).
+        """
+
+        code = item.get("item_code")
+        if not code:
+            return EngineResult.from_dict(EcommerceEngine.transform_item(item))
+
+        now = time.time()
+        signature = cls._signature(item)
+
+        if signature is None:
+            return EngineResult.from_dict(EcommerceEngine.transform_item(item))
+
+        with cls._lock:
+            if cls._heap and cls._heap[0][0] <= now:
+                cls._advance(now)
+
+            entry = cls._entries.get(code)
+
+            if entry is None or entry.signature != signature:
+                entry = cls._store(code, item, signature, now)
+
+            return entry.result
+
+    @classmethod
+    def next_transition(cls) -> Optional[float]:
+        """
+        Unix time of the next promotion start/end among known items.
+        """
+
+        with cls._lock:
+            cls._advance(time.time())
+            return cls._heap[0][0] if cls._heap else None
+
+    @classmethod
+    def seconds_until_transition(cls, default: float) -> float:
+        """
+        Caps a cache TTL so nothing outlives the next price flip.
+        """
+
+        transition = cls.next_transition()
+        if transition is None:
+            return default
+        return max(0.0, min(default, transition - time.time()))
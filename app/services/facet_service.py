@@ -0,0 +1,398 @@
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.responses import CachedPayload
+from app.core.site_control import SiteControl
+from app.core.snapshot import CatalogSnapshot, Snapshot
+from app.services.ecommerce.ecommerce_engine import EcommerceEngine
+from app.services.ecommerce.promotion_schedule import PromotionSchedule
+from app.services.item_service import (
+    PRICING_FIELDS,
+    _catalog_filters,
+    _check_catalog_enabled,
+    iter_catalog_items,
+)
+
+
+logger = get_logger(__name__)
+
+FACET_FIELDS = [
+    "item_code",
+    "item_group",
+    "custom_subcategory",
+    "disabled",
+    "custom_enable_item",
+    "modified",
+    "custom_show_price",
+] + PRICING_FIELDS
+
+
+class _Bucket:
+    __slots__ = ("count", "prices")
+
+    def __init__(self):
+        self.count = 0
+        self.prices: Counter = Counter()
+
+
+# -------------------------------------------------
+# Catalog Facets (category -> subcategory tree)
+# -------------------------------------------------
+class CatalogFacets:
+    """
+    Category / subcategory counts and price ranges for the enabled
+    catalog. Built in one pass, then kept current from items whose
+    `modified` is newer than the last one seen.
+    """
+
+    # item_code -> (category, subcategory, price)
+    _entries: Dict[str, Tuple[str, str, Optional[float]]] = {}
+    _buckets: Dict[Tuple[str, str], _Bucket] = {}
+
+    _watermark: str = ""
+    _last_refresh: float = 0
+    _last_rebuild: float = 0
+    _last_sync: Optional[str] = None
+    # Prices flip at promotion boundaries without `modified` changing
+    _valid_until: Optional[float] = None
+
+    # Shared snapshot the index follows, and the refresher rebuild
+    # it came from (deleted items only drop out on those)
+    _snapshot_version: Optional[int] = None
+    _snapshot_rebuilt_at: Optional[float] = None
+
+    _payload: Optional[CachedPayload] = None
+    _payload_shows_prices: bool = False
+    _lock = threading.RLock()
+    # Held while a rebuild / refresh runs (at most one at a time)
+    _sync_lock = threading.Lock()
+    # After a failed sync, wait before asking ERP again
+    _retry_at: float = 0
+
+    # -----------------------------
+    # Index Maintenance
+    # -----------------------------
+    @staticmethod
+    def _is_listed(item: Dict[str, Any]) -> bool:
+        return (
+            EcommerceEngine._to_int(item.get("disabled")) == 0
+            and EcommerceEngine._to_int(item.get("custom_enable_item")) == 1
+        )
+
+    @staticmethod
+    def _entry(item: Dict[str, Any]) -> Tuple[str, str, Optional[float]]:
+        return (
+            item.get("item_group") or "Uncategorized",
+            item.get("custom_subcategory") or "Other",
+            PromotionSchedule.transform_item(item)["price"],
+        )
+
+    @staticmethod
+    def _add(entries: Dict, buckets: Dict, code: str, entry: Tuple[str, str, Optional[float]]) -> None:
+        entries[code] = entry
+        bucket = buckets.setdefault(entry[:2], _Bucket())
+        bucket.count += 1
+        if entry[2] is not None:
+            bucket.prices[entry[2]] += 1
+
+    @staticmethod
+    def _discard(entries: Dict, buckets: Dict, code: str) -> None:
+        entry = entries.pop(code, None)
+        if entry is None:
+            return
+
+        bucket = buckets[entry[:2]]
+        bucket.count -= 1
+
+        if entry[2] is not None:
+            bucket.prices[entry[2]] -= 1
+            if bucket.prices[entry[2]] <= 0:
+                del bucket.prices[entry[2]]
+
+        if bucket.count <= 0:
+            del buckets[entry[:2]]
+
+    @classmethod
+    def _index(cls, items: Iterable[Dict[str, Any]]) -> Tuple[Dict, Dict, str]:
+        """
+        Builds a new index off to the side; returns
+        (entries, buckets, watermark).
+        """
+
+        entries: Dict[str, Tuple[str, str, Optional[float]]] = {}
+        buckets: Dict[Tuple[str, str], _Bucket] = {}
+        watermark = ""
+
+        for item in items:
+            code = item.get("item_code")
+            if code and cls._is_listed(item):
+                cls._discard(entries, buckets, code)
+                cls._add(entries, buckets, code, cls._entry(item))
+            watermark = max(watermark, str(item.get("modified") or ""))
+
+        return entries, buckets, watermark
+
+    @classmethod
+    def remove_item(cls, item_code: str) -> None:
+        with cls._lock:
+            cls._discard(cls._entries, cls._buckets, item_code)
+            cls._payload = None
+
+    @classmethod
+    def apply_item(cls, item: Dict[str, Any], advance_watermark: bool = True) -> None:
+        """
+        Adds, moves or removes one item (ERP row with FACET_FIELDS).
+        Out-of-band updates (webhooks) must not advance the watermark,
+        or the next delta would skip items changed before this one.
+        """
+
+        code = item.get("item_code")
+        if not code:
+            return
+
+        entry = cls._entry(item) if cls._is_listed(item) else None
+
+        with cls._lock:
+            cls._discard(cls._entries, cls._buckets, code)
+
+            if entry is not None:
+                cls._add(cls._entries, cls._buckets, code, entry)
+
+            modified = str(item.get("modified") or "")
+            if advance_watermark and modified > cls._watermark:
+                cls._watermark = modified
+
+            cls._payload = None
+
+    # -----------------------------
+    # Full Build + Delta Refresh
+    # -----------------------------
+    @classmethod
+    def rebuild(cls) -> None:
+        # Requests keep the old index until the new one is complete
+        entries, buckets, watermark = cls._index(
+            iter_catalog_items(_catalog_filters(), FACET_FIELDS)
+        )
+
+        with cls._lock:
+            cls._entries = entries
+            cls._buckets = buckets
+            cls._watermark = watermark
+            cls._last_rebuild = cls._last_refresh = time.time()
+            cls._last_sync = datetime.now(timezone.utc).isoformat()
+            cls._valid_until = PromotionSchedule.next_transition()
+            cls._payload = None
+
+    @classmethod
+    def _rebuild_from(cls, snapshot: Snapshot) -> None:
+        entries, buckets, _ = cls._index(snapshot.records())
+
+        with cls._lock:
+            cls._entries = entries
+            cls._buckets = buckets
+            cls._watermark = snapshot.watermark
+            cls._snapshot_version = snapshot.version
+            cls._snapshot_rebuilt_at = snapshot.rebuilt_at
+            cls._last_rebuild = cls._last_refresh = time.time()
+            cls._last_sync = datetime.fromtimestamp(snapshot.built_at, timezone.utc).isoformat()
+            cls._valid_until = PromotionSchedule.next_transition()
+            cls._payload = None
+
+    @classmethod
+    def _apply_snapshot(cls, snapshot: Snapshot) -> None:
+        """
+        Applies a newer version of the same snapshot as a delta: rows
+        are sorted newest `modified` first, so the changed ones are a
+        prefix ending where the old watermark starts.
+        """
+
+        changed = snapshot.seek(range(len(snapshot)), cls._watermark, "")
+
+        for i in range(changed):
+            cls.apply_item(snapshot.record(i), advance_watermark=False)
+
+        with cls._lock:
+            cls._watermark = snapshot.watermark
+            cls._snapshot_version = snapshot.version
+            cls._last_refresh = time.time()
+            cls._last_sync = datetime.fromtimestamp(snapshot.built_at, timezone.utc).isoformat()
+            cls._payload = None
+
+    @classmethod
+    def refresh(cls) -> None:
+        """
+        Applies items changed since the watermark — including ones
+        that were disabled, so they drop out of the counts. Re-reads
+        CATALOG_SYNC_OVERLAP seconds before it, like CustomerPhones:
+        items sharing the watermark's `modified`, or committed late
+        with an earlier one, would be skipped by a strict `>`.
+        Re-applying an item is a no-op.
+        """
+
+        if not cls._watermark:
+            cls.rebuild()
+            return
+
+        since = cls._watermark
+        try:
+            since = str(
+                datetime.fromisoformat(cls._watermark)
+                - timedelta(seconds=settings.CATALOG_SYNC_OVERLAP)
+            )
+        except ValueError:
+            pass
+
+        changed = iter_catalog_items(
+            [["modified", ">=", since]],
+            FACET_FIELDS,
+        )
+
+        # Each item takes the lock on its own, never across ERP pages
+        for item in changed:
+            cls.apply_item(item)
+
+        cls._last_refresh = time.time()
+        cls._last_sync = datetime.now(timezone.utc).isoformat()
+
+    @classmethod
+    def mark_stale(cls) -> None:
+        # Next request runs a delta refresh
+        cls._last_refresh = 0
+
+    @classmethod
+    def _pending_sync(cls) -> Optional[Callable[[], None]]:
+        now = time.time()
+
+        # Shared snapshot: no ERP polling. Full rebuilds only when the
+        # refresher rebuilt, at promotion boundaries, or (at most once
+        # per FACETS_REFRESH_INTERVAL) when an item dropped out of it;
+        # other new versions are applied as a delta.
+        snapshot = CatalogSnapshot.current()
+        if snapshot is not None:
+            if (
+                cls._snapshot_version is None
+                or snapshot.rebuilt_at != cls._snapshot_rebuilt_at
+                or (cls._valid_until is not None and now >= cls._valid_until)
+            ):
+                return partial(cls._rebuild_from, snapshot)
+            if snapshot.version != cls._snapshot_version:
+                return partial(cls._apply_snapshot, snapshot)
+            if (
+                len(cls._entries) != len(snapshot)
+                and (now - cls._last_rebuild) >= settings.FACETS_REFRESH_INTERVAL
+            ):
+                return partial(cls._rebuild_from, snapshot)
+            return None
+
+        cls._snapshot_version = None
+
+        # Deleted items never show up in a delta — rebuild periodically
+        if (now - cls._last_rebuild) >= settings.FACETS_REBUILD_INTERVAL:
+            return cls.rebuild
+        if cls._valid_until is not None and now >= cls._valid_until:
+            return cls.rebuild
+        if (now - cls._last_refresh) >= settings.FACETS_REFRESH_INTERVAL:
+            return cls.refresh
+        return None
+
+    @classmethod
+    def _sync(cls, job: Callable[[], None]) -> None:
+        try:
+            job()
+        except Exception:
+            logger.exception("Catalog facets sync failed; serving the previous index")
+            cls._retry_at = time.time() + settings.FACETS_REFRESH_INTERVAL
+        finally:
+            cls._sync_lock.release()
+
+    @classmethod
+    def _ensure_fresh(cls) -> None:
+        """
+        Runs due syncs in the background, one at a time, while
+        requests keep getting the current payload. Only the very
+        first build is waited for (and its errors raised).
+        """
+
+        if cls._last_rebuild == 0:
+            with cls._sync_lock:
+                if cls._last_rebuild == 0:
+                    (cls._pending_sync() or cls.rebuild)()
+            return
+
+        if time.time() < cls._retry_at:
+            return
+
+        job = cls._pending_sync()
+        if job is None or not cls._sync_lock.acquire(blocking=False):
+            return
+
+        threading.Thread(target=cls._sync, args=(job,), name="catalog-facets", daemon=True).start()
+
+    # -----------------------------
+    # Output
+    # -----------------------------
+    @staticmethod
+    def _range(prices: Counter, show_prices: bool) -> Dict[str, Optional[float]]:
+        if not show_prices or not prices:
+            return {"min_price": None, "max_price": None}
+        return {"min_price": min(prices), "max_price": max(prices)}
+
+    @classmethod
+    def _build(cls, show_prices: bool) -> Dict[str, Any]:
+        tree: Dict[str, Dict[str, Any]] = {}
+
+        for (category, subcategory), bucket in sorted(cls._buckets.items()):
+            node = tree.setdefault(category, {
+                "name": category,
+                "count": 0,
+                "prices": Counter(),
+                "subcategories": [],
+            })
+            node["count"] += bucket.count
+            node["prices"].update(bucket.prices)
+            node["subcategories"].append({
+                "name": subcategory,
+                "count": bucket.count,
+                **cls._range(bucket.prices, show_prices),
+            })
+
+        categories = []
+        for node in tree.values():
+            prices = node.pop("prices")
+            node.update(cls._range(prices, show_prices))
+            categories.append(node)
+
+        return {
+            "status": "success",
+            "categories": categories,
+            "total_items": len(cls._entries),
+            "last_sync": cls._last_sync,
+        }
+
+    @classmethod
+    def get_payload(cls) -> CachedPayload:
+
+        if not _check_catalog_enabled():
+            return CachedPayload.from_content({
+                "status": "catalog_disabled",
+                "categories": [],
+                "total_items": 0,
+                "last_sync": None,
+            })
+
+        show_prices = SiteControl.is_price_visibility_enabled()
+
+        cls._ensure_fresh()
+
+        with cls._lock:
+            if cls._payload is None or cls._payload_shows_prices != show_prices:
+                cls._payload = CachedPayload.from_content(cls._build(show_prices))
+                cls._payload_shows_prices = show_prices
+
+            return cls._payload
@@ -0,0 +1,315 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.integrations.erp_client import ERPError, erp_fetch_file
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional — originals are served as-is
+    Image = None
+
+
+logger = get_logger(__name__)
+
+# Variants are snapped to these widths so the cache stays bounded.
+ALLOWED_WIDTHS = (160, 320, 480, 640, 960, 1280)
+
+_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/svg+xml": ".svg",
+}
+
+_PIL_FORMATS = {
+    "image/jpeg": "JPEG",
+    "image/png": "PNG",
+    "image/webp": "WEBP",
+}
+
+
+class ImageNotFound(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class CachedImage:
+    path: str
+    media_type: str
+    etag: str
+
+
+def snap_width(width: Optional[int]) -> int:
+    """
+    Returns the smallest allowed width >= requested width.
+    0 means "original size".
+    """
+
+    if not width or width <= 0:
+        return 0
+
+    for allowed in ALLOWED_WIDTHS:
+        if width <= allowed:
+            return allowed
+
+    return ALLOWED_WIDTHS[-1]
+
+
+def is_valid_file_path(file_path: str) -> bool:
+    if not file_path or file_path.startswith("/") or "\\" in file_path:
+        return False
+
+    return ".." not in file_path.split("/")
+
+
+# -------------------------------------------------
+# On-Disk Image Cache
+# -------------------------------------------------
+class ImageCache:
+    """
+    Bounded on-disk store of ERP files and their resized variants.
+    Each ERP file is downloaded once; variants are derived locally.
+
+    A file's mtime is when it was written (freshness, ETag); its
+    atime is when it was last served (eviction).
+    """
+
+    _lock = threading.Lock()
+    # Striped per-file locks: bounded however many paths are requested
+    _key_locks: List[threading.Lock] = [threading.Lock() for _ in range(64)]
+
+    # Bytes in the directory as of the last scan, plus our writes since
+    _bytes: int = 0
+    _scanned_at: float = 0
+
+    # -----------------------------
+    # Paths
+    # -----------------------------
+    @staticmethod
+    def _dir() -> str:
+        os.makedirs(settings.IMAGE_CACHE_DIR, exist_ok=True)
+        return settings.IMAGE_CACHE_DIR
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return hashlib.sha256(file_path.encode()).hexdigest()[:32]
+
+    @classmethod
+    def _lookup(cls, prefix: str) -> Optional[str]:
+        directory = cls._dir()
+
+        for ext in _EXTENSIONS.values():
+            candidate = os.path.join(directory, prefix + ext)
+            if os.path.exists(candidate):
+                return candidate
+
+        return None
+
+    @classmethod
+    def _key_lock(cls, key: str) -> threading.Lock:
+        return cls._key_locks[int(key[:8], 16) % len(cls._key_locks)]
+
+    # -----------------------------
+    # Metadata
+    # -----------------------------
+    @staticmethod
+    def _media_type_for(path: str) -> str:
+        ext = os.path.splitext(path)[1]
+        for media_type, known_ext in _EXTENSIONS.items():
+            if known_ext == ext:
+                return media_type
+        return "application/octet-stream"
+
+    @staticmethod
+    def _etag_for(path: str) -> str:
+        # Files are only ever replaced whole, which changes the mtime:
+        # the same in every worker, and after restarts
+        stat = os.stat(path)
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    @staticmethod
+    def _is_fresh(path: str) -> bool:
+        return (time.time() - os.path.getmtime(path)) < settings.IMAGE_CACHE_TTL
+
+    # -----------------------------
+    # Writes + Eviction
+    # -----------------------------
+    @classmethod
+    def _write(cls, prefix: str, content: bytes, media_type: str) -> str:
+        directory = cls._dir()
+        path = os.path.join(directory, prefix + _EXTENSIONS[media_type])
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        with open(tmp_path, "wb") as fh:
+            fh.write(content)
+
+        os.replace(tmp_path, path)
+
+        cls._evict(len(content))
+
+        return path
+
+    @classmethod
+    def _evict(cls, written: int) -> None:
+        """
+        Deletes the least recently served files until the cache is
+        back under 90% of IMAGE_CACHE_MAX_BYTES. The directory is only
+        scanned once our count of it goes over the limit, or every
+        IMAGE_CACHE_SCAN_INTERVAL seconds for other workers' writes.
+        """
+
+        with cls._lock:
+            cls._bytes += written
+
+            if (
+                cls._bytes <= settings.IMAGE_CACHE_MAX_BYTES
+                and (time.time() - cls._scanned_at) < settings.IMAGE_CACHE_SCAN_INTERVAL
+            ):
+                return
+
+            cls._scanned_at = time.time()
+
+        entries = []
+        total = 0
+
+        with os.scandir(cls._dir()) as it:
+            for entry in it:
+                if not entry.is_file() or entry.name.endswith(".tmp"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        cls._bytes = total
+
+        if total <= settings.IMAGE_CACHE_MAX_BYTES:
+            return
+
+        target = int(settings.IMAGE_CACHE_MAX_BYTES * 0.9)
+
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+        cls._bytes = total
+
+    @staticmethod
+    def _touch(path: str) -> None:
+        # Eviction is by atime — refresh it at most once an hour per
+        # file, keeping the mtime (freshness and ETag) as it was
+        try:
+            stat = os.stat(path)
+            if time.time() - stat.st_atime > 3600:
+                os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+        except FileNotFoundError:
+            pass
+
+    # -----------------------------
+    # Original + Variants
+    # -----------------------------
+    @classmethod
+    def _original(cls, file_path: str) -> str:
+        prefix = f"{cls._key(file_path)}-w0"
+        existing = cls._lookup(prefix)
+
+        if existing and cls._is_fresh(existing):
+            return existing
+
+        try:
+            fetched = erp_fetch_file(
+                f"/files/{file_path}",
+                max_bytes=settings.IMAGE_MAX_SOURCE_BYTES,
+            )
+        except ERPError:
+            if existing:
+                # A stale image beats a broken one
+                logger.warning("ERP unavailable; serving stale cached image %s", file_path)
+                return existing
+            raise
+
+        if fetched is None:
+            raise ImageNotFound(file_path)
+
+        content, media_type = fetched
+
+        if media_type not in _EXTENSIONS:
+            raise ImageNotFound(file_path)
+
+        # Variants of a re-downloaded original are rebuilt on demand
+        for width in ALLOWED_WIDTHS:
+            stale = cls._lookup(f"{cls._key(file_path)}-w{width}")
+            if stale:
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+
+        return cls._write(prefix, content, media_type)
+
+    @classmethod
+    def _variant(cls, file_path: str, original: str, width: int) -> str:
+        media_type = cls._media_type_for(original)
+        pil_format = _PIL_FORMATS.get(media_type)
+
+        if Image is None or not pil_format:
+            return original
+
+        prefix = f"{cls._key(file_path)}-w{width}"
+        existing = cls._lookup(prefix)
+
+        if existing:
+            return existing
+
+        with Image.open(original) as img:
+            if img.width <= width:
+                # Remember the decision so the original isn't decoded again
+                with open(original, "rb") as fh:
+                    return cls._write(prefix, fh.read(), media_type)
+
+            height = max(1, round(img.height * width / img.width))
+            resized = img.resize((width, height), Image.LANCZOS)
+
+            if pil_format == "JPEG" and resized.mode not in ("RGB", "L"):
+                resized = resized.convert("RGB")
+
+            buffer = io.BytesIO()
+            resized.save(buffer, format=pil_format, quality=82, optimize=True)
+
+        return cls._write(prefix, buffer.getvalue(), media_type)
+
+    @classmethod
+    def get(cls, file_path: str, width: int = 0) -> CachedImage:
+        """
+        Returns a cached file for the ERP path /files/<file_path>,
+        downloading and resizing on first use.
+        """
+
+        if not is_valid_file_path(file_path):
+            raise ImageNotFound(file_path)
+
+        width = snap_width(width)
+
+        with cls._key_lock(cls._key(file_path)):
+            original = cls._original(file_path)
+            path = cls._variant(file_path, original, width) if width else original
+
+        cls._touch(path)
+
+        return CachedImage(
+            path=path,
+            media_type=cls._media_type_for(path),
+            etag=cls._etag_for(path),
+        )
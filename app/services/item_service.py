@@ -1,23 +1,47 @@
+import base64
+import binascii
 import json
 import os
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Iterator, Optional, List
 from datetime import datetime, timezone
 
 from fastapi import HTTPException
 
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.responses import CachedPayload, encode_json
 from app.core.site_control import SiteControl
+from app.core.snapshot import CatalogSnapshot, Snapshot
 from app.integrations.erp_client import erp_request
-from app.services.ecommerce.ecommerce_engine import EcommerceEngine
+from app.services.ecommerce.promotion_schedule import PromotionSchedule
 
 
+logger = get_logger(__name__)
+
 DEFAULT_PAGE_SIZE = 100
+EXPORT_CHUNK_SIZE = 500
 ERP_BASE_URL = os.getenv("ERP_BASE_URL", "").rstrip("/")
 
+# Encoded /products pages, keyed by query parameters
+_page_cache = TTLCache(ttl=settings.CATALOG_CACHE_TTL, maxsize=512)
+
 
-def normalize_image(image_path: Optional[str]) -> str:
+def normalize_image(image_path: Optional[str], width: Optional[int] = None) -> str:
     if not image_path:
         return ""
 
+    # Public ERP files go through our caching image proxy
+    if settings.PUBLIC_BASE_URL:
+        file_path = image_path
+
+        if ERP_BASE_URL and file_path.startswith(ERP_BASE_URL):
+            file_path = file_path[len(ERP_BASE_URL):]
+
+        if file_path.startswith("/files/"):
+            width = width or settings.IMAGE_DEFAULT_WIDTH
+            return f"{settings.PUBLIC_BASE_URL}/images{file_path}?w={width}"
+
     if image_path.startswith("http"):
         return image_path
 
@@ -27,28 +51,275 @@ def normalize_image(image_path: Optional[str]) -> str:
     return image_path
 
 
-def get_products(
+# -------------------------------------------------
+# ERP FIELDS (everything EcommerceEngine needs)
+# -------------------------------------------------
+ITEM_FIELDS = [
+    "item_code",
+    "item_name",
+    "custom_subcategory",
+    "image",
+    "description",
+    "item_group",
+    "custom_standard_selling_price",
+    "custom_ecommerce_price",
+    "custom_mrp_price",
+    "custom_fixed_price",
+    "custom_mrp_rate",
+    "custom_enable_promotion",
+    "custom_promotion_base_price",
+    "custom_promotion_type",
+    "custom_promotion_discount_",
+    "custom_promotion_start",
+    "custom_promotion_end",
+    "custom_promotion_price_manual",
+    "custom_promotional_price",
+    "custom_promotional_rate",
+    "custom_show_strike_price",
+    "custom_show_price",
+    "custom_show_image",
+    "custom_show_stock",
+]
+
+
+# -------------------------------------------------
+# FIELD PROJECTION (?fields=item_code,item_name,price)
+# -------------------------------------------------
+# ERP fields EcommerceEngine reads to resolve a price
+PRICING_FIELDS = [
+    "custom_ecommerce_price",
+    "custom_mrp_price",
+    "custom_fixed_price",
+    "custom_mrp_rate",
+    "custom_enable_promotion",
+    "custom_promotion_type",
+    "custom_promotion_start",
+    "custom_promotion_end",
+    "custom_promotion_price_manual",
+    "custom_promotional_price",
+    "custom_promotional_rate",
+]
+
+# Output field -> ERP fields required to compute it (allowlist)
+OUTPUT_FIELD_SOURCES: Dict[str, List[str]] = {
+    "item_code": ["item_code"],
+    "item_name": ["item_name"],
+    "description": ["description"],
+    "price": PRICING_FIELDS + ["custom_show_price"],
+    "original_price": PRICING_FIELDS + ["custom_show_strike_price"],
+    "discount_percentage": PRICING_FIELDS + ["custom_promotion_discount_"],
+    "is_on_sale": PRICING_FIELDS,
+    "image": ["image", "custom_show_image"],
+    "category": ["item_group"],
+    "subcategory": ["custom_subcategory"],
+    "stock_status": ["custom_show_stock"],
+    "is_price_visible": ["custom_show_price"],
+    "is_image_visible": ["custom_show_image"],
+}
+
+# Outputs that can be produced without running EcommerceEngine
+_PLAIN_OUTPUT_FIELDS = {"item_code", "item_name", "description", "category", "subcategory"}
+
+
+def parse_fields(fields: Optional[str]) -> Optional[tuple]:
+    """
+    Validates a comma-separated ?fields= value against the allowlist.
+    Returns None when all fields are wanted.
+    """
+
+    if not fields:
+        return None
+
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in OUTPUT_FIELD_SOURCES]
+
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+
+    # Response keeps the canonical field order
+    return tuple(f for f in OUTPUT_FIELD_SOURCES if f in requested) or None
+
+
+def _erp_fields_for(output_fields: Optional[tuple], search: Optional[str] = None) -> List[str]:
+    """
+    Minimal ERP field list needed to build the requested outputs.
+    """
+
+    if output_fields is None:
+        return ITEM_FIELDS
+
+    needed = set()
+
+    for name in output_fields:
+        needed.update(OUTPUT_FIELD_SOURCES[name])
+
+    # Search is applied locally on name/code
+    if search:
+        needed.update(("item_code", "item_name"))
+
+    return [f for f in ITEM_FIELDS if f in needed]
+
+
+def _catalog_filters(
     category: Optional[str] = None,
     subcategory: Optional[str] = None,
-    search: Optional[str] = None,
-    order_by: Optional[str] = None,
-    page: int = 1,
-    page_size: int = DEFAULT_PAGE_SIZE,
-) -> Dict[str, Any]:
+) -> List[Any]:
+    filters: List[Any] = [
+        ["disabled", "=", 0],
+        ["custom_enable_item", "=", 1],
+    ]
+
+    if category:
+        filters.append(["item_group", "=", category])
+
+    if subcategory:
+        filters.append(["custom_subcategory", "=", subcategory])
+
+    return filters
+
+
+def _check_catalog_enabled() -> bool:
+    """
+    Raises 503 when the integration is off.
+    Returns False when only the catalog is switched off.
+    """
 
-    # -------------------------------------------------
     # 🔐 MASTER INTEGRATION SWITCH
-    # -------------------------------------------------
     if not SiteControl.is_website_integration_enabled():
         raise HTTPException(
             status_code=503,
             detail="E-commerce integration is currently disabled."
         )
 
-    # -------------------------------------------------
     # 🔐 GLOBAL CATALOG SWITCH
+    return SiteControl.is_item_sync_enabled()
+
+
+def _format_item(
+    item: Dict[str, Any],
+    is_price_visible_global: bool,
+    output_fields: Optional[tuple] = None,
+) -> Dict[str, Any]:
+
+    if output_fields is not None and _PLAIN_OUTPUT_FIELDS.issuperset(output_fields):
+        plain = {
+            "item_code": item.get("item_code") or "",
+            "item_name": item.get("item_name") or "",
+            "description": item.get("description") or "",
+            "category": item.get("item_group") or "Uncategorized",
+            "subcategory": item.get("custom_subcategory") or "Other",
+        }
+        return {name: plain[name] for name in output_fields}
+
+    ecommerce_data = PromotionSchedule.transform_item(item)
+
+    # 🔐 ONLY CONTROL DISPLAY — DO NOT OVERRIDE ENGINE VALUES
+    formatted = {
+        "item_code": item.get("item_code") or "",
+        "item_name": item.get("item_name") or "",
+        "description": item.get("description") or "",
+        "price": ecommerce_data["price"] if is_price_visible_global else None,
+        "original_price": ecommerce_data["original_price"],
+        "discount_percentage": ecommerce_data["discount_percentage"],
+        "is_on_sale": ecommerce_data["is_on_sale"],
+        "image": normalize_image(
+            ecommerce_data["image"]
+        ),
+        "category": item.get("item_group") or "Uncategorized",
+        "subcategory": item.get("custom_subcategory") or "Other",
+        "stock_status": ecommerce_data["stock_status"],
+        "is_price_visible": ecommerce_data["is_price_visible"],
+        "is_image_visible": ecommerce_data["is_image_visible"],
+    }
+
+    if output_fields is None:
+        return formatted
+
+    return {name: formatted[name] for name in output_fields}
+
+
+# -------------------------------------------------
+# KEYSET CURSORS
+# -------------------------------------------------
+def encode_cursor(modified: str, name: str) -> str:
+    raw = json.dumps([modified, name], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        modified, name = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(modified, str) or not isinstance(name, str):
+        raise ValueError("Invalid cursor")
+
+    return modified, name
+
+
+def iter_catalog_items(
+    filters: List[Any],
+    fields: List[str],
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields raw ERP items one chunk at a time.
+    Only one chunk is held in memory; chunks seek by `name`, so
+    every chunk costs the same and edits don't shift rows.
+    """
+
+    if "name" not in fields:
+        fields = fields + ["name"]
+
+    last_name = None
+
+    while True:
+        chunk_filters = list(filters)
+
+        if last_name is not None:
+            chunk_filters.append(["name", ">", last_name])
+
+        response = erp_request(
+            "GET",
+            "/api/resource/Item",
+            params={
+                "filters": json.dumps(chunk_filters),
+                "fields": json.dumps(fields),
+                "limit_page_length": chunk_size,
+                "order_by": "name asc",
+            },
+        )
+
+        chunk = response.get("data", []) or []
+
+        yield from chunk
+
+        if len(chunk) < chunk_size:
+            return
+
+        last_name = chunk[-1]["name"]
+
+
+def get_products(
+    category: Optional[str] = None,
+    subcategory: Optional[str] = None,
+    search: Optional[str] = None,
+    order_by: Optional[str] = None,
+    page: int = 1,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+
+    output_fields = parse_fields(fields)
+    seek = decode_cursor(cursor) if cursor else None
+
+    # -------------------------------------------------
+    # 🔐 MASTER + CATALOG SWITCHES
     # -------------------------------------------------
-    if not SiteControl.is_item_sync_enabled():
+    if not _check_catalog_enabled():
         return {
             "status": "catalog_disabled",
             "items": [],
@@ -57,6 +328,7 @@ def get_products(
                 "page_size": 0,
                 "total_items": 0,
                 "total_pages": 0,
+                "next_cursor": None,
             },
             "last_sync": None,
         }
@@ -67,75 +339,142 @@ def get_products(
     if page_size < 1:
         page_size = DEFAULT_PAGE_SIZE
 
+    snapshot = CatalogSnapshot.current()
+
+    if snapshot is not None:
+        items, total_items, next_cursor, last_sync = _page_from_snapshot(
+            snapshot, category, subcategory, page, page_size, seek,
+        )
+    else:
+        items, total_items, next_cursor = _page_from_erp(
+            category, subcategory, search, page, page_size, output_fields, seek,
+        )
+        last_sync = datetime.now(timezone.utc).isoformat()
+
+    total_pages = None
+    if not seek:
+        total_pages = (total_items + page_size - 1) // page_size
+
+    if search:
+        search_lower = search.lower()
+        items = [
+            item for item in items
+            if search_lower in (item.get("item_name") or "").lower()
+            or search_lower in (item.get("item_code") or "").lower()
+        ]
+
     # -------------------------------------------------
-    # FILTERS
+    # TRANSFORM
     # -------------------------------------------------
-    filters: List[Any] = [
-        ["disabled", "=", 0],
-        ["custom_enable_item", "=", 1],
+    is_price_visible_global = SiteControl.is_price_visibility_enabled()
+
+    formatted_items = [
+        _format_item(item, is_price_visible_global, output_fields) for item in items
     ]
 
-    if category:
-        filters.append(["item_group", "=", category])
+    # -------------------------------------------------
+    # FINAL RESPONSE
+    # -------------------------------------------------
+    return {
+        "status": "success",
+        "items": formatted_items,
+        "pagination": {
+            "page": None if seek else page,
+            "page_size": page_size,
+            "total_items": total_items if not seek else None,
+            "total_pages": total_pages,
+            "next_cursor": next_cursor,
+        },
+        "last_sync": last_sync,
+    }
 
-    if subcategory:
-        filters.append(["custom_subcategory", "=", subcategory])
+
+def _page_from_snapshot(
+    snapshot: Snapshot,
+    category: Optional[str],
+    subcategory: Optional[str],
+    page: int,
+    page_size: int,
+    seek: Optional[tuple],
+) -> tuple:
+    """
+    One page from the shared snapshot: same order and cursor
+    semantics as the ERP query, no ERP round trip.
+    """
+
+    positions = snapshot.select(category, subcategory)
+
+    if seek:
+        start = snapshot.seek(positions, *seek)
+    else:
+        start = (page - 1) * page_size
+
+    items = [snapshot.record(i) for i in positions[start:start + page_size]]
+
+    next_cursor = None
+    if items and start + page_size < len(positions):
+        next_cursor = encode_cursor(
+            str(items[-1].get("modified") or ""),
+            str(items[-1].get("name") or ""),
+        )
+
+    last_sync = datetime.fromtimestamp(snapshot.built_at, timezone.utc).isoformat()
+
+    return items, len(positions), next_cursor, last_sync
+
+
+def _page_from_erp(
+    category: Optional[str],
+    subcategory: Optional[str],
+    search: Optional[str],
+    page: int,
+    page_size: int,
+    output_fields: Optional[tuple],
+    seek: Optional[tuple],
+) -> tuple:
 
     # -------------------------------------------------
-    # FIELDS
+    # FILTERS
     # -------------------------------------------------
-    fields = [
-        "item_code",
-        "item_name",
-        "custom_subcategory",
-        "image",
-        "description",
-        "item_group",
-        "custom_standard_selling_price",
-        "custom_ecommerce_price",
-        "custom_mrp_price",
-        "custom_fixed_price",
-        "custom_mrp_rate",
-        "custom_enable_promotion",
-        "custom_promotion_base_price",
-        "custom_promotion_type",
-        "custom_promotion_discount_",
-        "custom_promotion_start",
-        "custom_promotion_end",
-        "custom_promotion_price_manual",
-        "custom_promotional_price",
-        "custom_promotional_rate",
-        "custom_show_strike_price",
-        "custom_show_price",
-        "custom_show_image",
-        "custom_show_stock",
-    ]
-
-    start = (page - 1) * page_size
+    filters = _catalog_filters(category, subcategory)
+    erp_fields = _erp_fields_for(output_fields, search) + ["name", "modified"]
 
     params = {
-        "filters": json.dumps(filters),
-        "fields": json.dumps(fields),
-        "limit_start": start,
+        "fields": json.dumps(erp_fields),
         "limit_page_length": page_size,
-        "order_by": "modified desc",
+        "order_by": "modified desc, name desc",
     }
 
+    if seek:
+        # (modified, name) < cursor, expressed as
+        # modified <= m AND (modified < m OR name < n)
+        modified, name = seek
+        params["filters"] = json.dumps(filters + [["modified", "<=", modified]])
+        params["or_filters"] = json.dumps([
+            ["modified", "<", modified],
+            ["name", "<", name],
+        ])
+    else:
+        params["filters"] = json.dumps(filters)
+        params["limit_start"] = (page - 1) * page_size
+
     # -------------------------------------------------
-    # TOTAL COUNT
+    # TOTAL COUNT (offset pages only — cursor pages skip the full scan)
     # -------------------------------------------------
-    count_response = erp_request(
-        "GET",
-        "/api/resource/Item",
-        params={
-            "filters": json.dumps(filters),
-            "fields": json.dumps(["name"]),
-            "limit_page_length": 0,
-        },
-    )
+    total_items = None
+
+    if not seek:
+        count_response = erp_request(
+            "GET",
+            "/api/resource/Item",
+            params={
+                "filters": json.dumps(filters),
+                "fields": json.dumps(["name"]),
+                "limit_page_length": 0,
+            },
+        )
 
-    total_items = len(count_response.get("data", []) or [])
-    total_pages = (total_items + page_size - 1) // page_size if page_size > 0 else 1
+        total_items = len(count_response.get("data", []) or [])
 
     # -------------------------------------------------
     # MAIN DATA REQUEST
@@ -148,55 +487,117 @@ def get_products(
 
     items = response.get("data", []) or []
 
-    if search:
-        search_lower = search.lower()
-        items = [
-            item for item in items
-            if search_lower in (item.get("item_name") or "").lower()
-            or search_lower in (item.get("item_code") or "").lower()
-        ]
+    next_cursor = None
+    if len(items) == page_size:
+        next_cursor = encode_cursor(
+            str(items[-1].get("modified") or ""),
+            str(items[-1].get("name") or ""),
+        )
 
-    # -------------------------------------------------
-    # TRANSFORM
-    # -------------------------------------------------
-    formatted_items = []
+    return items, total_items, next_cursor
 
-    for item in items:
 
-        ecommerce_data = EcommerceEngine.transform_item(item)
+def get_products_payload(
+    category: Optional[str] = None,
+    subcategory: Optional[str] = None,
+    search: Optional[str] = None,
+    order_by: Optional[str] = None,
+    page: int = 1,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+) -> CachedPayload:
+    """
+    Same as get_products(), but returns the page already JSON-encoded
+    and serves repeat requests from the page cache.
+    """
+
+    # A new shared snapshot version makes older pages unreachable
+    snapshot = CatalogSnapshot.current()
+
+    key = (
+        category, subcategory, search, order_by,
+        None if cursor else page, page_size, parse_fields(fields), cursor,
+        snapshot.version if snapshot is not None else None,
+    )
 
-        # 🔐 ONLY CONTROL DISPLAY — DO NOT OVERRIDE ENGINE VALUES
-        is_price_visible_global = SiteControl.is_price_visibility_enabled()
+    cached = _page_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = get_products(
+        category=category,
+        subcategory=subcategory,
+        search=search,
+        order_by=order_by,
+        page=page,
+        page_size=page_size,
+        fields=fields,
+        cursor=cursor,
+    )
 
-        formatted_items.append({
-            "item_code": item.get("item_code") or "",
-            "item_name": item.get("item_name") or "",
-            "description": item.get("description") or "",
-            "price": ecommerce_data["price"] if is_price_visible_global else None,
-            "original_price": ecommerce_data["original_price"],
-            "discount_percentage": ecommerce_data["discount_percentage"],
-            "is_on_sale": ecommerce_data["is_on_sale"],
-            "image": normalize_image(
-                ecommerce_data["image"]
-            ),
-            "category": item.get("item_group") or "Uncategorized",
-            "subcategory": item.get("custom_subcategory") or "Other",
-            "stock_status": ecommerce_data["stock_status"],
-            "is_price_visible": ecommerce_data["is_price_visible"],
-            "is_image_visible": ecommerce_data["is_image_visible"],
-        })
+    payload = CachedPayload.from_content(result)
 
-    # -------------------------------------------------
-    # FINAL RESPONSE
-    # -------------------------------------------------
-    return {
-        "status": "success",
-        "items": formatted_items,
-        "pagination": {
-            "page": page,
-            "page_size": page_size,
-            "total_items": total_items,
-            "total_pages": total_pages,
-        },
-        "last_sync": datetime.now(timezone.utc).isoformat(),
-    }
+    if result["status"] == "success":
+        # Pages must not outlive the next promotion start/end
+        ttl = PromotionSchedule.seconds_until_transition(settings.CATALOG_CACHE_TTL)
+        _page_cache.set(key, payload, ttl=ttl)
+
+    return payload
+
+
+def clear_product_cache() -> None:
+    _page_cache.clear()
+
+
+# -------------------------------------------------
+# NDJSON CATALOG EXPORT
+# -------------------------------------------------
+def export_products(
+    category: Optional[str] = None,
+    subcategory: Optional[str] = None,
+    fields: Optional[str] = None,
+) -> Iterator[bytes]:
+    """
+    Returns an NDJSON byte stream of the enabled catalog.
+    Switches are checked before streaming starts, so errors still
+    surface as normal HTTP status codes.
+
+    The last line is always a trailer, {"_export": "complete",
+    "count": N} or {"_export": "error", ...} if ERP failed midway,
+    so a client can tell a truncated export from a full one.
+    """
+
+    output_fields = parse_fields(fields)
+
+    if not _check_catalog_enabled():
+        return iter([encode_json({"_export": "complete", "count": 0}) + b"\n"])
+
+    erp_fields = _erp_fields_for(output_fields)
+    is_price_visible_global = SiteControl.is_price_visibility_enabled()
+    filters = _catalog_filters(category, subcategory)
+
+    def _stream() -> Iterator[bytes]:
+        # Lets the headers out before the first ERP chunk is fetched
+        yield b""
+
+        count = 0
+
+        try:
+            for item in iter_catalog_items(filters, erp_fields):
+                line = _format_item(item, is_price_visible_global, output_fields)
+                yield encode_json(line) + b"\n"
+                count += 1
+        except Exception:
+            # The status code is long gone: say so in the body
+            logger.exception("Catalog export interrupted after %s items", count)
+            yield encode_json({
+                "_export": "error",
+                "count": count,
+                "detail": "Catalog export interrupted. Please retry.",
+            }) + b"\n"
+            return
+
+        yield encode_json({"_export": "complete", "count": count}) + b"\n"
+
+    return _stream()
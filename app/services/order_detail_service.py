@@ -1,54 +1,166 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
 
+from app.core.cache import TTLCache
+from app.core.responses import CachedPayload
 from app.integrations.erp_client import erp_request, ERPError
 from app.core.config import settings
 
 
+ORDER_DOCTYPES = {
+    "sales_order": "Sales Order",
+    "ecommerce_rfq": settings.ECOM_RFQ_DOCTYPE,
+}
+
+# -------------------------
+# Whitelisted fields (everything else stays in ERP)
+# -------------------------
+SALES_ORDER_FIELDS = [
+    "name",
+    "customer",
+    "customer_name",
+    "transaction_date",
+    "status",
+    "docstatus",
+    "currency",
+    "total_qty",
+    "net_total",
+    "total_taxes_and_charges",
+    "grand_total",
+    "rounded_total",
+    "address_display",
+    "per_delivered",
+    "per_billed",
+    "creation",
+    "modified",
+]
+
+SALES_ORDER_ITEM_FIELDS = [
+    "item_code",
+    "item_name",
+    "qty",
+    "uom",
+    "rate",
+    "amount",
+]
+
+RFQ_FIELDS = [
+    "name",
+    "customer_name",
+    "email_id",
+    "phone_number",
+    "vat_id",
+    "status",
+    "docstatus",
+    "building_no",
+    "street_name",
+    "district",
+    "city",
+    "postal_code",
+    "country",
+    "full_address",
+    "payment_mode",
+    "transaction_id",
+    "paid_amount",
+    "payment_date",
+    "grand_total",
+    "currency",
+    "creation",
+    "modified",
+]
+
+RFQ_ITEM_FIELDS = [
+    "item_code",
+    "item_name",
+    "quantity",
+    "unit_pricex",
+    "uom",
+    "amount",
+]
+
+_CHILD_TABLES = {
+    "sales_order": ("items", SALES_ORDER_ITEM_FIELDS),
+    "ecommerce_rfq": (settings.ECOM_RFQ_ITEM_TABLE_FIELD, RFQ_ITEM_FIELDS),
+}
+
+_PARENT_FIELDS = {
+    "sales_order": SALES_ORDER_FIELDS,
+    "ecommerce_rfq": RFQ_FIELDS,
+}
+
+# (order_type, order_id) -> CachedPayload
+_detail_cache = TTLCache(ttl=settings.ORDER_DETAIL_DRAFT_TTL, maxsize=2048)
+
+
+def _pick(doc: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    return {f: doc[f] for f in fields if f in doc}
+
+
+def _trim(order_type: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    data = _pick(doc, _PARENT_FIELDS[order_type])
+    table, item_fields = _CHILD_TABLES[order_type]
+    data[table] = [_pick(row, item_fields) for row in doc.get(table) or []]
+    return data
+
+
 def get_order_detail(order_id: str, order_type: str) -> Dict[str, Any]:
     """
-    Returns full order details from ERP.
+    Returns whitelisted order details from ERP.
     Supports:
     - sales_order
     - ecommerce_rfq
     """
 
-    try:
-        # -------------------------
-        # SALES ORDER
-        # -------------------------
-        if order_type == "sales_order":
-            res = erp_request(
-                method="GET",
-                path=f"/api/resource/Sales Order/{order_id}",
-            )
-
-        # -------------------------
-        # E-COMMERCE RFQ
-        # -------------------------
-        elif order_type == "ecommerce_rfq":
-            res = erp_request(
-                method="GET",
-                path=f"/api/resource/{settings.ECOM_RFQ_DOCTYPE}/{order_id}",
-            )
-
-        else:
-            return {
-                "success": False,
-                "message": "Invalid order type",
-            }
-
-        data = res.get("data", {})
-
-        # Remove sensitive fields if needed
-        data.pop("delivery_date", None)  # skipping for now
+    doctype = ORDER_DOCTYPES.get(order_type)
 
+    if not doctype:
         return {
-            "success": True,
-            "data": data,
+            "success": False,
+            "message": "Invalid order type",
         }
 
+    try:
+        res = erp_request(
+            method="GET",
+            path=f"/api/resource/{doctype}/{order_id}",
+        )
+
     except ERPError:
         return {
             "success": False,
             "message": "Order not found",
         }
+
+    return {
+        "success": True,
+        "data": _trim(order_type, res.get("data") or {}),
+    }
+
+
+def get_order_detail_payload(order_id: str, order_type: str) -> CachedPayload:
+    """
+    Cached, pre-encoded order detail.
+    Submitted documents (docstatus 1) are kept for
+    ORDER_DETAIL_SUBMITTED_TTL, drafts only ORDER_DETAIL_DRAFT_TTL.
+    """
+
+    key = (order_type, order_id)
+
+    cached = _detail_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = get_order_detail(order_id, order_type)
+    payload = CachedPayload.from_content(result)
+
+    if result["success"]:
+        submitted = result["data"].get("docstatus") == 1
+        ttl = settings.ORDER_DETAIL_SUBMITTED_TTL if submitted else settings.ORDER_DETAIL_DRAFT_TTL
+        _detail_cache.set(key, payload, ttl=ttl)
+
+    return payload
+
+
+def clear_order_detail(doctype: str, order_id: str) -> None:
+    for order_type, known_doctype in ORDER_DOCTYPES.items():
+        if known_doctype == doctype:
+            _detail_cache.pop((order_type, order_id))
@@ -1,19 +1,39 @@
+import contextvars
+import time
+import uuid
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
 from datetime import datetime, timezone
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 
 from fastapi import HTTPException
+from jose import jwt, JWTError
 
+from app.core.cache import TTLCache
 from app.core.site_control import SiteControl
 from app.core.config import settings
-from app.integrations.erp_client import erp_request, ERPError
+from app.integrations.erp_client import erp_request, ERPError, ERPUnavailableError
 from app.services.customer_service import get_or_create_customer
-from app.services.ecommerce.ecommerce_engine import EcommerceEngine
+from app.services.ecommerce.promotion_schedule import PromotionSchedule
 
 
 class OrderValidationError(ValueError):
     pass
 
 
+# Shared pool for checkout I/O (customer resolution + item pricing)
+_checkout_pool = ThreadPoolExecutor(
+    max_workers=settings.CHECKOUT_IO_WORKERS,
+    thread_name_prefix="checkout",
+)
+
+RFQ_REQUIRED_ADDRESS_FIELDS = ["building_no", "postal_code", "city", "full_address"]
+
+# item_code -> raw ERP pricing fields (quotes read this; live checkout refreshes it)
+_pricing_cache = TTLCache(ttl=settings.QUOTE_ITEM_CACHE_TTL, maxsize=4096)
+
+QUOTE_ALGORITHM = "HS256"
+
+
 def _today():
     return datetime.now(timezone.utc).date().isoformat()
 
@@ -49,6 +69,8 @@ def _fetch_item_from_erp(item_code: str) -> Dict[str, Any]:
             path=f"/api/resource/Item/{item_code}",
             params={"fields": str(fields).replace("'", '"')},
         )
+    except ERPUnavailableError:
+        raise
     except ERPError:
         raise OrderValidationError("Item service temporarily unavailable.")
 
@@ -56,13 +78,28 @@ def _fetch_item_from_erp(item_code: str) -> Dict[str, Any]:
     if not item:
         raise OrderValidationError(f"Item not found: {item_code}")
 
+    _pricing_cache.set(item_code, item)
+    return item
+
+
+def _fetch_item_cached(item_code: str) -> Dict[str, Any]:
+    item = _pricing_cache.get(item_code)
+    if item is None:
+        item = _fetch_item_from_erp(item_code)
     return item
 
 
+def forget_item_price(item_code: str) -> None:
+    _pricing_cache.pop(item_code)
+
+
 # =================================================
-# RFQ
+# CHECKOUT PIPELINE
+# 1. local validation (no I/O, fail fast)
+# 2. customer resolution ‖ cart pricing (concurrent)
+# 3. single document POST
 # =================================================
-def create_ecommerce_rfq(payload: Dict[str, Any]) -> Dict[str, Any]:
+def _check_store_open() -> None:
 
     # 🔐 MASTER SWITCH
     if not SiteControl.is_website_integration_enabled():
@@ -79,27 +116,210 @@ def create_ecommerce_rfq(payload: Dict[str, Any]) -> Dict[str, Any]:
     if SiteControl.is_site_frozen():
         raise OrderValidationError("Store is currently under maintenance.")
 
-    cart: List[Dict[str, Any]] = payload.get("cart", [])
+
+def _validate_cart(cart: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], float]]:
+
     if not cart:
         raise OrderValidationError("Cart cannot be empty")
 
-    customer_id = get_or_create_customer(payload)
-    items_payload = []
+    lines = []
 
     for item in cart:
-        item_code = item.get("item_code")
         qty = float(item.get("qty", 0))
 
         if qty <= 0:
             raise OrderValidationError("Quantity must be greater than zero")
 
-        item_data = _fetch_item_from_erp(item_code)
-        transformed = EcommerceEngine.transform_item(item_data)
+        lines.append((item, qty))
+
+    return lines
+
+
+def _validate_rfq_address(address: Dict[str, Any]) -> None:
+    for field in RFQ_REQUIRED_ADDRESS_FIELDS:
+        if not address.get(field):
+            raise OrderValidationError(f"{field} is required")
+
+
+def _price_item(item_code: str, cached: bool = False) -> float:
+
+    item_data = _fetch_item_cached(item_code) if cached else _fetch_item_from_erp(item_code)
+    transformed = PromotionSchedule.transform_item(item_data)
+
+    if not transformed["is_price_visible"] or transformed["price"] is None:
+        raise OrderValidationError(f"Price hidden for item {item_code}")
+
+    return transformed["price"]
+
+
+def _submit(fn, *args) -> Future:
+    # Carry request context (contextvars) into the worker thread
+    return _checkout_pool.submit(contextvars.copy_context().run, fn, *args)
+
+
+def _resolve_customer_and_prices(
+    payload: Dict[str, Any],
+    item_codes: List[str],
+) -> Tuple[str, Dict[str, float]]:
+    """
+    Runs get_or_create_customer() and per-item pricing concurrently.
+    Wall time is the slowest branch, not the sum; the first failure
+    is raised as soon as it happens.
+    """
+
+    quoted = _quoted_prices(payload.get("quote_token"))
+
+    customer_future = _submit(get_or_create_customer, payload)
+    price_futures = {
+        code: _submit(_price_item, code)
+        for code in dict.fromkeys(item_codes)
+        if code not in quoted
+    }
+
+    futures = [customer_future, *price_futures.values()]
+    done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+
+    for future in futures:
+        if future in done and future.exception() is not None:
+            for other in pending:
+                other.cancel()
+            raise future.exception()
+
+    prices = {code: quoted[code] for code in item_codes if code in quoted}
+    prices.update((code, future.result()) for code, future in price_futures.items())
+
+    return customer_future.result(), prices
+
+
+def _resolve_customer_and_price_map(
+    payload: Dict[str, Any],
+    item_codes: List[str],
+) -> Tuple[str, Dict[str, float], Dict[str, str]]:
+    """
+    Bulk variant: a failing item only fails the orders containing it.
+    Returns (customer_id, prices, item errors).
+    """
+
+    quoted = _quoted_prices(payload.get("quote_token"))
+
+    customer_future = _submit(get_or_create_customer, payload)
+    price_futures = {
+        code: _submit(_price_item, code)
+        for code in dict.fromkeys(item_codes)
+        if code not in quoted
+    }
+
+    customer_id = customer_future.result()
+
+    prices = {code: quoted[code] for code in item_codes if code in quoted}
+    errors: Dict[str, str] = {}
+
+    for code, future in price_futures.items():
+        try:
+            prices[code] = future.result()
+        except OrderValidationError as e:
+            errors[code] = str(e)
+
+    return customer_id, prices, errors
+
 
-        if not transformed["is_price_visible"]:
-            raise OrderValidationError(f"Price hidden for item {item_code}")
+# =================================================
+# QUOTES
+# A quote is a signed {item_code: unit price} map.
+# While it is valid checkout skips the per-item ERP
+# fetch; an expired or tampered token is ignored and
+# the cart is priced live.
+# =================================================
+def create_quote(cart: List[Dict[str, Any]]) -> Dict[str, Any]:
+
+    # Same gates as checkout: no prices for a closed store
+    _check_store_open()
+
+    lines = _validate_cart(cart)
+    codes = list(dict.fromkeys(item.get("item_code") for item, _ in lines))
+
+    futures = {code: _submit(_price_item, code, True) for code in codes}
+    prices = {code: future.result() for code, future in futures.items()}
+
+    items = []
+    total = 0.0
+
+    for item, qty in lines:
+        item_code = item.get("item_code")
+        amount = qty * prices[item_code]
+        total += amount
+
+        items.append({
+            "item_code": item_code,
+            "qty": qty,
+            "price": prices[item_code],
+            "amount": amount,
+        })
 
-        unit_price = transformed["price"]
+    # A quote never outlives the next promotion start/end
+    ttl = int(PromotionSchedule.seconds_until_transition(settings.QUOTE_TTL_SECONDS))
+    expires_at = int(time.time()) + ttl
+
+    token = None
+    if settings.QUOTE_SECRET and ttl > 0:
+        token = jwt.encode(
+            {
+                "type": "quote",
+                "jti": uuid.uuid4().hex,
+                "prices": prices,
+                "exp": expires_at,
+            },
+            settings.QUOTE_SECRET,
+            algorithm=QUOTE_ALGORITHM,
+        )
+
+    return {
+        "items": items,
+        "total": total,
+        "quote_token": token,
+        "expires_at": datetime.fromtimestamp(expires_at, timezone.utc).isoformat(),
+    }
+
+
+def _quoted_prices(token: Optional[str]) -> Dict[str, float]:
+
+    if not token or not settings.QUOTE_SECRET:
+        return {}
+
+    try:
+        claims = jwt.decode(token, settings.QUOTE_SECRET, algorithms=[QUOTE_ALGORITHM])
+    except JWTError:
+        return {}
+
+    if claims.get("type") != "quote":
+        return {}
+
+    prices = claims.get("prices")
+    if not isinstance(prices, dict):
+        return {}
+
+    return {
+        code: float(price)
+        for code, price in prices.items()
+        if isinstance(price, (int, float))
+    }
+
+
+# =================================================
+# DOCUMENT BUILDERS + SUBMIT
+# =================================================
+def _build_rfq_doc(
+    customer_id: str,
+    lines: List[Tuple[Dict[str, Any], float]],
+    prices: Dict[str, float],
+    address: Dict[str, Any],
+) -> Dict[str, Any]:
+
+    items_payload = []
+
+    for item, qty in lines:
+        item_code = item.get("item_code")
+        unit_price = prices[item_code]
 
         items_payload.append({
             "item_code": item_code,
@@ -110,16 +330,6 @@ def create_ecommerce_rfq(payload: Dict[str, Any]) -> Dict[str, Any]:
             "amount": qty * unit_price,
         })
 
-    # ===============================
-    # ADDRESS VALIDATION (MANDATORY)
-    # ===============================
-    address = payload.get("address", {})
-
-    required_fields = ["building_no", "postal_code", "city", "full_address"]
-    for field in required_fields:
-        if not address.get(field):
-            raise OrderValidationError(f"{field} is required")
-
     rfq_payload = {
         "doctype": settings.ECOM_RFQ_DOCTYPE,
         "customer_name": customer_id,
@@ -134,72 +344,22 @@ def create_ecommerce_rfq(payload: Dict[str, Any]) -> Dict[str, Any]:
     }
 
     # Remove empty values safely
-    rfq_payload = {k: v for k, v in rfq_payload.items() if v not in (None, "", [])}
-
-    try:
-        res = erp_request(
-            method="POST",
-            path=f"/api/resource/{settings.ECOM_RFQ_DOCTYPE}",
-            json=rfq_payload,
-        )
-    except ERPError:
-        raise OrderValidationError("Order service temporarily unavailable.")
-
-    doc = res.get("data") or {}
-    rfq_id = doc.get("name")
-
-    return {
-        "status": "submitted",
-        "ecommerce_rfq_id": rfq_id,
-        "customer_id": customer_id,
-        "created_at": _today(),
-    }
-
-
-# =================================================
-# SALES ORDER
-# =================================================
-def create_sales_order(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in rfq_payload.items() if v not in (None, "", [])}
 
-    if not SiteControl.is_website_integration_enabled():
-        raise HTTPException(
-            status_code=503,
-            detail="E-commerce integration is currently disabled."
-        )
 
-    if not SiteControl.is_customer_sync_enabled():
-        raise OrderValidationError("Customer service is disabled.")
-
-    if SiteControl.is_site_frozen():
-        raise OrderValidationError("Store is currently under maintenance.")
-
-    cart: List[Dict[str, Any]] = payload.get("cart", [])
-    if not cart:
-        raise OrderValidationError("Cart cannot be empty")
-
-    customer_id = get_or_create_customer(payload)
-    address = payload.get("address", {})
-
-    DEFAULT_WAREHOUSE = SiteControl.get_default_source_warehouse()
-    if not DEFAULT_WAREHOUSE:
-        raise OrderValidationError("Default warehouse not configured.")
+def _build_sales_order_doc(
+    customer_id: str,
+    lines: List[Tuple[Dict[str, Any], float]],
+    prices: Dict[str, float],
+    address: Dict[str, Any],
+    warehouse: str,
+) -> Dict[str, Any]:
 
     items_payload = []
 
-    for item in cart:
+    for item, qty in lines:
         item_code = item.get("item_code")
-        qty = float(item.get("qty", 0))
-
-        if qty <= 0:
-            raise OrderValidationError("Quantity must be greater than zero")
-
-        item_data = _fetch_item_from_erp(item_code)
-        transformed = EcommerceEngine.transform_item(item_data)
-
-        if not transformed["is_price_visible"]:
-            raise OrderValidationError(f"Price hidden for item {item_code}")
-
-        unit_price = transformed["price"]
+        unit_price = prices[item_code]
 
         items_payload.append({
             "item_code": item_code,
@@ -208,31 +368,101 @@ def create_sales_order(payload: Dict[str, Any]) -> Dict[str, Any]:
             "price_list_rate": unit_price,
             "rate": unit_price,
             "amount": qty * unit_price,
-            "warehouse": DEFAULT_WAREHOUSE,
+            "warehouse": warehouse,
         })
 
-    sales_order_payload = {
+    return {
         "doctype": "Sales Order",
         "customer": customer_id,
         "transaction_date": _today(),
         "delivery_date": _today(),
-        "set_warehouse": DEFAULT_WAREHOUSE,
+        "set_warehouse": warehouse,
         "selling_price_list": "Standard Selling",
         "items": items_payload,
         "address_display": address.get("full_address"),
     }
 
+
+def _post_order(doc: Dict[str, Any]) -> str | None:
+
     try:
         res = erp_request(
             method="POST",
-            path="/api/resource/Sales Order",
-            json=sales_order_payload,
+            path=f"/api/resource/{doc['doctype']}",
+            json=doc,
         )
+    except ERPUnavailableError:
+        raise
     except ERPError:
         raise OrderValidationError("Order service temporarily unavailable.")
 
-    doc = res.get("data") or {}
-    so_id = doc.get("name")
+    return (res.get("data") or {}).get("name")
+
+
+def _get_warehouse() -> str:
+
+    warehouse = SiteControl.get_default_source_warehouse()
+    if not warehouse:
+        raise OrderValidationError("Default warehouse not configured.")
+
+    return warehouse
+
+
+# =================================================
+# RFQ
+# =================================================
+def create_ecommerce_rfq(payload: Dict[str, Any]) -> Dict[str, Any]:
+
+    _check_store_open()
+
+    # 1️⃣ Local validation
+    lines = _validate_cart(payload.get("cart", []))
+
+    # ===============================
+    # ADDRESS VALIDATION (MANDATORY)
+    # ===============================
+    address = payload.get("address") or {}
+    _validate_rfq_address(address)
+
+    # 2️⃣ Customer ‖ pricing
+    customer_id, prices = _resolve_customer_and_prices(
+        payload,
+        [item.get("item_code") for item, _ in lines],
+    )
+
+    # 3️⃣ Submit
+    rfq_id = _post_order(_build_rfq_doc(customer_id, lines, prices, address))
+
+    return {
+        "status": "submitted",
+        "ecommerce_rfq_id": rfq_id,
+        "customer_id": customer_id,
+        "created_at": _today(),
+    }
+
+
+# =================================================
+# SALES ORDER
+# =================================================
+def create_sales_order(payload: Dict[str, Any]) -> Dict[str, Any]:
+
+    _check_store_open()
+
+    # 1️⃣ Local validation
+    lines = _validate_cart(payload.get("cart", []))
+    address = payload.get("address") or {}
+    warehouse = _get_warehouse()
+
+    # 2️⃣ Customer ‖ pricing
+    customer_id, prices = _resolve_customer_and_prices(
+        payload,
+        [item.get("item_code") for item, _ in lines],
+    )
+
+    # 3️⃣ Submit
+    so_id = _post_order(
+        _build_sales_order_doc(customer_id, lines, prices, address, warehouse)
+    )
 
     return {
         "status": "submitted",
@@ -257,3 +487,108 @@ def create_ecommerce_order(payload: Dict[str, Any]) -> Dict[str, Any]:
 
     else:
         raise OrderValidationError("Invalid Default Order Type.")
+
+
+# =================================================
+# BULK ORDERS (B2B)
+# One customer resolution + one pricing pass over the
+# union of item codes, then bounded-concurrency submits.
+# =================================================
+def create_ecommerce_orders(payload: Dict[str, Any]) -> Dict[str, Any]:
+
+    order_type = SiteControl.get_default_order_type()
+
+    if order_type not in ("E-Commerce RFQ", "Sales Order"):
+        raise OrderValidationError("Invalid Default Order Type.")
+
+    orders = payload.get("orders") or []
+    if len(orders) > settings.BULK_ORDER_MAX_ORDERS:
+        raise OrderValidationError(
+            f"Too many orders (max {settings.BULK_ORDER_MAX_ORDERS})."
+        )
+
+    _check_store_open()
+
+    warehouse = _get_warehouse() if order_type == "Sales Order" else None
+    shared_address = payload.get("address") or {}
+
+    results: List[Dict[str, Any]] = []
+    prepared: List[Tuple[int, list, Dict[str, Any]]] = []
+
+    # 1️⃣ Local validation — per order, nothing shared fails the batch
+    for index, order in enumerate(orders):
+        address = order.get("address") or shared_address
+
+        try:
+            lines = _validate_cart(order.get("cart", []))
+            if order_type == "E-Commerce RFQ":
+                _validate_rfq_address(address)
+        except OrderValidationError as e:
+            results.append({"index": index, "status": "failed", "error": str(e)})
+            continue
+
+        prepared.append((index, lines, address))
+
+    if not prepared:
+        results.sort(key=lambda r: r["index"])
+        return {
+            "status": "completed",
+            "customer_id": None,
+            "submitted": 0,
+            "failed": len(results),
+            "results": results,
+            "created_at": _today(),
+        }
+
+    # 2️⃣ Customer ‖ pricing of the union of item codes
+    item_codes = [item.get("item_code") for _, lines, _ in prepared for item, _ in lines]
+    customer_id, prices, item_errors = _resolve_customer_and_price_map(payload, item_codes)
+
+    def _submit_one(index: int, lines: list, address: Dict[str, Any]) -> Dict[str, Any]:
+
+        for item, _ in lines:
+            error = item_errors.get(item.get("item_code"))
+            if error:
+                return {"index": index, "status": "failed", "error": error}
+
+        if order_type == "E-Commerce RFQ":
+            doc = _build_rfq_doc(customer_id, lines, prices, address)
+        else:
+            doc = _build_sales_order_doc(customer_id, lines, prices, address, warehouse)
+
+        try:
+            order_id = _post_order(doc)
+        except OrderValidationError as e:
+            return {"index": index, "status": "failed", "error": str(e)}
+        except ERPUnavailableError:
+            # Never sent (shed / out of time): safe to submit again
+            return {
+                "index": index,
+                "status": "not_submitted",
+                "error": "Order was not sent. Please retry it.",
+            }
+
+        return {"index": index, "status": "submitted", "order_id": order_id}
+
+    # 3️⃣ Submit with bounded concurrency
+    with ThreadPoolExecutor(
+        max_workers=settings.BULK_ORDER_CONCURRENCY,
+        thread_name_prefix="bulk-order",
+    ) as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, _submit_one, index, lines, address)
+            for index, lines, address in prepared
+        ]
+        results.extend(future.result() for future in futures)
+
+    results.sort(key=lambda r: r["index"])
+    submitted = sum(1 for r in results if r["status"] == "submitted")
+
+    return {
+        "status": "completed",
+        "customer_id": customer_id,
+        "submitted": submitted,
+        "failed": len(results) - submitted,
+        "results": results,
+        "created_at": _today(),
+    }
@@ -1,16 +1,80 @@
+import base64
+import binascii
 import json
-from typing import Any, Dict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
 from app.core.config import settings
 from app.integrations.erp_client import erp_request
 
 
-def list_orders_by_phone(phone_number: str, limit: int = 50) -> Dict[str, Any]:
+# -------------------------------------------------
+# WATERMARKS
+# -------------------------------------------------
+def encode_watermark(modified: str, names: List[str]) -> str:
+    """
+    The newest `modified` a client has seen, plus the orders it
+    already has at exactly that timestamp.
+    """
+
+    raw = json.dumps([modified, sorted(names)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_watermark(since: str) -> tuple:
+    # Plain timestamps from older clients: nothing known at the boundary
+    try:
+        datetime.fromisoformat(since)
+        return since, []
+    except ValueError:
+        pass
+
+    try:
+        padded = since + "=" * (-len(since) % 4)
+        modified, names = json.loads(base64.urlsafe_b64decode(padded))
+        datetime.fromisoformat(modified)
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Invalid 'since' watermark")
+
+    if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+        raise ValueError("Invalid 'since' watermark")
+
+    return modified, names
+
+
+def _next_watermark(orders: List[Dict[str, Any]], since: Optional[tuple]) -> Optional[str]:
+    modified, names = since or ("", [])
+
+    for order in orders:
+        order_modified = str(order.get("modified") or "")
+        if order_modified > modified:
+            modified, names = order_modified, []
+        if order_modified == modified:
+            names = names + [str(order.get("name") or "")]
+
+    return encode_watermark(modified, names) if modified else None
+
+
+def list_orders_by_phone(
+    phone_number: str,
+    limit: int = 50,
+    since: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Lists RFQs for a phone number, newest first.
+
+    With `since` (the watermark from a previous call) only rows
+    modified after it are returned, oldest change first, so the
+    watermark can advance through changes one page at a time.
+    Orders sharing the watermark's `modified` are matched with >=
+    and skipped by name, so a same-timestamp update is not lost.
+    """
 
     if limit > 100:
         limit = 100
 
     filters = [["phone_number", "=", phone_number]]
+    seen = decode_watermark(since) if since else None
 
     fields = [
         "name",
@@ -27,21 +91,42 @@ def list_orders_by_phone(phone_number: str, limit: int = 50) -> Dict[str, Any]:
     ]
 
     params = {
-        "filters": json.dumps(filters),
         "fields": json.dumps(fields),
-        "order_by": "modified desc",
+        "order_by": "modified asc, name asc" if seen else "modified desc",
         "limit_page_length": limit,
     }
 
+    if seen:
+        # modified >= m AND (modified > m OR name NOT IN names)
+        modified, names = seen
+        filters.append(["modified", ">=", modified])
+        if names:
+            params["or_filters"] = json.dumps([
+                ["modified", ">", modified],
+                ["name", "not in", names],
+            ])
+
+    params["filters"] = json.dumps(filters)
+
     res = erp_request(
         "GET",
         f"/api/resource/{settings.ECOM_RFQ_DOCTYPE_URL}",
         params=params,
     )
 
+    orders = res.get("data", []) or []
+
+    watermark = _next_watermark(orders, seen)
+
+    if seen:
+        # Clients expect newest first, like the full list
+        orders.reverse()
+
     return {
         "status": "success",
-        "orders": res.get("data", []) or [],
+        "orders": orders,
+        "watermark": watermark,
+        "has_more": len(orders) == limit,
     }
 
 
@@ -1,9 +1,90 @@
+from typing import Any, Dict, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.services.customer_service import (
     find_customer_by_email,
-    get_or_create_customer,
+    create_customer,
+    _find_customer_doc_by_phone,
+    CustomerPhones,
+    _require_customer_sync,
     CustomerError,
 )
-from app.integrations.erp_client import erp_request, ERPError
+from app.integrations.erp_client import erp_request, ERPError, ERPUnavailableError
+
+
+# email -> profile, and customer_id -> email so Customer webhooks
+# (which only carry the document name) can drop the entry
+_profile_cache = TTLCache(ttl=settings.PROFILE_CACHE_TTL, maxsize=4096)
+_profile_emails = TTLCache(ttl=settings.PROFILE_CACHE_TTL, maxsize=4096)
+
+# Payload key -> ERP Customer field
+PROFILE_FIELDS = {
+    "customer_name": "customer_name",
+    "phone": "custom_phone_number",
+    "vat_number": "custom_vat_registration_number",
+}
+
+
+def _to_profile(customer: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "customer_id": customer["name"],
+        "customer_name": customer.get("customer_name"),
+        "phone": customer.get("custom_phone_number"),
+        "email": customer.get("custom_email"),
+        "vat_number": customer.get("custom_vat_registration_number"),
+    }
+
+
+def _remember(email: str, profile: Dict[str, Any]) -> None:
+    # Customers matched by phone may carry another (or no) email
+    if profile["email"] != email:
+        return
+
+    _profile_cache.set(email, profile)
+    _profile_emails.set(profile["customer_id"], email)
+
+
+def _lookup_profile(email: str) -> Optional[Dict[str, Any]]:
+    profile = _profile_cache.get(email)
+    if profile is not None:
+        return profile
+
+    customer = find_customer_by_email(email)
+    if not customer:
+        return None
+
+    profile = _to_profile(customer)
+    _remember(email, profile)
+    return profile
+
+
+def forget_customer_profile(customer_id: str) -> None:
+    """
+    Drops the cached profile of a Customer changed in ERP.
+    """
+
+    email = _profile_emails.get(customer_id)
+    if email:
+        _profile_cache.pop(email)
+        _profile_emails.pop(customer_id)
+
+
+def _publish_change(profile: Dict[str, Any]) -> None:
+    # Other workers may hold this profile too: drop it everywhere
+    # (cache_invalidation imports this module)
+    from app.services.cache_invalidation import CacheEvents
+
+    CacheEvents.publish([{
+        "doctype": "Customer",
+        "name": profile["customer_id"],
+        "data": {"custom_phone_number": profile["phone"]},
+    }])
+
+
+def clear_profile_cache() -> None:
+    _profile_cache.clear()
+    _profile_emails.clear()
 
 
 # ==========================================
@@ -11,9 +92,9 @@ from app.integrations.erp_client import erp_request, ERPError
 # ==========================================
 def get_profile(email: str):
 
-    customer = find_customer_by_email(email)
+    profile = _lookup_profile(email)
 
-    if not customer:
+    if not profile:
         return {
             "exists": False,
             "profile": None
@@ -21,13 +102,7 @@ def get_profile(email: str):
 
     return {
         "exists": True,
-        "profile": {
-            "customer_id": customer["name"],
-            "customer_name": customer.get("customer_name"),
-            "phone": customer.get("custom_phone_number"),
-            "email": customer.get("custom_email"),
-            "vat_number": customer.get("custom_vat_registration_number"),
-        }
+        "profile": profile,
     }
 
 
@@ -35,44 +110,82 @@ def get_profile(email: str):
 # UPDATE PROFILE (UPSERT SAFE VERSION)
 # ==========================================
 def update_profile(email: str, payload: dict):
+    """
+    One ERP write: a new customer is created with every field, an
+    existing one gets a PUT of the fields that changed. Returns the
+    profile from ERP's response, so no reload is needed.
 
-    # 1️⃣ Create OR Get Customer
-    # IMPORTANT:
-    # get_or_create_customer() now returns a STRING (customer_id)
+    Changes are diffed against a fresh read, never the profile cache:
+    an edit made elsewhere in the last PROFILE_CACHE_TTL seconds must
+    not make us skip the write. Saves are published to the cache event
+    log, so other workers drop their copy too.
+    """
+
+    # 1️⃣ Find the customer (fresh from ERP)
     try:
-        customer_id = get_or_create_customer({
-            "email": email,
-            "customer_name": payload.get("customer_name"),
-            "phone": payload.get("phone"),
-            "vat_number": payload.get("vat_number"),
-        })
-    except Exception:
-        raise CustomerError("Customer creation failed.")
+        _require_customer_sync()
+
+        customer = find_customer_by_email(email)
+        profile = _to_profile(customer) if customer else None
+
+        # Legacy customers were only keyed by phone
+        phone = payload.get("phone")
+        if not profile and phone:
+            existing = _find_customer_doc_by_phone(phone)
+            if existing:
+                profile = _to_profile(existing)
 
-    # 2️⃣ Prepare update fields (only if provided)
-    update_fields = {}
+        # 2️⃣ New customer: create it with all fields at once
+        if not profile:
+            profile = _to_profile(create_customer({
+                "email": email,
+                "customer_name": payload.get("customer_name"),
+                "phone": payload.get("phone"),
+                "vat_number": payload.get("vat_number"),
+            }))
+            _remember(email, profile)
 
-    if payload.get("customer_name"):
-        update_fields["customer_name"] = payload["customer_name"]
+            return {"status": "updated", "exists": True, "profile": profile}
 
-    if payload.get("phone"):
-        update_fields["custom_phone_number"] = payload["phone"]
+    except ERPUnavailableError:
+        raise
+    except Exception:
+        raise CustomerError("Customer creation failed.")
 
-    if payload.get("vat_number"):
-        update_fields["custom_vat_registration_number"] = payload["vat_number"]
+    # 3️⃣ Only send fields that were provided and differ
+    update_fields = {
+        field: payload[key]
+        for key, field in PROFILE_FIELDS.items()
+        if payload.get(key) and payload[key] != profile[key]
+    }
 
-    # 3️⃣ If nothing to update, return success
+    # 4️⃣ If nothing to update, return success
     if not update_fields:
-        return {"status": "updated"}
+        return {"status": "updated", "exists": True, "profile": profile}
 
-    # 4️⃣ Update ERP Customer
+    # 5️⃣ Update ERP Customer; the response is the saved document
     try:
-        erp_request(
+        res = erp_request(
             "PUT",
-            f"/api/resource/Customer/{customer_id}",
+            f"/api/resource/Customer/{profile['customer_id']}",
             json=update_fields,
         )
+    except ERPUnavailableError:
+        raise
     except ERPError:
         raise CustomerError("Profile update failed.")
 
-    return {"status": "updated"}
+    doc = res.get("data") or {}
+
+    if doc.get("name"):
+        profile = _to_profile(doc)
+    else:
+        profile = {**profile, **{k: payload[k] for k, f in PROFILE_FIELDS.items() if f in update_fields}}
+
+    _remember(email, profile)
+    _publish_change(profile)
+
+    if "custom_phone_number" in update_fields:
+        CustomerPhones.apply_customer(profile["customer_id"], {"custom_phone_number": profile["phone"]})
+
+    return {"status": "updated", "exists": True, "profile": profile}
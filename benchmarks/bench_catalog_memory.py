@@ -0,0 +1,104 @@
+"""
+Memory held by a cached catalog, per representation.
+
+Compares, for the same ERP rows:
+  1. dict rows          — ERP Item rows as returned by /api/resource/Item
+  2. CatalogItem        — slotted rows, packed flags, interned categories
+  3. engine dicts       — EcommerceEngine.transform_item() output
+  4. EngineResult       — slotted engine output, packed flags
+
+Every row gets freshly allocated strings (as json.loads would), so
+interning has the same effect as on real ERP responses.
+
+Usage:
+    python -m benchmarks.bench_catalog_memory [items]
+"""
+
+import gc
+import json
+import sys
+import tracemalloc
+
+from app.services.catalog_snapshot import SNAPSHOT_FIELDS
+from app.services.ecommerce.catalog_item import CatalogItem, EngineResult
+from app.services.ecommerce.ecommerce_engine import EcommerceEngine
+
+
+def _erp_row(i: int) -> dict:
+    row = {
+        "item_code": f"ITEM-{i:06d}",
+        "name": f"ITEM-{i:06d}",
+        "item_name": f"Hydraulic Hose Fitting {i} — 3/8\" BSP",
+        "custom_subcategory": f"Subcategory {i % 12}",
+        "image": f"/files/item-{i}.jpg",
+        "description": "<p>Heavy duty fitting, zinc plated steel.</p>",
+        "item_group": f"Category {i % 7}",
+        "modified": f"2026-01-{i % 28 + 1:02d} 10:00:00.{i:06d}",
+        "custom_standard_selling_price": 120.5 + i,
+        "custom_ecommerce_price": 120.5 + i,
+        "custom_mrp_price": 150.0 + i,
+        "custom_fixed_price": 0,
+        "custom_mrp_rate": 0,
+        "custom_enable_promotion": 1 if i % 3 == 0 else 0,
+        "custom_promotion_base_price": None,
+        "custom_promotion_type": "Percentage",
+        "custom_promotion_discount_": 10,
+        "custom_promotion_start": "2020-01-01",
+        "custom_promotion_end": "2099-12-31",
+        "custom_promotion_price_manual": None,
+        "custom_promotional_price": 108.45 + i,
+        "custom_promotional_rate": 1,
+        "custom_show_strike_price": 1,
+        "custom_show_price": 1,
+        "custom_show_image": 1,
+        "custom_show_stock": 1,
+        "disabled": 0,
+        "custom_enable_item": 1,
+    }
+
+    # Round-trip values so no value string is shared between rows
+    # (keys are, as json.loads memoizes them within a response)
+    values = json.loads(json.dumps([row.get(f) for f in SNAPSHOT_FIELDS]))
+    return dict(zip(SNAPSHOT_FIELDS, values))
+
+
+def _measure(build) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    data = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, data
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    rows_size, rows = _measure(lambda: [_erp_row(i) for i in range(count)])
+
+    # Source dicts are freed as we go; only what CatalogItem keeps counts
+    compact_size, compact = _measure(lambda: [CatalogItem.from_row(_erp_row(i)) for i in range(count)])
+
+    engine_size, engine = _measure(lambda: [EcommerceEngine.transform_item(r) for r in rows])
+    result_size, results = _measure(lambda: [EngineResult.from_dict(d) for d in engine])
+
+    # Both representations must price identically
+    for row, item in zip(rows[:1000], compact):
+        assert EcommerceEngine.transform_item(row) == EcommerceEngine.transform_item(item)
+
+    print(f"items={count}")
+
+    for name, size, baseline in (
+        ("dict rows", rows_size, rows_size),
+        ("CatalogItem", compact_size, rows_size),
+        ("engine dicts", engine_size, engine_size),
+        ("EngineResult", result_size, engine_size),
+    ):
+        print(
+            f"{name:<14} {size / 2 ** 20:8.1f} MiB  "
+            f"{size / count:7.0f} B/item  {baseline / size:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Per-request serialisation cost of a /products page.
+
+Compares:
+  1. FastAPI default   — jsonable_encoder + stdlib json (JSONResponse)
+  2. FastJSONResponse  — jsonable_encoder + orjson
+  3. CachedPayload     — pre-encoded bytes (cache hit, no encoding)
+
+Usage:
+    python -m benchmarks.bench_json_serialization [page_size] [rounds]
+"""
+
+import sys
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.responses import CachedPayload, FastJSONResponse, cached_json_response
+from app.services.item_service import _format_item
+
+
+def _erp_item(i: int) -> dict:
+    return {
+        "item_code": f"ITEM-{i:06d}",
+        "item_name": f"Hydraulic Hose Fitting {i} — 3/8\" BSP",
+        "custom_subcategory": f"Subcategory {i % 12}",
+        "image": f"/files/item-{i}.jpg",
+        "description": "<p>Heavy duty fitting, zinc plated steel.</p>" * 3,
+        "item_group": f"Category {i % 7}",
+        "custom_ecommerce_price": 120.5 + i,
+        "custom_mrp_price": 150.0 + i,
+        "custom_fixed_price": 0,
+        "custom_mrp_rate": 0,
+        "custom_enable_promotion": i % 3 == 0,
+        "custom_promotion_type": "Percentage",
+        "custom_promotion_discount_": 10,
+        "custom_promotion_start": "2020-01-01",
+        "custom_promotion_end": "2099-12-31",
+        "custom_promotional_price": 108.45 + i,
+        "custom_promotional_rate": 1,
+        "custom_show_strike_price": 1,
+        "custom_show_price": 1,
+        "custom_show_image": 1,
+        "custom_show_stock": 1,
+    }
+
+
+def _page(page_size: int) -> dict:
+    return {
+        "status": "success",
+        "items": [_format_item(_erp_item(i), True) for i in range(page_size)],
+        "pagination": {
+            "page": 1,
+            "page_size": page_size,
+            "total_items": page_size * 40,
+            "total_pages": 40,
+        },
+        "last_sync": "2026-01-01T00:00:00+00:00",
+    }
+
+
+def main() -> None:
+    page_size = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    page = _page(page_size)
+    payload = CachedPayload.from_content(page)
+
+    cases = {
+        "stdlib (FastAPI default)": lambda: JSONResponse(jsonable_encoder(page)),
+        "FastJSONResponse": lambda: FastJSONResponse(jsonable_encoder(page)),
+        "CachedPayload (pre-encoded)": lambda: cached_json_response(payload),
+    }
+
+    print(f"page_size={page_size} rounds={rounds} body={len(payload.body)} bytes")
+
+    baseline = None
+
+    for name, fn in cases.items():
+        seconds = min(timeit.repeat(fn, number=rounds, repeat=3)) / rounds
+        baseline = baseline or seconds
+        print(f"{name:<30} {seconds * 1e6:9.1f} µs/request  {baseline / seconds:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core import admission
+from app.core.admission import AdmissionControl, AdmissionMiddleware
+from app.core.config import settings
+from app.integrations.erp_scheduler import BULK, CRITICAL, INTERACTIVE
+
+
+class FakeHealth:
+    def __init__(self):
+        self.value = None
+
+    def latency(self, max_age):
+        return self.value
+
+
+@pytest.fixture
+def health(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(settings, "ADMISSION_MAX_IN_FLIGHT", 8)
+    monkeypatch.setattr(settings, "ADMISSION_CRITICAL_RESERVE", 0.25)
+    monkeypatch.setattr(settings, "ADMISSION_BULK_SHARE", 0.5)
+    monkeypatch.setattr(settings, "ADMISSION_ERP_TARGET_LATENCY", 1.0)
+    monkeypatch.setattr(settings, "ADMISSION_RETRY_AFTER", 2)
+    monkeypatch.setattr(AdmissionControl, "in_flight", 0)
+    monkeypatch.setattr(AdmissionControl, "rejected", {"critical": 0, "interactive": 0, "bulk": 0})
+
+    health = FakeHealth()
+    monkeypatch.setattr(admission, "erp_health", health)
+    return health
+
+
+def _call(path, in_flight=0, method="GET"):
+    """
+    One request through the middleware with `in_flight` others running.
+    Returns (status, headers, in_flight seen by the app).
+    """
+
+    AdmissionControl.in_flight = in_flight
+    messages = []
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append(AdmissionControl.in_flight)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "path": path, "method": method, "headers": []}
+    asyncio.run(AdmissionMiddleware(app)(scope, None, send))
+
+    headers = {k.decode(): v.decode() for k, v in messages[0]["headers"]}
+    return messages[0]["status"], headers, seen
+
+
+# -------------------------------------------------
+# Limits
+# -------------------------------------------------
+def test_limits_by_priority(health):
+    assert AdmissionControl.limit(CRITICAL) == 8
+    assert AdmissionControl.limit(INTERACTIVE) == 6
+    assert AdmissionControl.limit(BULK) == 3
+
+
+def test_slow_erp_shrinks_non_critical_limits(health):
+    health.value = 2.0
+
+    assert AdmissionControl.limit(CRITICAL) == 8
+    assert AdmissionControl.limit(INTERACTIVE) == 3
+    assert AdmissionControl.limit(BULK) == 1.5
+
+    # Never below one, so recovery is noticed
+    health.value = 100.0
+    assert AdmissionControl.limit(BULK) == 1
+
+
+def test_fast_erp_does_not_raise_limits(health):
+    health.value = 0.1
+
+    assert AdmissionControl.limit(INTERACTIVE) == 6
+
+
+# -------------------------------------------------
+# Middleware
+# -------------------------------------------------
+def test_request_under_the_limit_is_counted_while_running(health):
+    status, _, seen = _call("/products", in_flight=2)
+
+    assert status == 200
+    assert seen == [3]
+    assert AdmissionControl.in_flight == 2
+
+
+def test_over_the_limit_gets_503_with_retry_after(health):
+    health.value = 4.6
+
+    status, headers, seen = _call("/products", in_flight=1)
+
+    assert status == 503
+    assert seen == []
+    # Retry no sooner than ERP currently answers
+    assert headers["retry-after"] == "5"
+    assert AdmissionControl.rejected["bulk"] == 1
+
+
+def test_critical_routes_use_the_reserve(health):
+    assert _call("/products", in_flight=6)[0] == 503
+    assert _call("/customer/exists", in_flight=6)[0] == 503
+    assert _call("/checkout/place-order", in_flight=6)[0] == 200
+    assert _call("/checkout/place-order", in_flight=8)[0] == 503
+
+
+@pytest.mark.parametrize("path", ["/health", "/ready", "/internal/metrics", "/webhooks/erp"])
+def test_exempt_paths_are_never_rejected(health, path):
+    assert _call(path, in_flight=100)[0] == 200
+
+
+def test_preflight_is_never_rejected(health):
+    assert _call("/products", in_flight=100, method="OPTIONS")[0] == 200
+
+
+def test_disabled(health, monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", False)
+
+    assert _call("/products", in_flight=100)[0] == 200
+
+
+def test_reject_body_is_json(health):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(AdmissionMiddleware._reject(send))
+
+    assert json.loads(messages[1]["body"]) == {"detail": "Server is busy. Please retry shortly."}
+    assert dict(messages[0]["headers"])[b"content-length"] == str(len(messages[1]["body"])).encode()
@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.core.snapshot import Snapshot, write_snapshot
+from app.services import catalog_snapshot
+from app.services.catalog_snapshot import SNAPSHOT_FIELDS, CatalogRefresher
+
+
+def _row(code, modified):
+    row = {f: None for f in SNAPSHOT_FIELDS}
+    row.update(
+        item_code=code,
+        name=code,
+        item_name=code,
+        modified=modified,
+        item_group="Tools",
+        disabled=0,
+        custom_enable_item=1,
+    )
+    return row
+
+
+@pytest.fixture
+def refresher(tmp_path, monkeypatch):
+    path = str(tmp_path / "catalog.snap")
+    monkeypatch.setattr(settings, "CATALOG_SNAPSHOT_PATH", path)
+    monkeypatch.setattr(settings, "FACETS_REBUILD_INTERVAL", 3600)
+
+    for name, value in [
+        ("_items", {}),
+        ("_site_settings", None),
+        ("_watermark", ""),
+        ("_last_rebuild", 0),
+        ("_resumed", False),
+    ]:
+        monkeypatch.setattr(CatalogRefresher, name, value)
+    CatalogRefresher._wake.clear()
+
+    monkeypatch.setattr(catalog_snapshot, "erp_request", lambda **kwargs: {"data": {"show_price": 1}})
+
+    calls = {"rebuild": 0, "delta": []}
+
+    def iter_catalog_items(filters, fields):
+        if filters and filters[0][0] == "modified":
+            calls["delta"].append(filters[0])
+            return iter([_row("NEW", "2024-02-01 00:00:00")])
+        calls["rebuild"] += 1
+        return iter([_row("A", "2024-01-01 00:00:00"), _row("NEW", "2024-02-01 00:00:00")])
+
+    monkeypatch.setattr(catalog_snapshot, "iter_catalog_items", iter_catalog_items)
+    return path, calls
+
+
+def test_stale_snapshot_is_published_before_the_rebuild(refresher):
+    path, calls = refresher
+
+    # Left behind by a refresher that stopped two hours ago
+    write_snapshot(path, [_row("A", "2024-01-01 00:00:00")], SNAPSHOT_FIELDS, {"show_price": 1},
+                   "2024-01-01 00:00:00", time.time() - 7200)
+
+    CatalogRefresher.refresh_once()
+
+    # First tick: delta only, published right away
+    assert calls["rebuild"] == 0
+    assert len(calls["delta"]) == 1
+    assert sorted(r["item_code"] for r in Snapshot(path).records()) == ["A", "NEW"]
+    # ... and the full rebuild is queued for the next tick
+    assert CatalogRefresher._wake.is_set()
+
+    CatalogRefresher.refresh_once()
+
+    assert calls["rebuild"] == 1
+
+
+def test_snapshot_with_other_fields_is_not_resumed(refresher):
+    path, calls = refresher
+    fields = [f for f in SNAPSHOT_FIELDS if f != "modified"] + ["obsolete"]
+
+    write_snapshot(path, [_row("A", "2024-01-01 00:00:00")], fields, {}, "2024-01-01 00:00:00", time.time())
+
+    CatalogRefresher.refresh_once()
+
+    assert calls["rebuild"] == 1
+    assert Snapshot(path).fields == SNAPSHOT_FIELDS
+
+
+def test_fresh_snapshot_resumes_with_a_delta(refresher):
+    path, calls = refresher
+
+    write_snapshot(path, [_row("A", "2024-01-01 00:00:00")], SNAPSHOT_FIELDS, {"show_price": 1},
+                   "2024-01-01 00:00:00", time.time())
+
+    CatalogRefresher.refresh_once()
+
+    assert calls["rebuild"] == 0
+    assert not CatalogRefresher._wake.is_set()
+
+
+def test_delta_rereads_the_overlap_without_republishing(refresher, monkeypatch):
+    path, calls = refresher
+    monkeypatch.setattr(settings, "CATALOG_SYNC_OVERLAP", 120)
+
+    write_snapshot(path, [_row("NEW", "2024-02-01 00:00:00")], SNAPSHOT_FIELDS, {"show_price": 1},
+                   "2024-02-01 00:00:00", time.time())
+
+    CatalogRefresher.refresh_once()
+    version = Snapshot(path).version
+
+    assert calls["delta"] == [["modified", ">=", "2024-01-31 23:58:00"]]
+
+    # Re-read rows at the same `modified` are not a change
+    CatalogRefresher.refresh_once()
+
+    assert Snapshot(path).version == version
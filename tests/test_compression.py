@@ -0,0 +1,105 @@
+import asyncio
+import gzip
+import zlib
+
+import pytest
+
+from app.core import compression
+from app.core.compression import CompressionMiddleware, encoded_etag, etag_matches, negotiate_encoding
+
+
+def _run(app, accept_encoding="gzip", minimum_size=100):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    asyncio.run(CompressionMiddleware(app, minimum_size=minimum_size)(scope, None, send))
+
+    start = messages[0]
+    headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    return start, headers, messages[1:]
+
+
+def _app(chunks, content_type=b"application/x-ndjson", etag=None, content_length=None):
+    async def app(scope, receive, send):
+        headers = [(b"content-type", content_type)]
+        if etag:
+            headers.append((b"etag", etag))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode()))
+
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+
+    return app
+
+
+def test_negotiate_encoding(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("*") == "gzip"
+    assert negotiate_encoding("") is None
+
+
+def test_stream_is_flushed_per_chunk(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    lines = [b'{"n":%d}\n' % i * 20 for i in range(3)] + [b""]
+
+    _, headers, bodies = _run(_app(lines))
+
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    assert "Accept-Encoding" in headers["vary"]
+
+    # Each chunk decodes on its own as it arrives (sync flush)
+    decoder = zlib.decompressobj(31)
+    for chunk, body in zip(lines, bodies):
+        assert decoder.decompress(body["body"]) == chunk
+
+    assert bodies[-1]["more_body"] is False
+    assert gzip.decompress(b"".join(b["body"] for b in bodies)) == b"".join(lines)
+
+
+def test_strong_etag_gets_the_encoding_suffix(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+    _, headers, _ = _run(_app([b"x" * 500], etag=b'"abc"'))
+
+    assert headers["etag"] == '"abc-gzip"'
+
+
+def test_weak_etag_is_kept(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+    _, headers, _ = _run(_app([b"x" * 500], etag=b'W/"abc"'))
+
+    assert headers["etag"] == 'W/"abc"'
+
+
+@pytest.mark.parametrize("app", [
+    _app([b"x" * 500], content_type=b"image/png", etag=b'"abc"'),
+    _app([b"x" * 50], etag=b'"abc"', content_length=50),
+    _app([b"x" * 50], etag=b'"abc"'),
+])
+def test_untouched_responses_keep_their_etag(monkeypatch, app):
+    monkeypatch.setattr(compression, "brotli", None)
+
+    _, headers, bodies = _run(app)
+
+    assert "content-encoding" not in headers
+    assert headers["etag"] == '"abc"'
+    assert bodies[0]["body"].startswith(b"x")
+
+
+def test_etag_helpers():
+    assert encoded_etag('"abc"', "br") == '"abc-br"'
+    assert encoded_etag('W/"abc"', "br") == 'W/"abc"'
+    assert etag_matches('"abc-gzip"', '"abc"')
+    assert etag_matches('"abc"', '"abc"')
+    assert not etag_matches('"abd-gzip"', '"abc"')
+    assert not etag_matches(None, '"abc"')
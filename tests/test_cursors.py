@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from app.core.snapshot import Snapshot, write_snapshot
+from app.services import item_service
+from app.services.item_service import _page_from_snapshot, decode_cursor, encode_cursor
+
+FIELDS = ["item_code", "name", "modified", "item_group", "custom_subcategory", "price", "qty", "tags"]
+
+
+def _row(name, modified, group="Tools", subcategory="Hand", **values):
+    return {
+        "item_code": name,
+        "name": name,
+        "modified": modified,
+        "item_group": group,
+        "custom_subcategory": subcategory,
+        **values,
+    }
+
+
+def _write(tmp_path, rows, **kwargs):
+    path = str(tmp_path / "catalog.snap")
+    version = write_snapshot(
+        path,
+        rows,
+        FIELDS,
+        kwargs.get("site_settings", {}),
+        kwargs.get("watermark", ""),
+        kwargs.get("rebuilt_at", 0.0),
+    )
+    return Snapshot(path), version
+
+
+def test_seek_breaks_modified_ties_by_name(tmp_path):
+    snapshot, _ = _write(tmp_path, [_row(name, "2024-01-01") for name in "ABCDE"])
+    positions = snapshot.select()
+
+    # Listing order is name desc within one `modified`
+    assert [snapshot.get(i, "name") for i in positions] == ["E", "D", "C", "B", "A"]
+
+    assert snapshot.seek(positions, "2024-01-01", "C") == 3
+    assert snapshot.seek(positions, "2024-01-01", "E") == 1
+    assert snapshot.seek(positions, "2024-01-01", "A") == 5
+    # A cursor on a row that has since gone still lands between its neighbours
+    assert snapshot.seek(positions, "2024-01-01", "CC") == 2
+
+
+def test_cursor_pages_cover_ties_once(tmp_path):
+    rows = [_row(f"ITEM-{i:02d}", "2024-01-01" if i < 7 else "2024-01-02") for i in range(10)]
+    snapshot, _ = _write(tmp_path, rows)
+
+    seen = []
+    seek = None
+
+    while True:
+        items, total, next_cursor, _ = _page_from_snapshot(snapshot, None, None, 1, 3, seek)
+        seen.extend(item["name"] for item in items)
+
+        if next_cursor is None:
+            break
+        seek = decode_cursor(next_cursor)
+
+    assert total == 10
+    assert seen == [snapshot.get(i, "name") for i in snapshot.select()]
+    assert len(set(seen)) == 10
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("2024-01-01 10:00:00.123456", "ITEM/ÄÖ 1")
+
+    assert decode_cursor(cursor) == ("2024-01-01 10:00:00.123456", "ITEM/ÄÖ 1")
+
+
+@pytest.mark.parametrize("cursor", ["", "!!!", "bm90LWpzb24", "WzEsMl0"])
+def test_bad_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_erp_cursor_query_breaks_ties_by_name(monkeypatch):
+    sent = []
+
+    def erp_request(method, path, params=None, json=None):
+        sent.append(params)
+        return {"data": [{"name": "ITEM-B", "modified": "2024-01-01"}, {"name": "ITEM-A", "modified": "2024-01-01"}]}
+
+    monkeypatch.setattr(item_service, "erp_request", erp_request)
+
+    items, total, next_cursor = item_service._page_from_erp(None, None, None, 1, 2, None, ("2024-01-01", "ITEM-C"))
+
+    # No count query for cursor pages; (modified, name) < cursor
+    assert len(sent) == 1
+    assert sent[0]["order_by"] == "modified desc, name desc"
+    assert ["modified", "<=", "2024-01-01"] in json.loads(sent[0]["filters"])
+    assert json.loads(sent[0]["or_filters"]) == [["modified", "<", "2024-01-01"], ["name", "<", "ITEM-C"]]
+    assert "limit_start" not in sent[0]
+
+    assert total is None
+    assert decode_cursor(next_cursor) == ("2024-01-01", "ITEM-A")
@@ -0,0 +1,124 @@
+import fcntl
+import json
+import os
+import stat
+
+import pytest
+
+from app.core.config import settings
+from app.services.customer_service import CustomerPhones
+
+
+CUSTOMERS = [
+    {"name": "CUST-1", "custom_phone_number": "0501111111", "modified": "2024-01-01 10:00:00"},
+    {"name": "CUST-2", "custom_phone_number": " 0502222222 ", "modified": "2024-01-02 10:00:00"},
+]
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    path = str(tmp_path / "phones.json")
+    monkeypatch.setattr(settings, "CUSTOMER_PHONE_INDEX_PATH", path)
+
+    for name, value in [
+        ("_phones", set()),
+        ("_watermark", ""),
+        ("_last_rebuild", 0),
+        ("_last_refresh", 0),
+        ("_recent", {}),
+        ("_lock_fd", None),
+        ("_loaded", None),
+        ("_stale_at", 0),
+    ]:
+        monkeypatch.setattr(CustomerPhones, name, value)
+
+    erp_calls = []
+
+    def iter_customers(filters):
+        erp_calls.append(filters)
+        return iter(CUSTOMERS)
+
+    monkeypatch.setattr(CustomerPhones, "_iter_customers", staticmethod(iter_customers))
+
+    yield path, erp_calls
+
+    if CustomerPhones._lock_fd is not None:
+        os.close(CustomerPhones._lock_fd)
+
+
+def _hold_lock(path):
+    # Another worker on the host owns the sync
+    fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    return fd
+
+
+def _publish(path, phones, mtime=None):
+    with open(path, "w") as fh:
+        json.dump({"watermark": "2024-01-02 10:00:00", "rebuilt_at": 1.0, "phones": phones}, fh)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_lock_holder_syncs_and_publishes(index):
+    path, erp_calls = index
+
+    assert CustomerPhones._acquire()
+    CustomerPhones.sync()
+
+    assert len(erp_calls) == 1
+    with open(path) as fh:
+        assert json.load(fh)["phones"] == ["0501111111", "0502222222"]
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_other_workers_load_instead_of_calling_erp(index):
+    path, erp_calls = index
+    fd = _hold_lock(path)
+
+    try:
+        _publish(path, ["0501111111"])
+
+        assert not CustomerPhones._acquire()
+        CustomerPhones._load()
+    finally:
+        os.close(fd)
+
+    assert erp_calls == []
+    assert not CustomerPhones.known_absent("0501111111")
+    assert CustomerPhones.known_absent("0509999999")
+    # A worker that takes over resumes from the published watermark
+    assert CustomerPhones._watermark == "2024-01-02 10:00:00"
+
+
+def test_local_numbers_survive_a_reload(index):
+    path, _ = index
+    _publish(path, ["0501111111"])
+    CustomerPhones._load()
+
+    CustomerPhones.add("0503333333", "CUST-3")
+
+    # Published before the syncing worker saw CUST-3
+    os.remove(path)
+    _publish(path, ["0501111111"])
+    CustomerPhones._load()
+
+    assert not CustomerPhones.known_absent("0503333333")
+
+
+def test_stale_index_waits_for_a_newer_sync(index):
+    path, _ = index
+    _publish(path, ["0501111111"])
+    CustomerPhones._load()
+
+    CustomerPhones.mark_stale()
+    CustomerPhones._load()
+
+    # Missed events: misses go to ERP until the index is synced again
+    assert not CustomerPhones.known_absent("0509999999")
+
+    later = CustomerPhones._stale_at + 1
+    os.utime(path, (later, later))
+    CustomerPhones._load()
+
+    assert CustomerPhones.known_absent("0509999999")
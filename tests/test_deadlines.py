@@ -0,0 +1,88 @@
+import pytest
+
+from app.core import deadline as deadline_module
+from app.core.config import settings
+from app.core.deadline import Deadline, current_deadline, deadline_for_path
+from app.integrations import erp_client
+from app.services import order_service
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(deadline_module, "time", clock)
+    return clock
+
+
+def test_bulk_orders_get_their_own_budget():
+    assert deadline_for_path("/checkout/place-orders") == settings.REQUEST_DEADLINE_BULK_ORDERS
+    assert deadline_for_path("/checkout/place-order") == settings.REQUEST_DEADLINE_CHECKOUT
+    assert deadline_for_path("/checkout/quote") == settings.REQUEST_DEADLINE_CHECKOUT
+    assert settings.REQUEST_DEADLINE_BULK_ORDERS > settings.REQUEST_DEADLINE_CHECKOUT
+
+
+@pytest.fixture
+def slow_erp(monkeypatch, clock):
+    """
+    Bulk checkout against an ERP where every order POST takes 3 s.
+    """
+
+    monkeypatch.setattr(settings, "BULK_ORDER_CONCURRENCY", 1)
+    monkeypatch.setattr(order_service.SiteControl, "get_default_order_type", classmethod(lambda cls: "E-Commerce RFQ"))
+    monkeypatch.setattr(order_service, "_check_store_open", lambda: None)
+    monkeypatch.setattr(order_service, "_validate_rfq_address", lambda address: None)
+    monkeypatch.setattr(order_service, "_build_rfq_doc", lambda *args: {"doctype": "E-Commerce RFQ"})
+    monkeypatch.setattr(
+        order_service,
+        "_resolve_customer_and_price_map",
+        lambda payload, codes: ("CUST-1", {code: 10.0 for code in codes}, {}),
+    )
+
+    posted = []
+
+    def erp_request(method, path, params=None, json=None):
+        erp_client._attempt_timeout(current_deadline.get(), method, path)
+        clock.now += 3
+        posted.append(path)
+        return {"data": {"name": f"RFQ-{len(posted)}"}}
+
+    monkeypatch.setattr(order_service, "erp_request", erp_request)
+    return posted
+
+
+def _place(path, orders):
+    token = current_deadline.set(Deadline(deadline_for_path(path)))
+    try:
+        return order_service.create_ecommerce_orders({
+            "orders": [{"cart": [{"item_code": "ITEM-1", "qty": 1}]} for _ in range(orders)],
+        })
+    finally:
+        current_deadline.reset(token)
+
+
+def test_batch_longer_than_a_checkout_completes(slow_erp):
+    # 6 x 3 s = 18 s, well past the 10 s single-checkout budget
+    result = _place("/checkout/place-orders", 6)
+
+    assert result["submitted"] == 6
+    assert [r["status"] for r in result["results"]] == ["submitted"] * 6
+
+
+def test_out_of_time_orders_are_reported_not_submitted(slow_erp):
+    result = _place("/checkout/place-order", 6)
+
+    statuses = [r["status"] for r in result["results"]]
+    placed = result["submitted"]
+
+    # The batch is not failed as a whole: the tail is reported per order
+    assert 0 < placed < 6
+    assert statuses == ["submitted"] * placed + ["not_submitted"] * (6 - placed)
+    assert len(slow_erp) == placed
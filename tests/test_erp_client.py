@@ -0,0 +1,195 @@
+import pytest
+import requests
+
+from app.core.config import settings
+from app.core.deadline import Deadline, current_deadline
+from app.integrations import erp_client
+from app.integrations.erp_client import ERPError, ERPUnavailableError, _attempt_timeout, _retry_delay, erp_request
+from app.integrations.erp_health import ERPHealth
+from app.integrations.erp_scheduler import ERPScheduler
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.text = ""
+        self._data = data or {}
+
+    def json(self):
+        return self._data
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(erp_client, "time", clock)
+    monkeypatch.setattr("app.core.deadline.time", clock)
+    return clock
+
+
+@pytest.fixture
+def erp(monkeypatch, clock):
+    """
+    ERP that answers with the queued responses (or raises the queued
+    exceptions), recording each attempt's method and timeout.
+    """
+
+    monkeypatch.setattr(settings, "ERP_BASE_URL", "http://erp.test")
+    monkeypatch.setattr(settings, "ERP_API_KEY", "key")
+    monkeypatch.setattr(settings, "ERP_API_SECRET", "secret")
+    monkeypatch.setattr(settings, "ERP_RETRIES", 3)
+    monkeypatch.setattr(settings, "ERP_HEDGE_ENABLED", False)
+    monkeypatch.setattr(erp_client, "erp_health", ERPHealth())
+    monkeypatch.setattr(ERPScheduler, "_active", 0)
+
+    replies = []
+    attempts = []
+
+    def request(method, url, timeout, **kwargs):
+        attempts.append((method, timeout))
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    monkeypatch.setattr(erp_client._session, "request", request)
+    return replies, attempts
+
+
+# -------------------------------------------------
+# Retries
+# -------------------------------------------------
+def test_get_is_retried_after_a_read_timeout_and_5xx(erp, clock):
+    replies, attempts = erp
+    replies.extend([requests.ReadTimeout(), FakeResponse(502), FakeResponse(200, {"data": 1})])
+
+    assert erp_request("GET", "/api/resource/Item") == {"data": 1}
+    assert len(attempts) == 3
+    assert clock.slept == [0.5, 1.0]
+
+
+def test_post_is_not_retried_after_a_read_timeout(erp):
+    replies, attempts = erp
+    replies.extend([requests.ReadTimeout(), FakeResponse(200)])
+
+    with pytest.raises(ERPError):
+        erp_request("POST", "/api/resource/Sales Order", json={})
+
+    # ERP may have committed it: never sent twice
+    assert len(attempts) == 1
+
+
+def test_post_is_not_retried_after_a_5xx(erp):
+    replies, attempts = erp
+    replies.extend([FakeResponse(502), FakeResponse(200)])
+
+    with pytest.raises(ERPError) as exc:
+        erp_request("POST", "/api/resource/Sales Order", json={})
+
+    assert exc.value.status_code == 502
+    assert len(attempts) == 1
+
+
+def test_post_is_retried_when_it_never_left(erp):
+    replies, attempts = erp
+    replies.extend([requests.ConnectTimeout(), FakeResponse(200, {"data": {"name": "SO-1"}})])
+
+    assert erp_request("POST", "/api/resource/Sales Order", json={}) == {"data": {"name": "SO-1"}}
+    assert len(attempts) == 2
+
+
+def test_retries_stop_at_the_deadline(erp, clock):
+    replies, attempts = erp
+    replies.extend([FakeResponse(503)] * 4)
+
+    token = current_deadline.set(Deadline(1.0))
+    try:
+        with pytest.raises(ERPError) as exc:
+            erp_request("GET", "/api/resource/Item")
+    finally:
+        current_deadline.reset(token)
+
+    # 0.5 s backoff fits in 1 s, the next 1 s one does not
+    assert exc.value.status_code == 503
+    assert len(attempts) == 2
+    assert attempts[1][1] == pytest.approx(0.5)
+
+
+# -------------------------------------------------
+# Attempt Timeout + Backoff
+# -------------------------------------------------
+def test_attempt_timeout_without_a_deadline():
+    assert _attempt_timeout(None, "GET", "/x") == settings.ERP_TIMEOUT
+    assert _attempt_timeout(Deadline(None), "GET", "/x") == settings.ERP_TIMEOUT
+
+
+def test_attempt_timeout_is_cut_to_the_deadline_for_gets_only(clock):
+    deadline = Deadline(5.0)
+
+    assert _attempt_timeout(deadline, "GET", "/x") == pytest.approx(5.0)
+    # A started create gets the full timeout
+    assert _attempt_timeout(deadline, "POST", "/x") == settings.ERP_TIMEOUT
+
+
+def test_attempt_timeout_raises_when_out_of_budget(clock):
+    deadline = Deadline(5.0)
+    clock.now += 5.0 - settings.ERP_MIN_ATTEMPT_TIMEOUT / 2
+
+    with pytest.raises(ERPUnavailableError) as exc:
+        _attempt_timeout(deadline, "POST", "/x")
+    assert exc.value.status_code == 504
+
+
+def test_attempt_timeout_raises_when_the_client_left(clock):
+    deadline = Deadline(5.0)
+    deadline.cancelled.set()
+
+    with pytest.raises(ERPUnavailableError) as exc:
+        _attempt_timeout(deadline, "GET", "/x")
+    assert exc.value.status_code == 499
+
+
+def test_retry_delay(clock, monkeypatch):
+    monkeypatch.setattr(settings, "ERP_RETRIES", 3)
+
+    assert [_retry_delay(n, None) for n in range(4)] == [0.5, 1.0, 2.0, None]
+
+    # Backoff must leave room for one more attempt
+    deadline = Deadline(1.1)
+    assert _retry_delay(0, deadline) == 0.5
+    assert _retry_delay(1, deadline) is None
+
+    deadline.cancelled.set()
+    assert _retry_delay(0, deadline) is None
+
+
+# -------------------------------------------------
+# Files
+# -------------------------------------------------
+def test_file_error_keeps_the_status(erp, monkeypatch):
+    class FileResponse(FakeResponse):
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(erp_client._session, "get", lambda url, **kwargs: FileResponse(502))
+
+    with pytest.raises(ERPError) as exc:
+        erp_client.erp_fetch_file("/files/photo.jpg", 1024)
+
+    assert exc.value.status_code == 502
@@ -0,0 +1,60 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import customers, items
+from app.integrations.erp_client import ERPError, ERPUnavailableError
+from app.main import erp_error_handler
+from app.services import customer_service
+from app.services.customer_service import find_customer_by_email
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_exception_handler(ERPError, erp_error_handler)
+    app.include_router(items.router)
+    app.include_router(customers.router)
+    return TestClient(app)
+
+
+def _failing(exc):
+    def fail(*args, **kwargs):
+        raise exc
+    return fail
+
+
+def test_shed_call_is_a_503_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(items, "get_products_payload", _failing(ERPUnavailableError("busy", status_code=503)))
+
+    res = client.get("/products")
+
+    assert res.status_code == 503
+    assert int(res.headers["retry-after"]) >= 1
+
+
+def test_expired_deadline_is_a_504(client, monkeypatch):
+    monkeypatch.setattr(items, "get_products_payload", _failing(ERPUnavailableError("late", status_code=504)))
+
+    assert client.get("/products").status_code == 504
+
+
+def test_other_erp_failures_are_a_502(client, monkeypatch):
+    monkeypatch.setattr(items, "get_products_payload", _failing(ERPError("ERP error 500 - Traceback", status_code=500)))
+
+    res = client.get("/products")
+
+    assert res.status_code == 502
+    assert "Traceback" not in res.text
+
+
+def test_services_let_unavailable_through(monkeypatch):
+    monkeypatch.setattr(customer_service, "erp_request", _failing(ERPUnavailableError("busy", status_code=503)))
+
+    with pytest.raises(ERPUnavailableError):
+        find_customer_by_email("a@example.com")
+
+    monkeypatch.setattr(customer_service, "erp_request", _failing(ERPError("down", status_code=500)))
+
+    with pytest.raises(customer_service.CustomerError):
+        find_customer_by_email("a@example.com")
@@ -0,0 +1,212 @@
+import threading
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.integrations import erp_client
+from app.integrations.erp_hedging import HedgeBudget, LatencyTracker, run_hedged
+from app.integrations.erp_scheduler import ERPScheduler
+
+
+class FakeResponse:
+    status_code = 200
+
+
+def _wait_until(condition, timeout: float = 2.0) -> None:
+    stop = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < stop, "timed out"
+        time.sleep(0.005)
+
+
+# -------------------------------------------------
+# Budget + Latency
+# -------------------------------------------------
+def test_budget_allows_one_hedge_per_ratio_of_gets():
+    budget = HedgeBudget(ratio=0.25, burst=2)
+
+    assert not budget.try_spend()
+
+    for _ in range(4):
+        budget.earn()
+    assert budget.try_spend()
+    assert not budget.try_spend()
+
+    # Idle periods only bank up to the burst
+    for _ in range(100):
+        budget.earn()
+    assert [budget.try_spend() for _ in range(3)] == [True, True, False]
+    assert budget.sent == 3
+
+
+def test_percentile_needs_enough_samples():
+    tracker = LatencyTracker(min_samples=10, refresh_every=1)
+
+    for i in range(9):
+        tracker.record(i / 100)
+    assert tracker.percentile(95) is None
+
+    tracker.record(1.0)
+    assert tracker.percentile(95) == 1.0
+    assert tracker.percentile(50) == 0.05
+
+
+# -------------------------------------------------
+# run_hedged
+# -------------------------------------------------
+def test_fast_answer_sends_no_hedge():
+    started = []
+
+    result = run_hedged(
+        lambda: "first",
+        hedge_after=1.0,
+        start_hedge=lambda: started.append(1) or True,
+        on_settled=lambda: started.append("settled"),
+        budget=HedgeBudget(ratio=1),
+    )
+
+    assert result == "first"
+    assert started == []
+
+
+def test_slow_answer_is_hedged_and_settled_once():
+    release_first = threading.Event()
+    calls = []
+    settled = []
+    budget = HedgeBudget(ratio=1)
+
+    def attempt():
+        calls.append(1)
+        if len(calls) == 1:
+            release_first.wait(2)
+            return "first"
+        return "second"
+
+    result = run_hedged(attempt, 0.01, lambda: True, lambda: settled.append(1), budget)
+
+    assert result == "second"
+    assert budget.won == 1
+    # The loser still holds the hedge's slot until it finishes
+    assert settled == []
+
+    release_first.set()
+    _wait_until(lambda: settled == [1])
+
+
+def test_refused_hedge_waits_for_the_first_attempt():
+    settled = []
+
+    def attempt():
+        time.sleep(0.05)
+        return "first"
+
+    assert run_hedged(attempt, 0.01, lambda: False, lambda: settled.append(1), HedgeBudget(ratio=1)) == "first"
+    assert settled == []
+
+
+def test_failed_first_attempt_loses_to_the_hedge():
+    calls = []
+
+    def attempt():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.05)
+            raise ConnectionError("reset")
+        time.sleep(0.1)
+        return "second"
+
+    assert run_hedged(attempt, 0.01, lambda: True, lambda: None, HedgeBudget(ratio=1)) == "second"
+
+
+# -------------------------------------------------
+# _send: scheduler slot + budget accounting
+# -------------------------------------------------
+@pytest.fixture
+def hedging(monkeypatch):
+    monkeypatch.setattr(settings, "ERP_HEDGE_ENABLED", True)
+    monkeypatch.setattr(settings, "ERP_HEDGE_MIN_DELAY", 0.01)
+    monkeypatch.setattr(settings, "ERP_MAX_CONCURRENCY", 2)
+    monkeypatch.setattr(ERPScheduler, "_active", 0)
+    monkeypatch.setattr(ERPScheduler, "_waiting", [])
+
+    latency = LatencyTracker(min_samples=1, refresh_every=1)
+    latency.record(0.01)
+    monkeypatch.setattr(erp_client, "get_latency", latency)
+
+    budget = HedgeBudget(ratio=1, burst=1)
+    monkeypatch.setattr(erp_client, "hedge_budget", budget)
+    return budget
+
+
+def _slow_then_fast(release_first):
+    calls = []
+
+    def send():
+        calls.append(1)
+        if len(calls) == 1:
+            release_first.wait(2)
+        return FakeResponse()
+
+    return send, calls
+
+
+def test_hedge_takes_a_slot_and_gives_it_back(hedging):
+    release_first = threading.Event()
+    send, calls = _slow_then_fast(release_first)
+
+    erp_client._send("GET", send, None)
+
+    assert len(calls) == 2
+    assert hedging.sent == 1
+    assert ERPScheduler._active == 1
+
+    release_first.set()
+    _wait_until(lambda: ERPScheduler._active == 0)
+
+
+def test_no_budget_no_hedge_and_no_slot_leak(hedging):
+    release_first = threading.Event()
+    send, calls = _slow_then_fast(release_first)
+    hedging.try_spend = lambda: False
+
+    threading.Timer(0.05, release_first.set).start()
+    erp_client._send("GET", send, None)
+
+    assert len(calls) == 1
+    assert ERPScheduler._active == 0
+
+
+def test_no_free_slot_no_hedge(hedging, monkeypatch):
+    monkeypatch.setattr(ERPScheduler, "_active", 2)
+    release_first = threading.Event()
+    send, calls = _slow_then_fast(release_first)
+
+    threading.Timer(0.05, release_first.set).start()
+    erp_client._send("GET", send, None)
+
+    assert len(calls) == 1
+    assert hedging.sent == 0
+    assert ERPScheduler._active == 2
+
+
+@pytest.mark.parametrize("method, probe", [("POST", False), ("GET", True)])
+def test_posts_and_probes_are_never_hedged(hedging, method, probe):
+    calls = []
+
+    erp_client._send(method, lambda: calls.append(1) or FakeResponse(), None, probe)
+
+    assert calls == [1]
+    # Nor earn budget
+    assert not hedging.try_spend()
+
+
+def test_hedging_is_off_unless_enabled(hedging, monkeypatch):
+    monkeypatch.setattr(settings, "ERP_HEDGE_ENABLED", False)
+    release_first = threading.Event()
+    send, calls = _slow_then_fast(release_first)
+
+    threading.Timer(0.05, release_first.set).start()
+    erp_client._send("GET", send, None)
+
+    assert len(calls) == 1
@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.integrations.erp_scheduler import BULK, CRITICAL, INTERACTIVE, ERPBusyError, ERPScheduler
+
+
+@pytest.fixture(autouse=True)
+def one_slot(monkeypatch):
+    monkeypatch.setattr(settings, "ERP_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "ERP_QUEUE_TIMEOUT_CRITICAL", 5.0)
+    monkeypatch.setattr(settings, "ERP_QUEUE_TIMEOUT_INTERACTIVE", 5.0)
+    monkeypatch.setattr(settings, "ERP_QUEUE_TIMEOUT_BULK", 5.0)
+    monkeypatch.setattr(ERPScheduler, "_active", 0)
+    monkeypatch.setattr(ERPScheduler, "_waiting", [])
+    monkeypatch.setattr(ERPScheduler, "_shed", {p: 0 for p in (CRITICAL, INTERACTIVE, BULK)})
+
+
+def _queued() -> int:
+    return sum(ERPScheduler.stats()["queued"].values())
+
+
+def _wait_until(condition, timeout: float = 2.0) -> None:
+    stop = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < stop, "timed out"
+        time.sleep(0.005)
+
+
+def test_free_slot_is_taken_without_queueing():
+    ERPScheduler.acquire(BULK)
+
+    assert ERPScheduler.stats()["active"]["total"] == 1
+
+    ERPScheduler.release()
+
+    assert ERPScheduler.stats()["active"]["total"] == 0
+
+
+def test_waiters_run_by_priority_then_arrival():
+    order = []
+    ERPScheduler.acquire(BULK)
+
+    def worker(name, priority):
+        ERPScheduler.acquire(priority)
+        order.append(name)
+        ERPScheduler.release()
+
+    threads = []
+    for name, priority in [
+        ("bulk-1", BULK),
+        ("interactive", INTERACTIVE),
+        ("bulk-2", BULK),
+        ("critical", CRITICAL),
+    ]:
+        thread = threading.Thread(target=worker, args=(name, priority))
+        thread.start()
+        threads.append(thread)
+        # Queue them one at a time, so arrival order is known
+        _wait_until(lambda: _queued() == len(threads))
+
+    ERPScheduler.release()
+
+    for thread in threads:
+        thread.join(2)
+
+    assert order == ["critical", "interactive", "bulk-1", "bulk-2"]
+    assert ERPScheduler.stats()["active"]["total"] == 0
+
+
+def test_release_hands_the_slot_to_a_waiter():
+    ERPScheduler.acquire(BULK)
+    acquired = threading.Event()
+
+    def worker():
+        ERPScheduler.acquire(INTERACTIVE)
+        acquired.set()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    _wait_until(lambda: _queued() == 1)
+
+    ERPScheduler.release()
+
+    assert acquired.wait(2)
+    # Handed over, not freed: still one call in flight
+    assert ERPScheduler.stats()["active"]["total"] == 1
+    assert not ERPScheduler.try_acquire()
+
+    ERPScheduler.release()
+    thread.join(2)
+
+    assert ERPScheduler.stats()["active"]["total"] == 0
+
+
+def test_max_wait_caps_the_queue_timeout():
+    ERPScheduler.acquire(BULK)
+
+    started = time.monotonic()
+    with pytest.raises(ERPBusyError):
+        ERPScheduler.acquire(CRITICAL, max_wait=0.05)
+
+    assert time.monotonic() - started < 1
+    assert ERPScheduler.stats()["shed"]["critical"] == 1
+
+    # The abandoned ticket must not swallow the slot
+    ERPScheduler.release()
+
+    assert ERPScheduler.stats()["active"]["total"] == 0
+    assert ERPScheduler.try_acquire()
+    ERPScheduler.release()
@@ -0,0 +1,25 @@
+from app.core.config import settings
+from app.services import facet_service
+from app.services.facet_service import CatalogFacets
+
+
+def test_refresh_rereads_the_overlap_window(monkeypatch):
+    monkeypatch.setattr(settings, "CATALOG_SYNC_OVERLAP", 120)
+    monkeypatch.setattr(CatalogFacets, "_watermark", "2024-01-01 10:00:00.500000")
+
+    calls = []
+    item = {"item_code": "ITEM-1", "modified": "2024-01-01 10:00:00.500000"}
+
+    def fake_iter(filters, fields):
+        calls.append(filters)
+        return [item]
+
+    applied = []
+    monkeypatch.setattr(facet_service, "iter_catalog_items", fake_iter)
+    monkeypatch.setattr(CatalogFacets, "apply_item", classmethod(lambda cls, i: applied.append(i)))
+
+    CatalogFacets.refresh()
+
+    # Same-timestamp and late-committed items are read again
+    assert calls == [[["modified", ">=", "2024-01-01 09:58:00.500000"]]]
+    assert applied == [item]
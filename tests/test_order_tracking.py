@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from app.services import order_tracking
+from app.services.order_tracking import decode_watermark, encode_watermark, list_orders_by_phone
+
+
+def _matches(order, condition):
+    field, op, value = condition
+    actual = order[field]
+    return {
+        "=": lambda: actual == value,
+        ">": lambda: actual > value,
+        ">=": lambda: actual >= value,
+        "not in": lambda: actual not in value,
+    }[op]()
+
+
+@pytest.fixture
+def erp(monkeypatch):
+    orders = []
+
+    def fake_request(method, path, params=None, **kwargs):
+        filters = json.loads(params["filters"])
+        or_filters = json.loads(params.get("or_filters", "[]"))
+
+        rows = [
+            o for o in orders
+            if all(_matches(o, f) for f in filters)
+            and (not or_filters or any(_matches(o, f) for f in or_filters))
+        ]
+        rows.sort(key=lambda o: (o["modified"], o["name"]), reverse=params["order_by"] == "modified desc")
+        return {"data": [dict(o) for o in rows[: params["limit_page_length"]]]}
+
+    monkeypatch.setattr(order_tracking, "erp_request", fake_request)
+    return orders
+
+
+def _order(name, modified):
+    return {"name": name, "modified": modified, "phone_number": "0501234567"}
+
+
+def test_same_timestamp_update_is_not_skipped(erp):
+    erp.append(_order("RFQ-1", "2024-01-01 10:00:00"))
+    first = list_orders_by_phone("0501234567")
+
+    # Written in the same second, after the client's read
+    erp.append(_order("RFQ-2", "2024-01-01 10:00:00"))
+    delta = list_orders_by_phone("0501234567", since=first["watermark"])
+
+    assert [o["name"] for o in delta["orders"]] == ["RFQ-2"]
+
+    # Nothing new after that: the route answers 304
+    assert list_orders_by_phone("0501234567", since=delta["watermark"])["orders"] == []
+
+
+def test_pages_through_a_tie_once(erp):
+    erp.extend(_order(f"RFQ-{i}", "2024-01-01 10:00:00") for i in range(5))
+
+    seen = []
+    since = encode_watermark("2023-12-31 00:00:00", [])
+
+    while True:
+        result = list_orders_by_phone("0501234567", limit=2, since=since)
+        seen.extend(o["name"] for o in result["orders"])
+        since = result["watermark"]
+        if not result["has_more"]:
+            break
+
+    assert sorted(seen) == [f"RFQ-{i}" for i in range(5)]
+    assert len(seen) == 5
+
+
+def test_order_modified_again_is_returned(erp):
+    erp.append(_order("RFQ-1", "2024-01-01 10:00:00"))
+    first = list_orders_by_phone("0501234567")
+
+    erp[0]["modified"] = "2024-01-01 10:05:00"
+    delta = list_orders_by_phone("0501234567", since=first["watermark"])
+
+    assert [o["name"] for o in delta["orders"]] == ["RFQ-1"]
+    assert decode_watermark(delta["watermark"]) == ("2024-01-01 10:05:00", ["RFQ-1"])
+
+
+def test_plain_timestamp_watermark_is_still_accepted(erp):
+    erp.append(_order("RFQ-1", "2024-01-01 10:00:00"))
+
+    result = list_orders_by_phone("0501234567", since="2024-01-01 10:00:00")
+
+    # No names known at the boundary: the boundary row comes back once
+    assert [o["name"] for o in result["orders"]] == ["RFQ-1"]
+    assert decode_watermark(result["watermark"]) == ("2024-01-01 10:00:00", ["RFQ-1"])
+
+
+@pytest.mark.parametrize("since", ["yesterday", "e30", encode_watermark("2024-01-01", []).replace("W", "X")])
+def test_bad_watermark_is_rejected(since):
+    with pytest.raises(ValueError):
+        decode_watermark(since)
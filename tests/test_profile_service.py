@@ -0,0 +1,68 @@
+import pytest
+
+from app.services import profile_service
+from app.services.cache_invalidation import CacheEvents
+from app.services.customer_service import CustomerPhones
+
+EMAIL = "user@example.com"
+
+CUSTOMER = {
+    "name": "CUST-1",
+    "customer_name": "Old Name",
+    "custom_phone_number": "0500000000",
+    "custom_email": EMAIL,
+    "custom_vat_registration_number": None,
+}
+
+
+@pytest.fixture(autouse=True)
+def erp(monkeypatch):
+    profile_service.clear_profile_cache()
+
+    calls = []
+
+    def erp_request(method, path, params=None, json=None):
+        calls.append((method, path, json))
+        return {"data": {**CUSTOMER, **(json or {})}}
+
+    monkeypatch.setattr(profile_service, "erp_request", erp_request)
+    monkeypatch.setattr(profile_service, "_require_customer_sync", lambda: None)
+    monkeypatch.setattr(profile_service, "find_customer_by_email", lambda email: dict(CUSTOMER))
+    monkeypatch.setattr(CustomerPhones, "apply_customer", classmethod(lambda cls, name, data: None))
+
+    published = []
+    monkeypatch.setattr(CacheEvents, "publish", classmethod(lambda cls, events: published.extend(events)))
+
+    yield calls, published
+    profile_service.clear_profile_cache()
+
+
+def test_update_diffs_against_erp_and_writes_once(erp):
+    calls, _ = erp
+
+    result = profile_service.update_profile(EMAIL, {"customer_name": "New Name", "phone": "0500000000"})
+
+    assert calls == [("PUT", "/api/resource/Customer/CUST-1", {"customer_name": "New Name"})]
+    assert result["profile"]["customer_name"] == "New Name"
+
+
+def test_update_tells_every_worker_to_drop_the_profile(erp):
+    _, published = erp
+
+    profile_service.update_profile(EMAIL, {"customer_name": "New Name"})
+
+    assert published == [{
+        "doctype": "Customer",
+        "name": "CUST-1",
+        "data": {"custom_phone_number": "0500000000"},
+    }]
+
+
+def test_published_event_drops_a_stale_cached_profile(erp):
+    # Another worker cached the profile before the save
+    profile_service._remember(EMAIL, profile_service._to_profile(CUSTOMER))
+    assert profile_service.get_profile(EMAIL)["profile"]["customer_name"] == "Old Name"
+
+    CacheEvents.apply([{"doctype": "Customer", "name": "CUST-1", "data": {"custom_phone_number": "0500000000"}}])
+
+    assert profile_service._profile_cache.get(EMAIL) is None
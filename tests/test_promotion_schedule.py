@@ -0,0 +1,130 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.services.ecommerce import promotion_schedule
+from app.services.ecommerce.ecommerce_engine import EcommerceEngine
+from app.services.ecommerce.promotion_schedule import ENGINE_FIELDS, PromotionSchedule
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+    def at(self, year, month, day, hour=0, minute=0, second=0):
+        tz = ZoneInfo(EcommerceEngine.BUSINESS_TIMEZONE)
+        self.now = datetime(year, month, day, hour, minute, second, tzinfo=tz).timestamp()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+
+    monkeypatch.setattr(promotion_schedule, "time", clock)
+    monkeypatch.setattr(
+        EcommerceEngine,
+        "_today",
+        staticmethod(lambda: datetime.fromtimestamp(clock.now, ZoneInfo(EcommerceEngine.BUSINESS_TIMEZONE)).date()),
+    )
+    monkeypatch.setattr(PromotionSchedule, "_entries", {})
+    monkeypatch.setattr(PromotionSchedule, "_heap", [])
+    return clock
+
+
+def _item(code="ITEM-1", start="2024-03-10", end="2024-03-12", **values):
+    item = {f: None for f in ENGINE_FIELDS}
+    item.update({
+        "item_code": code,
+        "custom_ecommerce_price": 100,
+        "custom_enable_promotion": 1,
+        "custom_promotion_type": "Manual Pricing",
+        "custom_promotion_price_manual": 80,
+        "custom_promotional_rate": 1,
+        "custom_promotion_start": start,
+        "custom_promotion_end": end,
+        "custom_show_price": 1,
+    })
+    item.update(values)
+    return item
+
+
+def _price(item):
+    return PromotionSchedule.transform_item(item)["price"]
+
+
+def test_price_flips_at_start_and_after_end(clock):
+    item = _item()
+
+    clock.at(2024, 3, 9, 23, 59, 59)
+    assert _price(item) == 100
+
+    clock.at(2024, 3, 10)
+    assert _price(item) == 80
+
+    # The end date is inclusive: the promotion runs through its last day
+    clock.at(2024, 3, 12, 23, 59, 59)
+    assert _price(item) == 80
+
+    clock.at(2024, 3, 13)
+    assert _price(item) == 100
+    assert PromotionSchedule.next_transition() is None
+
+
+def test_boundaries_are_midnight_in_the_business_timezone(clock, monkeypatch):
+    monkeypatch.setattr(EcommerceEngine, "BUSINESS_TIMEZONE", "Asia/Dubai")
+    item = _item()
+
+    clock.at(2024, 3, 9, 12)
+    assert _price(item) == 100
+
+    # 2024-03-10 00:00 in Dubai is 2024-03-09 20:00 UTC
+    start = datetime(2024, 3, 9, 20, tzinfo=ZoneInfo("UTC")).timestamp()
+    assert PromotionSchedule.next_transition() == start
+
+    clock.now = start - 1
+    assert _price(item) == 100
+
+    clock.now = start
+    assert _price(item) == 80
+
+
+def test_changed_fields_replace_the_entry(clock):
+    clock.at(2024, 3, 11)
+    assert _price(_item()) == 80
+
+    # Promotion moved to next week: the old end boundary no longer applies
+    moved = _item(start="2024-03-18", end="2024-03-20")
+    assert _price(moved) == 100
+
+    clock.at(2024, 3, 13)
+    assert _price(moved) == 100
+    assert PromotionSchedule.next_transition() == datetime(2024, 3, 18, tzinfo=ZoneInfo("UTC")).timestamp()
+
+
+def test_items_without_a_full_promotion_have_no_boundary(clock):
+    clock.at(2024, 3, 11)
+
+    assert _price(_item(custom_enable_promotion=0)) == 100
+    assert _price(_item(code="ITEM-2", end=None)) == 100
+    assert PromotionSchedule.next_transition() is None
+
+
+def test_partial_rows_are_priced_but_not_cached(clock):
+    clock.at(2024, 3, 11)
+    item = _item()
+    del item["image"]
+
+    assert _price(item) == 80
+    assert PromotionSchedule._entries == {}
+
+
+def test_ttl_is_capped_at_the_next_transition(clock):
+    clock.at(2024, 3, 9, 23, 59)
+    _price(_item())
+
+    assert PromotionSchedule.seconds_until_transition(300) == 60
+    assert PromotionSchedule.seconds_until_transition(30) == 30
@@ -0,0 +1,119 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from app.core.config import settings
+from app.services import order_service
+from app.services.order_service import QUOTE_ALGORITHM, _quoted_prices, create_quote
+
+SECRET = "quote-secret"
+CART = [{"item_code": "ITEM-1", "qty": 2}, {"item_code": "ITEM-2", "qty": 1}, {"item_code": "ITEM-1", "qty": 1}]
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(settings, "QUOTE_SECRET", SECRET)
+    monkeypatch.setattr(order_service, "_check_store_open", lambda: None)
+    monkeypatch.setattr(order_service.PromotionSchedule, "seconds_until_transition", staticmethod(lambda default: default))
+
+    priced = []
+
+    def price_item(code, cached=False):
+        priced.append(code)
+        return {"ITEM-1": 10.0, "ITEM-2": 25.5}[code]
+
+    monkeypatch.setattr(order_service, "_price_item", price_item)
+    return priced
+
+
+def _token(claims, secret=SECRET):
+    return jwt.encode({"exp": int(time.time()) + 60, **claims}, secret, algorithm=QUOTE_ALGORITHM)
+
+
+# -------------------------------------------------
+# create_quote
+# -------------------------------------------------
+def test_quote_prices_each_item_once(store):
+    quote = create_quote(CART)
+
+    assert sorted(store) == ["ITEM-1", "ITEM-2"]
+    assert [line["amount"] for line in quote["items"]] == [20.0, 25.5, 10.0]
+    assert quote["total"] == 55.5
+    assert _quoted_prices(quote["quote_token"]) == {"ITEM-1": 10.0, "ITEM-2": 25.5}
+
+
+def test_quote_expires_at_the_next_promotion_flip(store, monkeypatch):
+    monkeypatch.setattr(order_service.PromotionSchedule, "seconds_until_transition", staticmethod(lambda default: 30))
+
+    claims = jwt.get_unverified_claims(create_quote(CART)["quote_token"])
+
+    assert claims["exp"] - time.time() <= 30
+
+
+def test_no_token_when_a_flip_is_due_or_unsigned(store, monkeypatch):
+    monkeypatch.setattr(order_service.PromotionSchedule, "seconds_until_transition", staticmethod(lambda default: 0))
+    assert create_quote(CART)["quote_token"] is None
+
+    monkeypatch.setattr(order_service.PromotionSchedule, "seconds_until_transition", staticmethod(lambda default: default))
+    monkeypatch.setattr(settings, "QUOTE_SECRET", "")
+    assert create_quote(CART)["quote_token"] is None
+
+
+def test_closed_store_gives_no_quote(store, monkeypatch):
+    def closed():
+        raise HTTPException(status_code=503, detail="E-commerce integration is currently disabled.")
+
+    monkeypatch.setattr(order_service, "_check_store_open", closed)
+
+    with pytest.raises(HTTPException):
+        create_quote(CART)
+    assert store == []
+
+
+# -------------------------------------------------
+# _quoted_prices
+# -------------------------------------------------
+def test_valid_token_is_read(store):
+    assert _quoted_prices(_token({"type": "quote", "prices": {"ITEM-1": 10}})) == {"ITEM-1": 10.0}
+
+
+def test_expired_token_is_ignored(store):
+    expired = _token({"type": "quote", "prices": {"ITEM-1": 10}, "exp": int(time.time()) - 1})
+
+    assert _quoted_prices(expired) == {}
+
+
+def test_tampered_token_is_ignored(store):
+    header, _, signature = _token({"type": "quote", "prices": {"ITEM-1": 10}}).split(".")
+    forged = _token({"type": "quote", "prices": {"ITEM-1": 0.01}}, secret="other").split(".")[1]
+
+    assert _quoted_prices(f"{header}.{forged}.{signature}") == {}
+    assert _quoted_prices(_token({"type": "quote", "prices": {"ITEM-1": 0.01}}, secret="other")) == {}
+
+
+@pytest.mark.parametrize("claims", [
+    {"type": "access", "prices": {"ITEM-1": 10}},
+    {"prices": {"ITEM-1": 10}},
+    {"type": "quote", "prices": ["ITEM-1", 10]},
+])
+def test_other_tokens_are_ignored(store, claims):
+    assert _quoted_prices(_token(claims)) == {}
+
+
+def test_non_numeric_prices_are_dropped(store):
+    token = _token({"type": "quote", "prices": {"ITEM-1": "0", "ITEM-2": None, "ITEM-3": 5}})
+
+    assert _quoted_prices(token) == {"ITEM-3": 5.0}
+
+
+def test_checkout_prices_live_what_the_quote_lacks(store, monkeypatch):
+    monkeypatch.setattr(order_service, "get_or_create_customer", lambda payload: "CUST-1")
+    payload = {"quote_token": _token({"type": "quote", "prices": {"ITEM-1": 9.0}})}
+
+    customer_id, prices = order_service._resolve_customer_and_prices(payload, ["ITEM-1", "ITEM-2"])
+
+    assert customer_id == "CUST-1"
+    assert prices == {"ITEM-1": 9.0, "ITEM-2": 25.5}
+    assert store == ["ITEM-2"]
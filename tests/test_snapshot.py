@@ -0,0 +1,80 @@
+from app.core.snapshot import FORMAT_VERSION, Snapshot, write_snapshot
+
+FIELDS = ["item_code", "name", "modified", "item_group", "custom_subcategory", "price", "qty", "tags"]
+
+
+def _row(name, modified, group="Tools", subcategory="Hand", **values):
+    return {
+        "item_code": name,
+        "name": name,
+        "modified": modified,
+        "item_group": group,
+        "custom_subcategory": subcategory,
+        **values,
+    }
+
+
+def _write(tmp_path, rows, **kwargs):
+    path = str(tmp_path / "catalog.snap")
+    version = write_snapshot(
+        path,
+        rows,
+        FIELDS,
+        kwargs.get("site_settings", {}),
+        kwargs.get("watermark", ""),
+        kwargs.get("rebuilt_at", 0.0),
+    )
+    return Snapshot(path), version
+
+
+# -----------------------------
+# Round Trip (format v2)
+# -----------------------------
+def test_round_trip_keeps_header_and_values(tmp_path):
+    rows = [
+        _row("A", "2024-01-01 10:00:00", price=12.5, qty=3, tags=["new", "sale"]),
+        _row("B", "2024-01-02 10:00:00", price=None, qty=-(2 ** 40), tags={"x": 1}),
+        _row("C", "2024-01-03 10:00:00", group="Paint", subcategory="", price=0.0, qty=0),
+    ]
+
+    snapshot, version = _write(
+        tmp_path,
+        rows,
+        site_settings={"show_price": 1},
+        watermark="2024-01-03 10:00:00",
+        rebuilt_at=123.0,
+    )
+
+    assert FORMAT_VERSION == 2
+    assert snapshot.version == version
+    assert snapshot.fields == FIELDS
+    assert snapshot.site_settings == {"show_price": 1}
+    assert snapshot.watermark == "2024-01-03 10:00:00"
+    assert snapshot.rebuilt_at == 123.0
+    assert len(snapshot) == 3
+
+    # Newest first, every value back with its type
+    by_name = {record["name"]: record for record in snapshot.records()}
+    assert [record["name"] for record in snapshot.records()] == ["C", "B", "A"]
+    for row in rows:
+        assert by_name[row["name"]] == {f: row.get(f) for f in FIELDS}
+
+    assert snapshot.get(0, "qty") == 0 and isinstance(snapshot.get(0, "qty"), int)
+    assert snapshot.get(0, "price") == 0.0 and isinstance(snapshot.get(0, "price"), float)
+
+
+def test_groups_select_rows_in_listing_order(tmp_path):
+    snapshot, _ = _write(tmp_path, [
+        _row("A", "2024-01-01", group="Tools", subcategory="Hand"),
+        _row("B", "2024-01-02", group="Tools", subcategory="Power"),
+        _row("C", "2024-01-03", group="Paint", subcategory="Hand"),
+    ])
+
+    def names(positions):
+        return [snapshot.get(i, "name") for i in positions]
+
+    assert names(snapshot.select()) == ["C", "B", "A"]
+    assert names(snapshot.select("Tools")) == ["B", "A"]
+    assert names(snapshot.select(subcategory="Hand")) == ["C", "A"]
+    assert names(snapshot.select("Tools", "Power")) == ["B"]
+    assert list(snapshot.select("Garden")) == []
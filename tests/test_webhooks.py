@@ -0,0 +1,127 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import stat
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import webhooks
+from app.core.config import settings
+from app.integrations.erp_scheduler import BULK, INTERACTIVE, erp_priority
+from app.services import cache_invalidation
+from app.services.cache_invalidation import CacheEvents, verify_signature
+
+SECRET = "webhook-secret"
+
+
+def _sign(body: bytes, secret: str = SECRET) -> str:
+    return base64.b64encode(hmac.new(secret.encode(), body, hashlib.sha256).digest()).decode()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "ERP_WEBHOOK_SECRET", SECRET)
+
+    enqueued = []
+    monkeypatch.setattr(CacheEvents, "enqueue", lambda *args: enqueued.append(args))
+
+    app = FastAPI()
+    app.include_router(webhooks.router)
+
+    test_client = TestClient(app)
+    test_client.enqueued = enqueued
+    return test_client
+
+
+BODY = json.dumps({"doctype": "Item", "name": "ITEM-1", "item_code": "ITEM-1"}).encode()
+
+
+def test_verify_signature(monkeypatch):
+    monkeypatch.setattr(settings, "ERP_WEBHOOK_SECRET", "")
+    assert not verify_signature(BODY, _sign(BODY))
+
+    monkeypatch.setattr(settings, "ERP_WEBHOOK_SECRET", SECRET)
+    assert verify_signature(BODY, _sign(BODY))
+    assert not verify_signature(BODY, _sign(BODY, "other-secret"))
+    assert not verify_signature(BODY + b" ", _sign(BODY))
+    assert not verify_signature(BODY, None)
+    assert not verify_signature(BODY, "")
+
+
+def test_signed_webhook_is_accepted(client):
+    res = client.post("/webhooks/erp", content=BODY, headers={"X-Frappe-Webhook-Signature": _sign(BODY)})
+
+    assert res.status_code == 202
+    assert client.enqueued == [("Item", "ITEM-1", "ITEM-1")]
+
+
+@pytest.mark.parametrize("signature", [None, "", "not-base64", _sign(BODY, "other-secret"), _sign(b"{}")])
+def test_bad_signature_is_rejected(client, signature):
+    headers = {} if signature is None else {"X-Frappe-Webhook-Signature": signature}
+
+    res = client.post("/webhooks/erp", content=BODY, headers=headers)
+
+    assert res.status_code == 401
+    assert client.enqueued == []
+
+
+def test_tampered_body_is_rejected(client):
+    tampered = BODY.replace(b"ITEM-1", b"ITEM-2")
+
+    res = client.post("/webhooks/erp", content=tampered, headers={"X-Frappe-Webhook-Signature": _sign(BODY)})
+
+    assert res.status_code == 401
+    assert client.enqueued == []
+
+
+def test_unconfigured_secret_refuses_everything(client, monkeypatch):
+    monkeypatch.setattr(settings, "ERP_WEBHOOK_SECRET", "")
+
+    res = client.post("/webhooks/erp", content=BODY, headers={"X-Frappe-Webhook-Signature": _sign(BODY)})
+
+    assert res.status_code == 503
+    assert client.enqueued == []
+
+
+# -------------------------------------------------
+# Event Log
+# -------------------------------------------------
+def test_flush_runs_as_bulk(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "CACHE_EVENT_LOG", str(tmp_path / "events.log"))
+    monkeypatch.setattr(CacheEvents, "_pending", {("Sales Order", "SO-1"): None})
+
+    seen = []
+    monkeypatch.setattr(CacheEvents, "_resolve", lambda *args: seen.append(erp_priority.get()) or {})
+
+    def flush():
+        erp_priority.set(INTERACTIVE)
+        CacheEvents._flush()
+
+    thread = threading.Thread(target=flush)
+    thread.start()
+    thread.join()
+
+    assert seen == [BULK]
+
+
+def test_event_log_is_owner_only(monkeypatch, tmp_path):
+    path = tmp_path / "events.log"
+    monkeypatch.setattr(settings, "CACHE_EVENT_LOG", str(path))
+
+    CacheEvents.publish([{"doctype": "Customer", "name": "CUST-1"}])
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    # Rotation creates the replacement with the same mode
+    monkeypatch.setattr(cache_invalidation, "MAX_EVENT_LOG_BYTES", 0)
+    inode = os.stat(path).st_ino
+
+    CacheEvents.publish([{"doctype": "Customer", "name": "CUST-2"}])
+
+    assert os.stat(path).st_ino != inode
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert json.loads(path.read_text()) == {"doctype": "Customer", "name": "CUST-2"}